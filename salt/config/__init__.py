@@ -401,6 +401,24 @@ VALID_OPTS = {
     # Specify the format for state outputs. See highstate outputter for additional details.
     'state_output': str,
 
+    # Reuse the rendered data of SLS files whose sources and render context
+    # have not changed since the previous render
+    'state_render_cache': bool,
+
+    # Reuse the low chunks compiled from the same high data by a previous run
+    'state_lowstate_cache': bool,
+
+    # Skip the states whose arguments and target are unchanged since they last
+    # succeeded
+    'state_journal': bool,
+
+    # The maximum number of states which are run in parallel at the same time
+    'state_parallel_max': int,
+
+    # The maximum number of top and SLS files which are fetched from the
+    # fileserver at the same time while the highstate is compiled
+    'state_prefetch_max': int,
+
     # Tells the highstate outputter to only report diffs of states that changed
     'state_output_diff': bool,
 
@@ -410,6 +428,14 @@ VALID_OPTS = {
     # Fire events as state chunks are processed by the state compiler
     'state_events': bool,
 
+    # Send the result of each state to the master as soon as it has run, and
+    # leave the results out of the return of the state run
+    'state_stream_returns': bool,
+
+    # Send the returns of state runs to the master in a column oriented form,
+    # set to "gzip" to also compress them
+    'state_compact_returns': (bool, string_types),
+
     # The number of seconds a minion should wait before retry when attempting authentication
     'acceptance_wait_time': float,
 
@@ -482,6 +508,16 @@ VALID_OPTS = {
     # default match type for filtering events tags: startswith, endswith, find, regex, fnmatch
     'event_match_type': str,
 
+    # The number of idle connections kept in each pool of the SQL returners and external pillars.
+    # Set to 0 to close the connections after every use.
+    'sql_pool_size': int,
+
+    # Pooled SQL connections which have been idle for this number of seconds are closed
+    'sql_pool_max_idle': int,
+
+    # Pooled SQL connections are closed once they have been open for this number of seconds
+    'sql_pool_max_lifetime': int,
+
     # This pidfile to write out to when a daemon starts
     'pidfile': str,
 
@@ -561,6 +597,11 @@ VALID_OPTS = {
     'git_pillar_privkey': str,
     'git_pillar_pubkey': str,
     'git_pillar_passphrase': str,
+
+    # The number of git_pillar remotes which are fetched at the same time, and the number of
+    # seconds after which a fetch is no longer waited for
+    'git_pillar_fetch_concurrency': int,
+    'git_pillar_fetch_timeout': int,
     'gitfs_remotes': list,
     'gitfs_mountpoint': str,
     'gitfs_root': str,
@@ -576,6 +617,11 @@ VALID_OPTS = {
     'gitfs_ssl_verify': bool,
     'gitfs_global_lock': bool,
     'gitfs_saltenv': list,
+
+    # The number of gitfs remotes which are fetched at the same time, and the number of seconds
+    # after which a fetch is no longer waited for
+    'gitfs_fetch_concurrency': int,
+    'gitfs_fetch_timeout': int,
     'hgfs_remotes': list,
     'hgfs_mountpoint': str,
     'hgfs_root': str,
@@ -599,6 +645,15 @@ VALID_OPTS = {
     # Specify a list of external pillar systems to use
     'ext_pillar': list,
 
+    # The number of external pillars called at the same time
+    'ext_pillar_concurrency': int,
+
+    # The number of seconds after which an external pillar is no longer waited for, 0 waits forever
+    'ext_pillar_timeout': (int, float),
+
+    # The timeout and failure policy (fail or skip) of each external pillar, by name
+    'ext_pillar_source_opts': dict,
+
     # Reserved for future use to version the pillar structure
     'pillar_version': int,
 
@@ -614,6 +669,14 @@ VALID_OPTS = {
     # Pillar cache backend. Defaults to `disk` which stores caches in the master cache
     'pillar_cache_backend': str,
 
+    # Share the rendered data of the pillar SLS files which do not depend on the minion between
+    # the minions
+    'pillar_render_cache': bool,
+
+    # Send only the changes to the pillar of a minion which it already has when its pillar is
+    # refreshed. Has to be enabled on both the master and the minion.
+    'pillar_delta': bool,
+
     'pillar_safe_render_error': bool,
 
     # When creating a pillar, there are several strategies to choose from when
@@ -662,6 +725,13 @@ VALID_OPTS = {
     'fileserver_ignoresymlinks': bool,
     'fileserver_limit_traversal': bool,
 
+    # Rebuild the fileserver file list caches in the Maintenance process, the MWorkers only read them
+    'fileserver_maintain_list_cache': bool,
+
+    # The number of seconds between fileserver updates in the Maintenance process, 0 updates on
+    # every loop_interval
+    'fileserver_update_interval': int,
+
     # The number of open files a daemon is allowed to have open. Frequently needs to be increased
     # higher than the system default in order to account for the way zeromq consumes file handles.
     'max_open_files': int,
@@ -766,6 +836,10 @@ VALID_OPTS = {
     # Set a hard limit for the amount of memory modules can consume on a minion.
     'modules_max_memory': int,
 
+    # A list of execution modules or functions to load in the minion process
+    # before any jobs are forked, so that job processes share them
+    'minion_preload_modules': list,
+
     # The number of minutes between the minion refreshing its cache of grains
     'grains_refresh_every': int,
 
@@ -783,6 +857,10 @@ VALID_OPTS = {
     # If this is set to True the first newline after a Jinja block is removed
     'jinja_trim_blocks': bool,
 
+    # Store the compiled bytecode of Jinja templates in the cachedir so that
+    # unchanged templates are not compiled again on later renders
+    'jinja_bytecode_cache': bool,
+
     # Cache minion ID to file
     'minion_id_caching': bool,
 
@@ -936,6 +1014,12 @@ VALID_OPTS = {
     # Minion de-dup jid cache max size
     'minion_jid_queue_hwm': int,
 
+    # The maximum number of job processes a minion will run at once, -1 for
+    # no limit. Functions listed in process_count_max_exempt are never held
+    # back by this limit.
+    'process_count_max': int,
+    'process_count_max_exempt': list,
+
     # Minion data cache driver (one of satl.cache.* modules)
     'cache': str,
 
@@ -1002,6 +1086,7 @@ DEFAULT_MINION_OPTS = {
     'backup_mode': '',
     'renderer': 'yaml_jinja',
     'renderer_whitelist': [],
+    'jinja_bytecode_cache': False,
     'renderer_blacklist': [],
     'failhard': False,
     'autoload_dynamic_modules': True,
@@ -1012,6 +1097,7 @@ DEFAULT_MINION_OPTS = {
     # ``pillar_cache``, ``pillar_cache_ttl`` and ``pillar_cache_backend``
     # are not used on the minion but are unavoidably in the code path
     'pillar_cache': False,
+    'pillar_delta': False,
     'pillar_cache_ttl': 3600,
     'pillar_cache_backend': 'disk',
     'extension_modules': os.path.join(salt.syspaths.CACHE_DIR, 'minion', 'extmods'),
@@ -1057,6 +1143,8 @@ DEFAULT_MINION_OPTS = {
     'git_pillar_privkey': '',
     'git_pillar_pubkey': '',
     'git_pillar_passphrase': '',
+    'git_pillar_fetch_concurrency': 1,
+    'git_pillar_fetch_timeout': 0,
     'gitfs_remotes': [],
     'gitfs_mountpoint': '',
     'gitfs_root': '',
@@ -1072,6 +1160,8 @@ DEFAULT_MINION_OPTS = {
     'gitfs_global_lock': True,
     'gitfs_ssl_verify': True,
     'gitfs_saltenv': [],
+    'gitfs_fetch_concurrency': 1,
+    'gitfs_fetch_timeout': 0,
     'hash_type': 'sha256',
     'disable_modules': [],
     'disable_returners': [],
@@ -1117,8 +1207,15 @@ DEFAULT_MINION_OPTS = {
     'state_output': 'full',
     'state_output_diff': False,
     'state_auto_order': True,
+    'state_render_cache': False,
+    'state_lowstate_cache': False,
+    'state_journal': False,
     'state_events': False,
     'state_aggregate': False,
+    'state_parallel_max': 10,
+    'state_prefetch_max': 0,
+    'state_stream_returns': False,
+    'state_compact_returns': False,
     'snapper_states': False,
     'snapper_states_config': 'root',
     'acceptance_wait_time': 10,
@@ -1138,6 +1235,9 @@ DEFAULT_MINION_OPTS = {
     'recon_randomize': True,
     'return_retry_timer': 5,
     'return_retry_timer_max': 10,
+    'sql_pool_size': 5,
+    'sql_pool_max_idle': 300,
+    'sql_pool_max_lifetime': 3600,
     'random_reauth_delay': 10,
     'winrepo_source_dir': 'salt://win/repo-ng/',
     'winrepo_dir': os.path.join(salt.syspaths.BASE_FILE_ROOTS_DIR, 'win', 'repo'),
@@ -1166,6 +1266,7 @@ DEFAULT_MINION_OPTS = {
     'tcp_keepalive_cnt': -1,
     'tcp_keepalive_intvl': -1,
     'modules_max_memory': -1,
+    'minion_preload_modules': [],
     'grains_refresh_every': 0,
     'minion_id_caching': True,
     'keysize': 2048,
@@ -1214,6 +1315,8 @@ DEFAULT_MINION_OPTS = {
     'proxy_password': '',
     'proxy_port': 0,
     'minion_jid_queue_hwm': 100,
+    'process_count_max': -1,
+    'process_count_max_exempt': ['saltutil.find_job', 'saltutil.running', 'test.ping'],
     'ssl': None,
     'multifunc_ordered': False,
     'beacons_before_connect': False,
@@ -1273,6 +1376,8 @@ DEFAULT_MASTER_OPTS = {
     'git_pillar_privkey': '',
     'git_pillar_pubkey': '',
     'git_pillar_passphrase': '',
+    'git_pillar_fetch_concurrency': 1,
+    'git_pillar_fetch_timeout': 0,
     'gitfs_remotes': [],
     'gitfs_mountpoint': '',
     'gitfs_root': '',
@@ -1288,6 +1393,8 @@ DEFAULT_MASTER_OPTS = {
     'gitfs_global_lock': True,
     'gitfs_ssl_verify': True,
     'gitfs_saltenv': [],
+    'gitfs_fetch_concurrency': 1,
+    'gitfs_fetch_timeout': 0,
     'hgfs_remotes': [],
     'hgfs_mountpoint': '',
     'hgfs_root': '',
@@ -1311,14 +1418,19 @@ DEFAULT_MASTER_OPTS = {
     'minionfs_whitelist': [],
     'minionfs_blacklist': [],
     'ext_pillar': [],
+    'ext_pillar_concurrency': 1,
+    'ext_pillar_timeout': 0,
+    'ext_pillar_source_opts': {},
     'pillar_version': 2,
     'pillar_opts': False,
     'pillar_safe_render_error': True,
     'pillar_source_merging_strategy': 'smart',
     'pillar_merge_lists': False,
     'pillar_cache': False,
+    'pillar_delta': False,
     'pillar_cache_ttl': 3600,
     'pillar_cache_backend': 'disk',
+    'pillar_render_cache': False,
     'ping_on_rotate': False,
     'peer': {},
     'preserve_minion_cache': False,
@@ -1346,6 +1458,8 @@ DEFAULT_MASTER_OPTS = {
     'fileserver_followsymlinks': True,
     'fileserver_ignoresymlinks': False,
     'fileserver_limit_traversal': False,
+    'fileserver_maintain_list_cache': False,
+    'fileserver_update_interval': 0,
     'max_open_files': 100000,
     'hash_type': 'sha256',
     'conf_file': os.path.join(salt.syspaths.CONFIG_DIR, 'master'),
@@ -1395,6 +1509,9 @@ DEFAULT_MASTER_OPTS = {
     'event_return_whitelist': [],
     'event_return_blacklist': [],
     'event_match_type': 'startswith',
+    'sql_pool_size': 5,
+    'sql_pool_max_idle': 300,
+    'sql_pool_max_lifetime': 3600,
     'runner_returns': True,
     'serial': 'msgpack',
     'state_verbose': True,
@@ -1403,6 +1520,7 @@ DEFAULT_MASTER_OPTS = {
     'state_auto_order': True,
     'state_events': False,
     'state_aggregate': False,
+    'state_parallel_max': 10,
     'search': '',
     'search_index_interval': 3600,
     'loop_interval': 60,
@@ -1432,6 +1550,7 @@ DEFAULT_MASTER_OPTS = {
     'syndic_wait': 5,
     'jinja_lstrip_blocks': False,
     'jinja_trim_blocks': False,
+    'jinja_bytecode_cache': False,
     'tcp_keepalive': True,
     'tcp_keepalive_idle': 300,
     'tcp_keepalive_cnt': -1,
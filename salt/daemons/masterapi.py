@@ -35,6 +35,7 @@ import salt.utils.verify
 import salt.utils.minions
 import salt.utils.gzip_util
 import salt.utils.jid
+import salt.utils.job
 from salt.pillar import git_pillar
 from salt.utils.event import tagify
 from salt.exceptions import SaltMasterError
@@ -191,6 +192,7 @@ def clean_old_jobs(opts):
     fstr = '{0}.clean_old_jobs'.format(opts['master_job_cache'])
     if fstr in mminion.returners:
         mminion.returners[fstr]()
+    salt.utils.job.clean_state_stream(opts)
 
 
 def mk_key(opts, user):
@@ -455,6 +457,7 @@ class RemoteFuncs(object):
         '''
         fs_ = salt.fileserver.Fileserver(self.opts)
         self._serve_file = fs_.serve_file
+        self._file_archive = fs_.file_archive
         self._file_find = fs_._find_file
         self._file_hash = fs_.file_hash
         self._file_list = fs_.file_list
@@ -11,6 +11,7 @@ import os
 import string
 import shutil
 import ftplib
+import tarfile
 from tornado.httputil import parse_response_start_line, HTTPInputError
 
 # Import salt libs
@@ -164,6 +165,12 @@ class Client(object):
         '''
         raise NotImplementedError
 
+    def destroy(self):
+        '''
+        Release the resources held by the file client
+        '''
+        pass
+
     def file_list_emptydirs(self, saltenv='base', prefix=''):
         '''
         List the empty dirs
@@ -185,10 +192,34 @@ class Client(object):
         ret = []
         if isinstance(paths, str):
             paths = paths.split(',')
+        # Files on the master in this saltenv are fetched with a single
+        # archive request when the file client supports it
+        rel_paths = {}
         for path in paths:
-            ret.append(self.cache_file(path, saltenv, cachedir=cachedir))
+            if path.startswith('salt://'):
+                rel_path, senv = salt.utils.url.parse(path)
+                if not senv or senv == saltenv:
+                    rel_paths[path] = rel_path
+        cached = None
+        if len(rel_paths) > 1:
+            cached = self.cache_archive(
+                list(rel_paths.values()), saltenv, cachedir=cachedir)
+        for path in paths:
+            if cached is not None and path in rel_paths:
+                ret.append(cached.get(rel_paths[path], False))
+            else:
+                ret.append(self.cache_file(path, saltenv, cachedir=cachedir))
         return ret
 
+    def cache_archive(self, paths, saltenv='base', cachedir=None):
+        '''
+        Cache a list of files and directories (paths ending in ``/``) stored
+        on the master with as few requests as possible. Return a dict mapping
+        the paths of the files which were found to their location in the
+        minion file cache, or None if the file client does not support it.
+        '''
+        return None
+
     def cache_master(self, saltenv='base', cachedir=None):
         '''
         Download and cache all files on a master in a specified environment
@@ -220,17 +251,23 @@ class Client(object):
                 path, saltenv
             )
         )
-        # go through the list of all files finding ones that are in
-        # the target directory and caching them
-        for fn_ in self.file_list(saltenv):
-            fn_ = sdecode(fn_)
-            if fn_.strip() and fn_.startswith(path):
-                if salt.utils.check_include_exclude(
-                        fn_, include_pat, exclude_pat):
-                    fn_ = self.cache_file(
-                        salt.utils.url.create(fn_), saltenv, cachedir=cachedir)
-                    if fn_:
-                        ret.append(fn_)
+        cached = None
+        if include_pat is None and exclude_pat is None:
+            cached = self.cache_archive([path], saltenv, cachedir=cachedir)
+        if cached is not None:
+            ret.extend(cached[fn_] for fn_ in sorted(cached))
+        else:
+            # go through the list of all files finding ones that are in
+            # the target directory and caching them
+            for fn_ in self.file_list(saltenv):
+                fn_ = sdecode(fn_)
+                if fn_.strip() and fn_.startswith(path):
+                    if salt.utils.check_include_exclude(
+                            fn_, include_pat, exclude_pat):
+                        fn_ = self.cache_file(
+                            salt.utils.url.create(fn_), saltenv, cachedir=cachedir)
+                        if fn_:
+                            ret.append(fn_)
 
         if include_empty:
             # Break up the path into a list containing the bottom-level
@@ -960,6 +997,9 @@ class RemoteClient(Client):
     '''
     Interact with the salt master file server.
     '''
+    # Cleared when the master does not support file archives
+    _archive = True
+
     def __init__(self, opts):
         Client.__init__(self, opts)
         self.channel = salt.transport.Channel.factory(self.opts)
@@ -975,6 +1015,13 @@ class RemoteClient(Client):
         self.channel = salt.transport.Channel.factory(self.opts)
         return self.channel
 
+    def destroy(self):
+        '''
+        Close the channel to the master, the sockets of the channel are closed
+        when it is collected
+        '''
+        self.channel = None
+
     def get_file(self,
                  path,
                  dest='',
@@ -1219,6 +1266,102 @@ class RemoteClient(Client):
                     pass
         return dest
 
+    def cache_archive(self, paths, saltenv='base', cachedir=None):
+        '''
+        Cache a list of files and directories (paths ending in ``/``) stored
+        on the master. The hashes of the copies already in the minion file
+        cache are sent along, and the master returns a single compressed
+        archive of the files which differ. Return a dict mapping the paths of
+        the files which were found to their location in the minion file cache,
+        or None if the master does not support archives.
+        '''
+        if not self._archive:
+            return None
+        if cachedir is None:
+            cachedir = self.opts['cachedir']
+        elif not os.path.isabs(cachedir):
+            cachedir = os.path.join(self.opts['cachedir'], cachedir)
+        hash_type = self.opts.get('hash_type', 'md5')
+        hashes = {}
+        for path in paths:
+            dest = salt.utils.path_join(cachedir, 'files', saltenv, path)
+            if not path.endswith('/'):
+                if os.path.isfile(dest):
+                    hashes[path] = salt.utils.get_hash(dest, form=hash_type)
+                continue
+            for fn_ in self._file_local_list(dest):
+                rel_path = os.path.relpath(fn_, dest).replace(os.sep, '/')
+                hashes[path + rel_path] = salt.utils.get_hash(fn_, form=hash_type)
+
+        ret = {}
+        fallback = []
+        while paths:
+            load = {'paths': paths,
+                    'saltenv': saltenv,
+                    'hashes': hashes,
+                    'hash_type': hash_type,
+                    'cmd': '_file_archive'}
+            data = decode_dict_keys_to_str(self.channel.send(load, raw=True))
+            if not isinstance(data, dict) or 'files' not in data:
+                log.debug('The master does not support file archives')
+                self._archive = False
+                return None
+            files = {}
+            for path, info in six.iteritems(data['files']):
+                info = decode_dict_keys_to_str(info)
+                info['hsum'] = salt.utils.to_str(info['hsum'])
+                info['hash_type'] = salt.utils.to_str(info['hash_type'])
+                files[salt.utils.to_str(path)] = info
+            archive = data.pop('data')
+            if archive:
+                # Read the archive as a stream, the members are decompressed
+                # and written to the cache one at a time
+                tar = tarfile.open(fileobj=six.BytesIO(archive), mode='r|gz')
+                del archive
+                try:
+                    for member in tar:
+                        path = sdecode(member.name)
+                        if not member.isfile() \
+                                or not files.get(path, {}).get('archived') \
+                                or os.path.isabs(path) \
+                                or '..' in path.split('/'):
+                            continue
+                        with self._cache_loc(path, saltenv, cachedir=cachedir) as dest:
+                            if os.path.isdir(dest):
+                                salt.utils.rm_rf(dest)
+                            with salt.utils.fopen(dest, 'wb') as ofile:
+                                shutil.copyfileobj(tar.extractfile(member), ofile)
+                        hashes[path] = salt.utils.get_hash(
+                            dest, form=files[path]['hash_type'])
+                finally:
+                    tar.close()
+            for path, info in six.iteritems(files):
+                dest = salt.utils.path_join(cachedir, 'files', saltenv, path)
+                if hashes.get(path) != info['hsum']:
+                    # The file was too large for the archive, or the download
+                    # is broken
+                    fallback.append(path)
+                    continue
+                if info['mode'] is not None and not salt.utils.is_windows():
+                    try:
+                        if os.stat(dest).st_mode != info['mode']:
+                            os.chmod(dest, info['mode'])
+                    except OSError as exc:
+                        log.warning('Failed to chmod %s: %s', dest, exc)
+                ret[path] = dest
+            paths = [salt.utils.to_str(path) for path in data['remaining']]
+        log.debug(
+            'Fetched %d files from saltenv \'%s\' with archives',
+            len(ret), saltenv
+        )
+
+        for path in fallback:
+            dest = self.cache_file(salt.utils.url.create(path), saltenv,
+                                   cachedir=cachedir)
+            if dest:
+                ret[path] = dest
+        return ret
+
     def file_list(self, saltenv='base', prefix=''):
         '''
         List the files on the master
@@ -1357,6 +1500,19 @@ class FSClient(RemoteClient):
         self.channel = salt.fileserver.FSChan(opts)
         self.auth = DumbAuth()
 
+    def destroy(self):
+        '''
+        The local channel holds no connection
+        '''
+        pass
+
+    def cache_archive(self, paths, saltenv='base', cachedir=None):
+        '''
+        The files are read from the local file roots, so they are copied one
+        by one instead of being packed in an archive and unpacked again
+        '''
+        return None
+
 
 class DumbAuth(object):
     '''
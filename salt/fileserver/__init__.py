@@ -5,17 +5,22 @@ File server pluggable modules and generic backend functions
 
 # Import python libs
 from __future__ import absolute_import
+import bisect
 import collections
+import copy
 import errno
 import fnmatch
 import logging
 import os
 import re
+import tarfile
 import time
 
 # Import salt libs
 import salt.loader
 import salt.utils
+import salt.utils.args
+import salt.utils.atomicfile
 import salt.utils.locales
 
 # Import 3rd-party libs
@@ -24,6 +29,21 @@ import salt.ext.six as six
 
 log = logging.getLogger(__name__)
 
+# The most file data sent in a single file_archive reply, and the largest file
+# which is put into an archive
+ARCHIVE_MAX_SIZE = 16 * 1024 * 1024
+
+# A file list cache maintained by the Maintenance process is rebuilt by the
+# workers once it is older than this many times the longest of
+# fileserver_list_cache_time and loop_interval, in case the Maintenance
+# process stalls
+MAINTAINED_LIST_CACHE_AGE_FACTOR = 3
+
+# The file list caches loaded by this process, maps the path of the cache file
+# to its mtime, size and inode and its data, with the lists sorted. The lists
+# are shared by the requests and must not be changed.
+_FILE_LIST_CACHE = {}
+
 
 def _unlock_cache(w_lock):
     '''
@@ -106,6 +126,25 @@ def check_file_list_cache(opts, form, list_cache, w_lock):
     refresh_cache = False
     save_cache = True
     serial = salt.payload.Serial(opts)
+    if opts.get('fileserver_maintain_list_cache') \
+            and not opts.get('__maintain_list_cache') \
+            and os.path.isfile(list_cache):
+        # The Maintenance process keeps the cache up to date, use it without
+        # waiting for the lock, unless it has not been rebuilt for so long
+        # that the Maintenance process is stalled
+        max_age = MAINTAINED_LIST_CACHE_AGE_FACTOR * max(
+            opts.get('fileserver_list_cache_time', 20),
+            opts.get('loop_interval', 60))
+        try:
+            age = time.time() - os.stat(list_cache).st_mtime
+            if age < max_age:
+                return copy.copy(_load_file_list_cache(serial, list_cache).get(form, [])), False, False
+            log.warning(
+                'File list cache {0} has not been rebuilt by the Maintenance '
+                'process for {1:.0f}s, rebuilding it'.format(list_cache, age)
+            )
+        except Exception as exc:
+            log.debug('Failed to load file list cache {0}: {1}'.format(list_cache, exc))
     wait_lock(w_lock, list_cache, 5 * 60)
     if not os.path.isfile(list_cache) and _lock_cache(w_lock):
         refresh_cache = True
@@ -123,12 +162,10 @@ def check_file_list_cache(opts, form, list_cache, w_lock):
                 else:
                     # if filelist does not exists yet, mark it as expired
                     age = opts.get('fileserver_list_cache_time', 20) + 1
-                if age < opts.get('fileserver_list_cache_time', 20):
+                if age < opts.get('fileserver_list_cache_time', 20) \
+                        and not opts.get('__maintain_list_cache'):
                     # Young enough! Load this sucker up!
-                    with salt.utils.fopen(list_cache, 'rb') as fp_:
-                        log.trace('Returning file_lists cache data from '
-                                  '{0}'.format(list_cache))
-                        return serial.load(fp_).get(form, []), False, False
+                    return copy.copy(_load_file_list_cache(serial, list_cache).get(form, [])), False, False
                 elif _lock_cache(w_lock):
                     # Set the w_lock and go
                     refresh_cache = True
@@ -150,10 +187,71 @@ def write_file_list_cache(opts, data, list_cache, w_lock):
     backend to determine if the cache needs to be refreshed/written).
     '''
     serial = salt.payload.Serial(opts)
-    with salt.utils.fopen(list_cache, 'w+b') as fp_:
+    # Write the cache atomically, processes which do not wait for the lock
+    # may read it at any time
+    with salt.utils.atomicfile.atomic_open(list_cache, 'w+b') as fp_:
         fp_.write(serial.dumps(data))
-        _unlock_cache(w_lock)
-        log.trace('Lockfile {0} removed'.format(w_lock))
+    _unlock_cache(w_lock)
+    log.trace('Lockfile {0} removed'.format(w_lock))
+    _FILE_LIST_CACHE[list_cache] = (_file_list_cache_version(list_cache),
+                                    _sort_file_lists(data))
+
+
+def _file_list_cache_version(list_cache):
+    '''
+    Return the mtime, size and inode of a file list cache file. The cache is
+    rewritten atomically, so the inode changes even when the rewrite happens
+    within the same mtime tick.
+    '''
+    cache_stat = os.stat(list_cache)
+    return cache_stat.st_mtime, cache_stat.st_size, cache_stat.st_ino
+
+
+def _load_file_list_cache(serial, list_cache):
+    '''
+    Return the data of a file list cache. The data is kept in memory, and only
+    loaded again once the cache file has been rewritten.
+    '''
+    version = _file_list_cache_version(list_cache)
+    if list_cache in _FILE_LIST_CACHE \
+            and _FILE_LIST_CACHE[list_cache][0] == version:
+        return _FILE_LIST_CACHE[list_cache][1]
+    with salt.utils.fopen(list_cache, 'rb') as fp_:
+        log.trace('Returning file_lists cache data from '
+                  '{0}'.format(list_cache))
+        data = _sort_file_lists(serial.load(fp_))
+    _FILE_LIST_CACHE[list_cache] = (version, data)
+    return data
+
+
+def _sort_file_lists(data):
+    '''
+    Sort the lists in the file list cache data so they can be searched by
+    prefix_filter
+    '''
+    return dict((key, sorted(val) if isinstance(val, list) else val)
+                for key, val in six.iteritems(data))
+
+
+def prefix_filter(paths, prefix):
+    '''
+    Return a new list of the paths in the sorted list of paths which start
+    with the prefix, leading and trailing slashes in the prefix are ignored
+    '''
+    prefix = prefix.strip('/') if prefix else ''
+    if not prefix:
+        # The paths may be shared by the file list cache
+        return list(paths)
+    try:
+        start = end = bisect.bisect_left(paths, prefix)
+        while end < len(paths) and paths[end].startswith(prefix):
+            end += 1
+    except UnicodeDecodeError:
+        # Non-ascii paths which are not unicode can't be compared with a
+        # unicode prefix
+        return [path for path in paths
+                if salt.utils.locales.sdecode(path).startswith(prefix)]
+    return paths[start:end]
 
 
 def check_env_cache(opts, env_cache):
@@ -455,17 +553,32 @@ class Fileserver(object):
                 errors.extend(bad)
         return cleared, errors
 
-    def update(self, back=None):
+    def update(self, back=None, remote=None, ref=None):
         '''
         Update all of the enabled fileserver backends which support the update
         function, or
+
+        remote
+            Only update the remotes with a URL matching this pattern, in the
+            backends which support updating a single remote
+
+        ref
+            The branch or tag which was changed in these remotes
         '''
         back = self._gen_back(back)
         for fsb in back:
             fstr = '{0}.update'.format(fsb)
             if fstr in self.servers:
-                log.debug('Updating {0} fileserver cache'.format(fsb))
-                self.servers[fstr]()
+                if remote is None:
+                    log.debug('Updating {0} fileserver cache'.format(fsb))
+                    self.servers[fstr]()
+                elif 'remote' in salt.utils.args.get_function_argspec(
+                        self.servers[fstr]).args:
+                    log.debug(
+                        'Updating {0} fileserver cache for remotes matching '
+                        '{1}'.format(fsb, remote)
+                    )
+                    self.servers[fstr](remote=remote, ref=ref)
 
     def envs(self, back=None, sources=False):
         '''
@@ -485,6 +598,24 @@ class Fileserver(object):
             return ret
         return list(ret)
 
+    def update_file_list_caches(self, back=None):
+        '''
+        Rebuild the file list caches of the named backend or all backends, for
+        all of their environments
+        '''
+        for fsb in self._gen_back(back):
+            fstr = '{0}.file_list'.format(fsb)
+            if fstr not in self.servers:
+                continue
+            start = time.time()
+            saltenvs = self.servers['{0}.envs'.format(fsb)]()
+            for saltenv in saltenvs:
+                self.servers[fstr]({'saltenv': saltenv})
+            log.debug(
+                'Rebuilt the {0} file list caches of {1} saltenvs in {2:.2f}s'
+                .format(fsb, len(saltenvs), time.time() - start)
+            )
+
     def init(self, back=None):
         '''
         Initialize the backend, only do so if the fs supports an init function
@@ -597,6 +728,91 @@ class Fileserver(object):
             return self.servers[fstr](load, fnd)
         return ret
 
+    def file_archive(self, load):
+        '''
+        Return a gzip compressed tar archive of the requested files, and of the
+        files in the requested directories (paths ending in ``/``). Files whose
+        hash matches the hash passed by the client in ``hashes`` are left out
+        of the archive. The hash and mode of every file which was found is
+        returned in ``files``, files which did not fit in the archive are
+        returned in ``remaining`` and need to be requested again.
+        '''
+        ret = {'data': b'',
+               'files': {},
+               'missing': [],
+               'remaining': []}
+        if 'paths' not in load or 'saltenv' not in load:
+            return ret
+        saltenv = load['saltenv']
+        if not isinstance(saltenv, six.string_types):
+            saltenv = six.text_type(saltenv)
+        hashes = load.get('hashes') or {}
+
+        paths = []
+        for path in load['paths']:
+            path = salt.utils.locales.sdecode(path)
+            if path.endswith('/'):
+                files = [fn_ for fn_ in self.file_list({'saltenv': saltenv,
+                                                        'prefix': path})
+                         if fn_.startswith(path)]
+                if not files:
+                    ret['missing'].append(path)
+                paths.extend(files)
+            else:
+                paths.append(path)
+
+        buf = six.BytesIO()
+        # The archive is written as a stream, each file is compressed as it
+        # is read instead of being loaded whole
+        tar = tarfile.open(fileobj=buf, mode='w|gz')
+        size = 0
+        try:
+            for idx, path in enumerate(paths):
+                if path in ret['files']:
+                    continue
+                fnd = self.find_file(path, saltenv)
+                fstr = '{0}.file_hash'.format(fnd.get('back'))
+                if not fnd.get('path') or fstr not in self.servers:
+                    ret['missing'].append(path)
+                    continue
+                hsum = self.servers[fstr]({'path': path, 'saltenv': saltenv}, fnd)
+                if not hsum:
+                    ret['missing'].append(path)
+                    continue
+                try:
+                    mode = fnd['stat'][0]
+                except (KeyError, IndexError, TypeError):
+                    mode = None
+                ret['files'][path] = {'hsum': hsum['hsum'],
+                                      'hash_type': hsum['hash_type'],
+                                      'mode': mode,
+                                      'archived': False}
+                if hashes.get(path) == hsum['hsum'] \
+                        and load.get('hash_type') == hsum['hash_type']:
+                    continue
+                fsize = os.path.getsize(fnd['path'])
+                if fsize > ARCHIVE_MAX_SIZE:
+                    # Too large for an archive, the client falls back to
+                    # fetching the file in chunks
+                    continue
+                if size and size + fsize > ARCHIVE_MAX_SIZE:
+                    ret['files'].pop(path)
+                    ret['remaining'] = [fn_ for fn_ in paths[idx:]
+                                        if fn_ not in ret['files']]
+                    break
+                info = tarfile.TarInfo(path)
+                info.size = fsize
+                info.mode = mode & 0o7777 if mode is not None else 0o644
+                info.mtime = time.time()
+                with salt.utils.fopen(fnd['path'], 'rb') as fp_:
+                    tar.addfile(info, fp_)
+                size += fsize
+                ret['files'][path]['archived'] = True
+        finally:
+            tar.close()
+        ret['data'] = buf.getvalue()
+        return ret
+
     def __file_hash_and_stat(self, load):
         '''
         Common code for hashing and stating files
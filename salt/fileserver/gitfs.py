@@ -118,14 +118,20 @@ def lock(remote=None):
     return gitfs.lock(remote=remote)
 
 
-def update():
+def update(remote=None, ref=None):
     '''
     Execute a git fetch on all of the repos
+
+    .. versionchanged:: Nitrogen
+        If ``remote`` is passed, only the remotes with a URL matching this
+        pattern are fetched, and only the file list caches of the saltenvs
+        they serve are cleared. ``ref`` narrows these saltenvs down to the
+        ones mapped to this branch or tag.
     '''
     gitfs = salt.utils.gitfs.GitFS(__opts__)
     gitfs.init_remotes(__opts__['gitfs_remotes'],
                        PER_REMOTE_OVERRIDES, PER_REMOTE_ONLY)
-    gitfs.update()
+    gitfs.update(remote=remote, ref=ref)
 
 
 def envs(ignore_cache=False):
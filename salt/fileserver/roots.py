@@ -30,6 +30,10 @@ import salt.ext.six as six
 
 log = logging.getLogger(__name__)
 
+# In-memory index of the hashes of the served files, maps the path and the
+# hash type to the mtime, size and hash of the file
+_HASH_INDEX = {}
+
 
 def find_file(path, saltenv='base', **kwargs):
     '''
@@ -224,12 +228,25 @@ def file_hash(load, fnd):
     ret = {}
 
     # if the file doesn't exist, we can't get a hash
-    if not path or not os.path.isfile(path):
+    if not path:
+        return ret
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return ret
+    if not os.path.isfile(path):
         return ret
 
     # set the hash_type as it is determined by config-- so mechanism won't change that
     ret['hash_type'] = __opts__['hash_type']
 
+    # serve the hash from the index if the file has not changed
+    key = (path, __opts__['hash_type'])
+    entry = (stat.st_mtime, stat.st_size)
+    if key in _HASH_INDEX and _HASH_INDEX[key][:2] == entry:
+        ret['hsum'] = _HASH_INDEX[key][2]
+        return ret
+
     # check if the hash is cached
     # cache file's contents should be "hash:mtime"
     cache_path = os.path.join(__opts__['cachedir'],
@@ -243,6 +260,7 @@ def file_hash(load, fnd):
             with salt.utils.fopen(cache_path, 'r') as fp_:
                 try:
                     hsum, mtime = fp_.read().split(':')
+                    mtime = float(mtime)
                 except ValueError:
                     log.debug('Fileserver attempted to read incomplete cache file. Retrying.')
                     # Delete the file since its incomplete (either corrupted or incomplete)
@@ -251,9 +269,10 @@ def file_hash(load, fnd):
                     except OSError:
                         pass
                     return file_hash(load, fnd)
-                if os.path.getmtime(path) == mtime:
+                if stat.st_mtime == mtime:
                     # check if mtime changed
                     ret['hsum'] = hsum
+                    _HASH_INDEX[key] = entry + (hsum,)
                     return ret
         except (os.error, IOError):  # Can't use Python select() because we need Windows support
             log.debug("Fileserver encountered lock when reading cache file. Retrying.")
@@ -266,6 +285,7 @@ def file_hash(load, fnd):
 
     # if we don't have a cache entry-- lets make one
     ret['hsum'] = salt.utils.get_hash(path, __opts__['hash_type'])
+    _HASH_INDEX[key] = entry + (ret['hsum'],)
     cache_dir = os.path.dirname(cache_path)
     # make cache directory if it doesn't exist
     if not os.path.exists(cache_dir):
@@ -278,8 +298,9 @@ def file_hash(load, fnd):
                 pass
             else:
                 raise
-    # save the cache object "hash:mtime"
-    cache_object = '{0}:{1}'.format(ret['hsum'], os.path.getmtime(path))
+    # save the cache object "hash:mtime", repr keeps the full precision of the
+    # mtime so it compares equal when it is read back
+    cache_object = '{0}:{1!r}'.format(ret['hsum'], stat.st_mtime)
     with salt.utils.flopen(cache_path, 'w') as fp_:
         fp_.write(cache_object)
     return ret
@@ -315,7 +336,7 @@ def _file_lists(load, form):
             __opts__, form, list_cache, w_lock
         )
     if cache_match is not None:
-        return cache_match
+        return salt.fileserver.prefix_filter(cache_match, load.get('prefix'))
     if refresh_cache:
         ret = {
             'files': [],
@@ -352,6 +373,8 @@ def _file_lists(load, form):
                         if __opts__.get('file_client', 'remote') == 'local' and os.path.sep == "\\":
                             rel_fn = rel_fn.replace('\\', '/')
                         ret['files'].append(rel_fn)
+        for val in six.itervalues(ret):
+            val.sort()
         if save_cache:
             try:
                 salt.fileserver.write_file_list_cache(
@@ -360,7 +383,7 @@ def _file_lists(load, form):
             except NameError:
                 # Catch msgpack error in salt-ssh
                 pass
-        return ret.get(form, [])
+        return salt.fileserver.prefix_filter(ret.get(form, []), load.get('prefix'))
     # Shouldn't get here, but if we do, this prevents a TypeError
     return []
 
@@ -1544,6 +1544,31 @@ class LazyLoader(salt.utils.lazy.LazyDict):
 
         self.loaded = True
 
+    def preload(self, names):
+        '''
+        Eagerly load the named modules (by virtual name) or functions.
+
+        Processes forked after this point inherit the imported modules and the
+        results of their ``__virtual__`` functions through copy-on-write
+        memory instead of loading them again. A name of ``*`` loads
+        everything.
+        '''
+        if '*' in names:
+            self._load_all()
+            return
+        for name in names:
+            if '.' in name:
+                found = name in self
+            else:
+                try:
+                    getattr(self, name)
+                    found = True
+                except AttributeError:
+                    found = False
+            if not found:
+                log.warning('Unable to preload \'{0}\': {1}'.format(
+                    name, self.missing_fun_string(name)))
+
     def _apply_outputter(self, func, mod):
         '''
         Apply the __outputter__ variable to the functions
@@ -156,6 +156,10 @@ class Maintenance(SignalHandlingMultiprocessingProcess):
         self.loop_interval = int(self.opts['loop_interval'])
         # Track key rotation intervals
         self.rotate = int(time.time())
+        # When the fileserver file list caches were last rebuilt
+        self.list_cache_time = 0
+        # When the fileserver backends were last updated
+        self.fileserver_update_time = 0
         # A serializer for general maint operations
         self.serial = salt.payload.Serial(self.opts)
 
@@ -178,7 +182,11 @@ class Maintenance(SignalHandlingMultiprocessingProcess):
         errors like "WARNING: Mixing fork() and threads detected; memory leaked."
         '''
         # Init fileserver manager
-        self.fileserver = salt.fileserver.Fileserver(self.opts)
+        fs_opts = self.opts
+        if self.opts.get('fileserver_maintain_list_cache'):
+            # This process rebuilds the file list caches used by the MWorkers
+            fs_opts = dict(self.opts, __maintain_list_cache=True)
+        self.fileserver = salt.fileserver.Fileserver(fs_opts)
         # Load Runners
         ropts = dict(self.opts)
         ropts['quiet'] = True
@@ -241,11 +249,41 @@ class Maintenance(SignalHandlingMultiprocessingProcess):
             self.handle_key_cache()
             self.handle_presence(old_present)
             self.handle_key_rotate(now)
-            salt.daemons.masterapi.fileserver_update(self.fileserver)
+            self.handle_fileserver_update(now)
+            self.handle_file_list_cache(now)
             salt.utils.verify.check_max_open_files(self.opts)
             last = now
             time.sleep(self.loop_interval)
 
+    def handle_fileserver_update(self, now):
+        '''
+        Update the fileserver backends every fileserver_update_interval
+        seconds, or on every loop if it is not set
+        '''
+        if now - self.fileserver_update_time < self.opts.get('fileserver_update_interval', 0):
+            return
+        self.fileserver_update_time = now
+        salt.daemons.masterapi.fileserver_update(self.fileserver)
+
+    def handle_file_list_cache(self, now):
+        '''
+        Rebuild the fileserver file list caches once they are older than
+        fileserver_list_cache_time, if this process maintains them
+        '''
+        if not self.opts.get('fileserver_maintain_list_cache'):
+            return
+        if now - self.list_cache_time < self.opts.get('fileserver_list_cache_time', 20):
+            return
+        self.list_cache_time = now
+        try:
+            self.fileserver.update_file_list_caches()
+        except Exception as exc:
+            log.error(
+                'Exception {0} occurred while rebuilding the file list '
+                'caches'.format(exc),
+                exc_info_on_loglevel=logging.DEBUG
+            )
+
     def handle_search(self, now, last):
         '''
         Update the search index
@@ -969,6 +1007,7 @@ class AESFuncs(object):
         '''
         self.fs_ = salt.fileserver.Fileserver(self.opts)
         self._serve_file = self.fs_.serve_file
+        self._file_archive = self.fs_.file_archive
         self._file_find = self.fs_._find_file
         self._file_hash = self.fs_.file_hash
         self._file_list = self.fs_.file_list
@@ -1342,8 +1381,50 @@ class AESFuncs(object):
                                        {'grains': load['grains'],
                                         'pillar': data})
             self.event.fire_event({'Minion data cache refresh': load['id']}, tagify(load['id'], 'refresh', 'minion'))
+        if self.opts.get('pillar_delta', False) and 'pillar_hash' in load:
+            return self._pillar_delta(load, data)
         return data
 
+    def _pillar_delta(self, load, data):
+        '''
+        Return the changes to the pillar the minion has, which it sent the
+        hash of, or the whole pillar if the master does not have that pillar
+
+        :param dict load: Minion payload
+        :param dict data: The pillar data for the minion
+
+        :rtype: dict
+        :return: The changes to the pillar data or the pillar data
+        '''
+        new_hash = salt.pillar.pillar_hash(data)
+        if new_hash is None:
+            return data
+        base_hash = load['pillar_hash']
+        bank = 'pillar_delta/{0}'.format(load['id'])
+        cache = self.masterapi.cache
+        base = None
+        try:
+            versions = cache.fetch(bank, 'versions') or []
+            if base_hash == new_hash:
+                base = data
+            elif base_hash in versions:
+                base = cache.fetch(bank, base_hash)
+            if new_hash not in versions:
+                cache.store(bank, new_hash, data)
+            versions = [ver for ver in versions if ver != new_hash] + [new_hash]
+            for ver in versions[:-salt.pillar.PILLAR_DELTA_VERSIONS]:
+                cache.flush(bank, ver)
+            cache.store(bank, 'versions', versions[-salt.pillar.PILLAR_DELTA_VERSIONS:])
+        except salt.exceptions.SaltCacheError as exc:
+            log.error('Unable to cache the pillar of {0}: {1}'.format(load['id'], exc))
+        if not isinstance(base, dict):
+            return data
+        changed, removed = salt.pillar.pillar_delta(base, data)
+        return {salt.pillar.PILLAR_DELTA_KEY: {'base': base_hash,
+                                               'hash': new_hash,
+                                               'set': changed,
+                                               'del': removed}}
+
     def _minion_event(self, load):
         '''
         Receive an event from the minion and fire it on the master event
@@ -1370,6 +1451,10 @@ class AESFuncs(object):
                 .format(minion=id_, data=load['data']['message'])
             )
 
+        if isinstance(load.get('data'), dict) and 'state_tag' in load['data']:
+            # A state result streamed during a state run
+            salt.utils.job.store_state_stream(self.opts, load)
+
         for event in load.get('events', []):
             event_data = event.get('data', {})
             if 'minions' in event_data:
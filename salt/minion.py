@@ -15,7 +15,9 @@ import fnmatch
 import logging
 import threading
 import traceback
+import datetime
 import contextlib
+import collections
 import multiprocessing
 from random import randint, shuffle
 from stat import S_IMODE
@@ -86,6 +88,7 @@ import salt.utils
 import salt.utils.dictupdate
 import salt.utils.context
 import salt.utils.jid
+import salt.utils.job
 import salt.pillar
 import salt.utils.args
 import salt.utils.event
@@ -121,9 +124,14 @@ from salt.exceptions import (
 
 import tornado.gen  # pylint: disable=F0401
 import tornado.ioloop  # pylint: disable=F0401
+import tornado.locks  # pylint: disable=F0401
 
 log = logging.getLogger(__name__)
 
+# Seconds a job started by the minion is counted towards process_count_max
+# while its proc file has not been written yet
+PROCESS_COUNT_GRACE = 5
+
 # To set up a minion:
 # 1. Read in the configuration
 # 2. Generate the function mapping dict
@@ -948,6 +956,11 @@ class Minion(MinionBase):
         self.ready = False
         self.jid_queue = jid_queue
         self.periodic_callbacks = {}
+        # Jobs waiting for a free process_count_max slot, in arrival order,
+        # and the jobs started while they may not be listed as running yet
+        self.process_count_waiting = collections.deque()
+        self.process_count_started = {}
+        self.process_count_cond = tornado.locks.Condition()
 
         if io_loop is None:
             if HAS_ZMQ:
@@ -1201,10 +1214,15 @@ class Minion(MinionBase):
             mod_opts[key] = val
         return mod_opts
 
-    def _load_modules(self, force_refresh=False, notify=False, grains=None):
+    def _load_modules(self, force_refresh=False, notify=False, grains=None,
+                      preload_modules=True):
         '''
         Return the functions and the returners loaded up from the loader
         module
+
+        ``preload_modules`` is set to False when the modules are loaded
+        inside of a job process, where preloading
+        :conf_minion:`minion_preload_modules` would only slow the job down.
         '''
         # if this is a *nix system AND modules_max_memory is set, lets enforce
         # a memory limit on module imports
@@ -1245,6 +1263,14 @@ class Minion(MinionBase):
             errors = functions['_errors']
             functions.pop('_errors')
 
+        preload = self.opts.get('minion_preload_modules')
+        if preload and preload_modules and not salt.utils.is_windows():
+            # Job processes are forked from this one, so anything loaded here
+            # is shared with them instead of being imported once per job.
+            # Windows spawns job processes, which would each load them again.
+            log.debug('Preloading minion modules: {0}'.format(preload))
+            functions.preload(preload)
+
         # we're done, reset the limits!
         if modules_max_memory is True:
             resource.setrlimit(resource.RLIMIT_AS, old_mem_limit)
@@ -1300,6 +1326,7 @@ class Minion(MinionBase):
                 self._send_req_async(load, timeout, callback=lambda f: None)  # pylint: disable=unexpected-keyword-arg
         return True
 
+    @tornado.gen.coroutine
     def _handle_decoded_payload(self, data):
         '''
         Override this method if you wish to handle the decoded data
@@ -1326,6 +1353,38 @@ class Minion(MinionBase):
                 if len(self.jid_queue) > self.opts['minion_jid_queue_hwm']:
                     self.jid_queue.pop(0)
 
+        process_count_max = self.opts.get('process_count_max', -1)
+        if process_count_max > 0 and \
+                data['fun'] not in self.opts.get('process_count_max_exempt', []):
+            self.process_count_waiting.append(data['jid'])
+            try:
+                process_count = self._process_count()
+                if process_count >= process_count_max or \
+                        self.process_count_waiting[0] != data['jid']:
+                    # Let the master know this job is waiting for a free slot
+                    log.warning('Maximum number of processes ({0}) reached '
+                                'while executing jid {1}, waiting...'.format(
+                                    process_count_max, data['jid']))
+                    self._fire_master(
+                        {'jid': data['jid'],
+                         'fun': data['fun'],
+                         'running': process_count,
+                         'process_count_max': process_count_max},
+                        tagify([self.opts['id'], 'job', 'queued'], 'minion'),
+                        sync=False
+                    )
+                # Jobs are started in the order they arrived, the finished
+                # jobs are not announced so the proc files are polled
+                while self.process_count_waiting[0] != data['jid'] or \
+                        self._process_count() >= process_count_max:
+                    yield self.process_count_cond.wait(
+                        timeout=datetime.timedelta(seconds=1))
+            finally:
+                self.process_count_waiting.remove(data['jid'])
+            self.process_count_started[data['jid']] = time.time()
+            # Let the next waiting job check for a free slot right away
+            self.process_count_cond.notify_all()
+
         if isinstance(data['fun'], six.string_types):
             if data['fun'] == 'sys.reload_modules':
                 self.functions, self.returners, self.function_errors, self.executors = self._load_modules()
@@ -1368,6 +1427,19 @@ class Minion(MinionBase):
         else:
             self.win_proc.append(process)
 
+    def _process_count(self):
+        '''
+        Return the number of jobs counted towards process_count_max, which
+        includes the jobs started by this minion that are not listed by
+        salt.utils.minion.running yet
+        '''
+        running = set(job['jid'] for job in salt.utils.minion.running(self.opts))
+        now = time.time()
+        for jid, started in list(self.process_count_started.items()):
+            if jid in running or now - started > PROCESS_COUNT_GRACE:
+                del self.process_count_started[jid]
+        return len(running) + len(self.process_count_started)
+
     def ctx(self):
         '''Return a single context manager for the minion's data
         '''
@@ -1391,7 +1463,8 @@ class Minion(MinionBase):
             minion_instance.connected = connected
             if not hasattr(minion_instance, 'functions'):
                 functions, returners, function_errors, executors = (
-                    minion_instance._load_modules(grains=opts['grains'])
+                    minion_instance._load_modules(grains=opts['grains'],
+                                                  preload_modules=False)
                     )
                 minion_instance.functions = functions
                 minion_instance.returners = returners
@@ -1730,6 +1803,16 @@ class Minion(MinionBase):
                     'id': self.opts['id']}
             for key, value in six.iteritems(ret):
                 load[key] = value
+            if self.opts.get('state_stream_returns', False):
+                # Leave out the state results the master already received
+                load['return'] = salt.utils.job.compact_state_return(
+                    load.get('return'))
+            compact = self.opts.get('state_compact_returns', False)
+            if compact:
+                load['return'] = salt.utils.job.compress_state_return(
+                    self.opts,
+                    load.get('return'),
+                    compression=compact if isinstance(compact, six.string_types) else None)
 
         if 'out' in ret:
             if isinstance(ret['out'], six.string_types):
@@ -465,6 +465,16 @@ def apply_(mods=None,
 
             salt '*' state.apply localconfig=/path/to/minion.yml
 
+    verify
+        Set to ``full`` to check all states, including the states which the
+        :conf_minion:`state_journal` would skip.
+
+        .. versionadded:: Nitrogen
+
+        .. code-block:: bash
+
+            salt '*' state.apply verify=full
+
 
     .. rubric:: APPLYING INDIVIDUAL SLS FILES (A.K.A. :py:func:`STATE.SLS <salt.modules.state.sls>`)
 
@@ -541,6 +551,12 @@ def apply_(mods=None,
         .. code-block:: bash
 
             salt '*' state.apply test localconfig=/path/to/minion.yml
+
+    verify
+        Set to ``full`` to check all states, including the states which the
+        :conf_minion:`state_journal` would skip.
+
+        .. versionadded:: Nitrogen
     '''
     if mods:
         return sls(mods, **kwargs)
@@ -755,6 +771,13 @@ def highstate(test=None,
 
         .. versionadded:: 2015.8.4
 
+    verify
+        Set to ``full`` to check all states, including the states which the
+        :conf_minion:`state_journal` would skip because they are unchanged
+        since they last succeeded.
+
+        .. versionadded:: Nitrogen
+
     CLI Examples:
 
     .. code-block:: bash
@@ -784,6 +807,7 @@ def highstate(test=None,
     opts = _get_opts(kwargs.get('localconfig'))
 
     opts['test'] = _get_test_value(test, **kwargs)
+    opts['state_verify'] = kwargs.get('verify')
 
     if 'env' in kwargs:
         salt.utils.warn_until(
@@ -939,6 +963,13 @@ def sls(mods,
 
         .. versionadded:: 2015.8.4
 
+    verify
+        Set to ``full`` to check all states, including the states which the
+        :conf_minion:`state_journal` would skip because they are unchanged
+        since they last succeeded.
+
+        .. versionadded:: Nitrogen
+
     CLI Example:
 
     .. code-block:: bash
@@ -1001,6 +1032,7 @@ def sls(mods,
     opts = _get_opts(kwargs.get('localconfig'))
 
     opts['test'] = _get_test_value(test, **kwargs)
+    opts['state_verify'] = kwargs.get('verify')
 
     pillar = kwargs.get('pillar')
     pillar_enc = kwargs.get('pillar_enc')
@@ -1146,6 +1178,7 @@ def top(topfn,
     orig_test = __opts__.get('test', None)
     opts = _get_opts(kwargs.get('localconfig'))
     opts['test'] = _get_test_value(test, **kwargs)
+    opts['state_verify'] = kwargs.get('verify')
 
     if saltenv is not None:
         opts['environment'] = saltenv
@@ -1327,6 +1360,7 @@ def sls_id(
     orig_test = __opts__.get('test', None)
     opts = _get_opts(kwargs.get('localconfig'))
     opts['test'] = _get_test_value(test, **kwargs)
+    opts['state_verify'] = kwargs.get('verify')
     opts['environment'] = saltenv
     if pillarenv is not None:
         opts['pillarenv'] = pillarenv
@@ -37,6 +37,9 @@ LOCAL_CONFIG_PATH = '/etc/systemd/system'
 INITSCRIPT_PATH = '/etc/init.d'
 VALID_UNIT_TYPES = ('service', 'socket', 'device', 'mount', 'automount',
                     'swap', 'target', 'path', 'timer')
+# The unit properties read by snapshot()
+SNAPSHOT_PROPERTIES = ('LoadState', 'ActiveState', 'UnitFileState',
+                       'NeedDaemonReload')
 
 # Define the module's virtual name
 __virtualname__ = 'service'
@@ -75,6 +78,9 @@ def _check_available(name):
     '''
     Returns boolean telling whether or not the named service is available
     '''
+    load_state = _get_snapshot(name).pop('LoadState', None)
+    if load_state is not None:
+        return load_state != 'not-found'
     _status = _systemctl_status(name)
     sd_version = salt.utils.systemd.version(__context__)
     if sd_version is not None and sd_version >= 231:
@@ -111,7 +117,17 @@ def _check_for_unit_changes(name):
     '''
     contextkey = 'systemd._check_for_unit_changes.{0}'.format(name)
     if contextkey not in __context__:
-        if _untracked_custom_unit_found(name) or _unit_file_changed(name):
+        unit = _get_snapshot(name)
+        if 'NeedDaemonReload' in unit:
+            unit_path = os.path.join(LOCAL_CONFIG_PATH,
+                                     _canonical_unit_name(name))
+            changed = unit.pop('NeedDaemonReload') == 'yes' \
+                or (unit.get('LoadState') == 'not-found'
+                    and os.access(unit_path, os.R_OK))
+        else:
+            changed = _untracked_custom_unit_found(name) \
+                or _unit_file_changed(name)
+        if changed:
             systemctl_reload()
         # Set context key to avoid repeating this check
         __context__[contextkey] = True
@@ -126,12 +142,20 @@ def _clear_context():
     for key in list(__context__):
         try:
             if key.startswith('systemd._systemctl_status.') \
-                    or key in ('systemd.systemd_services',):
+                    or key in ('systemd.systemd_services', 'systemd.snapshot'):
                 __context__.pop(key)
         except AttributeError:
             continue
 
 
+def _clear_snapshot():
+    '''
+    Remove the unit states read by snapshot(), they are out of date as soon as
+    a unit is changed
+    '''
+    __context__.pop('systemd.snapshot', None)
+
+
 def _default_runlevel():
     '''
     Try to figure out the default runlevel.  It is kept in
@@ -198,6 +222,16 @@ def _get_systemd_services():
     return ret
 
 
+def _get_snapshot(name):
+    '''
+    Return the properties of the named unit which were read by snapshot() and
+    have not been used yet. Every property is only used once, so a unit which
+    is checked again after it was changed is queried through systemctl.
+    '''
+    return __context__.get('systemd.snapshot', {}).get(
+        _canonical_unit_name(name), {})
+
+
 def _get_sysv_services():
     '''
     Use os.listdir() and os.access() to get all the initscripts
@@ -610,6 +644,7 @@ def unmask(name, runtime=False):
         salt '*' service.unmask foo runtime=True
     '''
     _check_for_unit_changes(name)
+    _clear_snapshot()
     if not masked(name, runtime):
         log.debug('Service \'%s\' is not %smasked',
                   name, 'runtime-' if runtime else '')
@@ -655,6 +690,7 @@ def mask(name, runtime=False):
         salt '*' service.mask foo runtime=True
     '''
     _check_for_unit_changes(name)
+    _clear_snapshot()
 
     cmd = 'mask --runtime' if runtime else 'mask'
     out = __salt__['cmd.run_all'](_systemctl_cmd(cmd, name, systemd_scope=True),
@@ -753,6 +789,7 @@ def start(name):
         salt '*' service.start <service name>
     '''
     _check_for_unit_changes(name)
+    _clear_snapshot()
     unmask(name)
     return __salt__['cmd.retcode'](
         _systemctl_cmd('start', name, systemd_scope=True),
@@ -781,6 +818,7 @@ def stop(name):
         salt '*' service.stop <service name>
     '''
     _check_for_unit_changes(name)
+    _clear_snapshot()
     return __salt__['cmd.retcode'](
         _systemctl_cmd('stop', name, systemd_scope=True),
         python_shell=False) == 0
@@ -808,6 +846,7 @@ def restart(name):
         salt '*' service.restart <service name>
     '''
     _check_for_unit_changes(name)
+    _clear_snapshot()
     unmask(name)
     return __salt__['cmd.retcode'](
         _systemctl_cmd('restart', name, systemd_scope=True),
@@ -836,6 +875,7 @@ def reload_(name):
         salt '*' service.reload <service name>
     '''
     _check_for_unit_changes(name)
+    _clear_snapshot()
     unmask(name)
     return __salt__['cmd.retcode'](
         _systemctl_cmd('reload', name, systemd_scope=True),
@@ -866,6 +906,7 @@ def force_reload(name):
         salt '*' service.force_reload <service name>
     '''
     _check_for_unit_changes(name)
+    _clear_snapshot()
     unmask(name)
     return __salt__['cmd.retcode'](
         _systemctl_cmd('force-reload', name, systemd_scope=True),
@@ -886,6 +927,9 @@ def status(name, sig=None):  # pylint: disable=unused-argument
         salt '*' service.status <service name>
     '''
     _check_for_unit_changes(name)
+    active_state = _get_snapshot(name).pop('ActiveState', None)
+    if active_state is not None:
+        return active_state in ('active', 'reloading')
     return __salt__['cmd.retcode'](_systemctl_cmd('is-active', name),
                                    python_shell=False,
                                    ignore_retcode=True) == 0
@@ -915,6 +959,7 @@ def enable(name, **kwargs):  # pylint: disable=unused-argument
         salt '*' service.enable <service name>
     '''
     _check_for_unit_changes(name)
+    _clear_snapshot()
     unmask(name)
     if name in _get_sysv_services():
         cmd = []
@@ -959,6 +1004,7 @@ def disable(name, **kwargs):  # pylint: disable=unused-argument
         salt '*' service.disable <service name>
     '''
     _check_for_unit_changes(name)
+    _clear_snapshot()
     if name in _get_sysv_services():
         cmd = []
         if salt.utils.systemd.has_scope(__context__) \
@@ -990,6 +1036,9 @@ def enabled(name, **kwargs):  # pylint: disable=unused-argument
 
         salt '*' service.enabled <service name>
     '''
+    if _get_snapshot(name).pop('UnitFileState', None) in ('enabled',
+                                                         'enabled-runtime'):
+        return True
     # Try 'systemctl is-enabled' first, then look for a symlink created by
     # systemctl (older systemd releases did not support using is-enabled to
     # check templated services), and lastly check for a sysvinit service.
@@ -1026,6 +1075,65 @@ def disabled(name):
     return not enabled(name)
 
 
+def snapshot(names):
+    '''
+    .. versionadded:: Nitrogen
+
+    Read the state of several units with a single ``systemctl show`` call.
+    :py:func:`available <salt.modules.systemd.available>`,
+    :py:func:`status <salt.modules.systemd.status>` and
+    :py:func:`enabled <salt.modules.systemd.enabled>` answer the next check of
+    each of the units from the snapshot instead of running systemctl, until
+    a unit is changed through this module. This is used by the aggregation of
+    the :mod:`service <salt.states.service>` states, the snapshot is dropped
+    at the end of the state run. Calling this function without units drops
+    the snapshot.
+
+    Returns a dictionary of the properties read for each unit.
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt '*' service.snapshot nginx,sshd
+    '''
+    _clear_snapshot()
+    if isinstance(names, six.string_types):
+        names = names.split(',')
+    units = []
+    for name in names:
+        unit = _canonical_unit_name(name)
+        if unit not in units:
+            units.append(unit)
+    if not units:
+        return {}
+    cmd = _systemctl_cmd(
+        ['show'] + ['--property={0}'.format(x) for x in SNAPSHOT_PROPERTIES]
+    )
+    out = __salt__['cmd.run_all'](cmd + units,
+                                  python_shell=False,
+                                  ignore_retcode=True)
+    if out['retcode'] != 0:
+        log.debug('Unable to read the state of units %s: %s',
+                  ', '.join(units), out['stderr'])
+        return {}
+    # One block of properties is printed per unit, in the order the units
+    # were passed, separated by empty lines
+    blocks = re.split(r'\n\s*\n', out['stdout'].strip())
+    if len(blocks) != len(units):
+        log.debug('Unexpected output of systemctl show: %s', out['stdout'])
+        return {}
+    ret = {}
+    for unit, block in zip(units, blocks):
+        ret[unit] = {}
+        for line in salt.utils.itertools.split(block, '\n'):
+            prop, sep, value = line.partition('=')
+            if sep:
+                ret[unit][prop.strip()] = value.strip()
+    __context__['systemd.snapshot'] = copy.deepcopy(ret)
+    return ret
+
+
 def show(name):
     '''
     .. versionadded:: 2014.7.0
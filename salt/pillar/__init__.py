@@ -6,9 +6,13 @@ Render the pillar data
 # Import python libs
 from __future__ import absolute_import
 import copy
+import hashlib
+import json
 import os
 import collections
 import logging
+import threading
+import time
 import tornado.gen
 
 # Import salt libs
@@ -17,10 +21,12 @@ import salt.fileclient
 import salt.minion
 import salt.crypt
 import salt.transport
+import salt.utils
 import salt.utils.url
 import salt.utils.cache
+import salt.utils.templates
 from salt.exceptions import SaltClientError
-from salt.template import compile_template
+from salt.template import compile_template, template_shebang
 from salt.utils.dictupdate import merge
 from salt.utils.odict import OrderedDict
 from salt.version import __version__
@@ -28,9 +34,43 @@ from salt.utils.locales import decode_recursively
 
 # Import 3rd-party libs
 import salt.ext.six as six
+from salt.ext.six.moves import queue  # pylint: disable=import-error
 
 log = logging.getLogger(__name__)
 
+# The number of seconds the revision of the pillar sources is reused for by
+# the pillar cache before the pillar_roots are checked for changes again
+SOURCE_REVISION_TTL = 5
+
+# The renderers and the context variables the pillar render cache supports.
+# A pillar SLS file which reads any other variable, such as grains, pillar or
+# salt, depends on the minion and is rendered for each of them.
+RENDER_CACHE_RENDERERS = frozenset(['jinja', 'yaml', 'json'])
+RENDER_CACHE_CONTEXT = frozenset([
+    'saltenv', 'sls', 'slspath', 'sls_path', 'slsdotpath', 'slscolonpath',
+    'tplpath', 'tplfile', 'tpldir', 'tpldot', 'odict', 'range', 'dict',
+    'cycler', 'joiner',
+])
+# The number of rendered pillar SLS files kept by the render cache
+RENDER_CACHE_SIZE = 1000
+# The rendered SLS files shared by the minions, and the files each of them
+# was rendered from, keyed by path and checked against their size and mtime
+_RENDER_CACHE = OrderedDict()
+_RENDER_DEPS = {}
+
+# The threads of the external pillar calls which timed out and are still
+# running, by source. The source is skipped until its call returns, so that a
+# source which hangs does not leak a thread on every pillar compile.
+_TIMED_OUT_EXT_PILLARS = {}
+_TIMED_OUT_EXT_PILLARS_LOCK = threading.Lock()
+
+# The key of the master reply which holds the changes to the pillar of the
+# minion, instead of the whole pillar
+PILLAR_DELTA_KEY = '__pillar_delta__'
+# The number of pillars sent to each minion which the master keeps to compute
+# the changes against
+PILLAR_DELTA_VERSIONS = 3
+
 
 def get_pillar(opts, grains, minion_id, saltenv=None, ext=None, funcs=None,
                pillar=None, pillarenv=None, rend=None):
@@ -47,7 +87,7 @@ def get_pillar(opts, grains, minion_id, saltenv=None, ext=None, funcs=None,
         log.info('Compiling pillar from cache')
         log.debug('get_pillar using pillar cache with ext: {0}'.format(ext))
         return PillarCache(opts, grains, minion_id, saltenv, ext=ext, functions=funcs,
-                pillar=pillar, pillarenv=pillarenv)
+                pillar=pillar, pillarenv=pillarenv, rend=rend)
     return ptype(opts, grains, minion_id, saltenv, ext, functions=funcs,
                  pillar=pillar, pillarenv=pillarenv, rend=rend)
 
@@ -66,6 +106,102 @@ def get_async_pillar(opts, grains, minion_id, saltenv=None, ext=None, funcs=None
                  pillar=pillar, pillarenv=pillarenv)
 
 
+def pillar_hash(pillar):
+    '''
+    Return a digest of the pillar data which is the same on the master and on
+    the minion it was sent to, or None if the data cannot be hashed
+    '''
+    try:
+        data = json.dumps(pillar, sort_keys=True, default=repr)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        return None
+    return hashlib.sha256(salt.utils.to_bytes(data)).hexdigest()
+
+
+def pillar_delta(old, new):
+    '''
+    Return the changes which turn the old pillar into the new one, as a list
+    of the ``[path, value]`` pairs which were set and a list of the paths
+    which were removed. Nested dicts are compared key by key, any other value
+    which changed is replaced.
+    '''
+    changed = []
+    removed = []
+    stack = [([], old, new)]
+    while stack:
+        path, old_, new_ = stack.pop()
+        for key, val in six.iteritems(new_):
+            if key not in old_:
+                changed.append([path + [key], val])
+            elif old_[key] != val:
+                if isinstance(val, dict) and isinstance(old_[key], dict):
+                    stack.append((path + [key], old_[key], val))
+                else:
+                    changed.append([path + [key], val])
+        removed.extend(path + [key] for key in old_ if key not in new_)
+    return changed, removed
+
+
+def apply_pillar_delta(pillar, changed, removed):
+    '''
+    Return a copy of the pillar with the changes returned by pillar_delta
+    applied. Only the dicts along the changed paths are copied, the rest of
+    the data is shared with the original pillar.
+    '''
+    ret = copy.copy(pillar)
+    copied = set([id(ret)])
+
+    def _parent(path):
+        node = ret
+        for key in path[:-1]:
+            child = node[key]
+            if id(child) not in copied:
+                child = copy.copy(child)
+                copied.add(id(child))
+                node[key] = child
+            node = child
+        return node
+
+    for path in removed:
+        _parent(path).pop(path[-1], None)
+    for path, val in changed:
+        _parent(path)[path[-1]] = val
+    return ret
+
+
+def _pillar_delta_base(opts):
+    '''
+    Return the pillar of the minion which the master is asked to send the
+    changes against, and its hash
+    '''
+    if not opts.get('pillar_delta', False):
+        return None, None
+    base = opts.get('pillar')
+    if not isinstance(base, dict) or not base:
+        return None, None
+    return base, pillar_hash(base)
+
+
+def _pillar_from_delta(ret_pillar, base, base_hash):
+    '''
+    Return the pillar from a master reply which holds the changes against the
+    base pillar, or None if the reply holds the whole pillar
+    '''
+    if not isinstance(ret_pillar, dict) or list(ret_pillar) != [PILLAR_DELTA_KEY]:
+        return None
+    delta = ret_pillar[PILLAR_DELTA_KEY]
+    if base is None or delta.get('base') != base_hash:
+        raise SaltClientError(
+            'Got the changes to an unknown pillar from the master'
+        )
+    log.debug(
+        'Applying {0} changed and {1} removed pillar keys from the master'.format(
+            len(delta['set']), len(delta['del'])
+        )
+    )
+    return apply_pillar_delta(base, delta['set'], delta['del'])
+
+
 class AsyncRemotePillar(object):
     '''
     Get the pillar from the master
@@ -105,6 +241,9 @@ class AsyncRemotePillar(object):
                 'cmd': '_pillar'}
         if self.ext:
             load['ext'] = self.ext
+        base, base_hash = _pillar_delta_base(self.opts)
+        if self.opts.get('pillar_delta', False):
+            load['pillar_hash'] = base_hash
         try:
             ret_pillar = yield self.channel.crypted_transfer_decode_dictentry(
                 load,
@@ -114,6 +253,9 @@ class AsyncRemotePillar(object):
             log.exception('Exception getting pillar:')
             raise SaltClientError('Exception getting pillar.')
 
+        pillar = _pillar_from_delta(ret_pillar, base, base_hash)
+        if pillar is not None:
+            raise tornado.gen.Return(pillar)
         if not isinstance(ret_pillar, dict):
             msg = ('Got a bad pillar from master, type {0}, expecting dict: '
                    '{1}').format(type(ret_pillar).__name__, ret_pillar)
@@ -161,10 +303,16 @@ class RemotePillar(object):
                 'cmd': '_pillar'}
         if self.ext:
             load['ext'] = self.ext
+        base, base_hash = _pillar_delta_base(self.opts)
+        if self.opts.get('pillar_delta', False):
+            load['pillar_hash'] = base_hash
         ret_pillar = self.channel.crypted_transfer_decode_dictentry(load,
                                                                     dictkey='pillar',
                                                                     )
 
+        if isinstance(ret_pillar, dict) and list(ret_pillar) == [PILLAR_DELTA_KEY]:
+            # Only the changes need to be decoded, the base already was
+            return _pillar_from_delta(decode_recursively(ret_pillar), base, base_hash)
         if not isinstance(ret_pillar, dict):
             log.error(
                 'Got a bad pillar from master, type {0}, expecting dict: '
@@ -178,19 +326,34 @@ class PillarCache(object):
     '''
     Return a cached pillar if it exists, otherwise cache it.
 
-    Pillar caches are structed in two diminensions: minion_id with a dict of saltenvs.
-    Each saltenv contains a pillar dict
+    Pillar caches are structed in two diminensions: minion_id with a dict of
+    saltenv and pillarenv pairs. Each pair contains the compiled pillar, the
+    time it was compiled and the fingerprint of the inputs it was compiled
+    from. A cached pillar is compiled again once it is older than
+    ``pillar_cache_ttl``, or when its fingerprint changed: the grains or the
+    pillar override sent by the minion, or the files in the pillar_roots and
+    git_pillar checkouts.
 
     Example data structure:
 
     ```
     {'minion_1':
-        {'base': {'pilar_key_1' 'pillar_val_1'}
+        {'base:None': {'pillar': {'pillar_key_1' 'pillar_val_1'},
+                       'time': 1476871200.0,
+                       'fingerprint': {'grains': '...', ...}}
     }
     '''
+    # Hits and misses of the cache in this process, by reason
+    stats = collections.defaultdict(int)
+    # The memory backend is shared by all of the requests of this process
+    _memory_cache = None
+    # The revisions of the pillar sources, checked at most every
+    # SOURCE_REVISION_TTL seconds
+    _source_revisions = {}
+
     # TODO ABC?
     def __init__(self, opts, grains, minion_id, saltenv, ext=None, functions=None,
-            pillar=None, pillarenv=None):
+            pillar=None, pillarenv=None, rend=None):
         # Yes, we need all of these because we need to route to the Pillar object
         # if we have no cache. This is another refactor target.
 
@@ -202,6 +365,7 @@ class PillarCache(object):
         self.functions = functions
         self.pillar = pillar
         self.pillarenv = pillarenv
+        self.rend = rend
 
         if saltenv is None:
             self.saltenv = 'base'
@@ -209,10 +373,17 @@ class PillarCache(object):
             self.saltenv = saltenv
 
         # Determine caching backend
-        self.cache = salt.utils.cache.CacheFactory.factory(
-                self.opts['pillar_cache_backend'],
-                self.opts['pillar_cache_ttl'],
-                minion_cache_path=self._minion_cache_path(minion_id))
+        if self.opts['pillar_cache_backend'] == 'memory':
+            if PillarCache._memory_cache is None:
+                PillarCache._memory_cache = salt.utils.cache.CacheFactory.factory(
+                        'memory',
+                        self.opts['pillar_cache_ttl'])
+            self.cache = PillarCache._memory_cache
+        else:
+            self.cache = salt.utils.cache.CacheFactory.factory(
+                    self.opts['pillar_cache_backend'],
+                    self.opts['pillar_cache_ttl'],
+                    minion_cache_path=self._minion_cache_path(minion_id))
 
     def _minion_cache_path(self, minion_id):
         '''
@@ -235,32 +406,118 @@ class PillarCache(object):
                                  ext=self.ext,
                                  functions=self.functions,
                                  pillar=self.pillar,
-                                 pillarenv=self.pillarenv)
+                                 pillarenv=self.pillarenv,
+                                 rend=self.rend)
         return fresh_pillar.compile_pillar()  # FIXME We are not yet passing pillar_dirs in here
 
+    def _source_dirs(self):
+        '''
+        Return the directories holding the pillar SLS files
+        '''
+        if self.pillarenv:
+            dirs = list(self.opts['pillar_roots'].get(self.pillarenv, []))
+        else:
+            dirs = [path for paths in six.itervalues(self.opts['pillar_roots'])
+                    for path in paths]
+        if any('git' in run for run in self.opts.get('ext_pillar') or []
+               if isinstance(run, dict)):
+            dirs.append(os.path.join(self.opts['cachedir'], 'git_pillar'))
+        return sorted(set(dirs))
+
+    @classmethod
+    def source_revision(cls, dirs):
+        '''
+        Return a digest of the paths, sizes and modification times of the
+        files in the directories. The git metadata is left out, a checkout of
+        a new git_pillar revision changes the files themselves.
+        '''
+        key = tuple(dirs)
+        now = time.time()
+        cached = cls._source_revisions.get(key)
+        if cached and now - cached[0] < SOURCE_REVISION_TTL:
+            return cached[1]
+        digest = hashlib.sha1()
+        for source in dirs:
+            for root, subdirs, files in os.walk(source):
+                subdirs[:] = sorted(x for x in subdirs if x != '.git')
+                for name in sorted(files):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    digest.update(salt.utils.to_bytes(
+                        '{0}\0{1}\0{2!r}\0'.format(path, stat.st_size,
+                                                     stat.st_mtime)))
+        revision = digest.hexdigest()
+        cls._source_revisions[key] = (now, revision)
+        return revision
+
+    def fingerprint(self):
+        '''
+        Return the digests of the inputs the pillar is compiled from
+        '''
+        def _digest(data):
+            return hashlib.sha1(salt.utils.to_bytes(
+                json.dumps(data, sort_keys=True, default=repr))).hexdigest()
+        return {'grains': _digest(self.grains),
+                'pillar': _digest(self.pillar),
+                'ext': _digest([self.ext, self.opts.get('ext_pillar')]),
+                'sources': self.source_revision(self._source_dirs())}
+
     def compile_pillar(self, *args, **kwargs):  # Will likely just be pillar_dirs
         log.debug('Scanning pillar cache for information about minion {0} and saltenv {1}'.format(self.minion_id, self.saltenv))
-        log.debug('Scanning cache: {0}'.format(self.cache._dict))
+        key = '{0}:{1}'.format(self.saltenv, self.pillarenv)
+        fingerprint = self.fingerprint()
         # Check the cache!
+        entries = {}
         if self.minion_id in self.cache:  # Keyed by minion_id
-            # TODO Compare grains, etc?
-            if self.saltenv in self.cache[self.minion_id]:
-                # We have a cache hit! Send it back.
-                log.debug('Pillar cache hit for minion {0} and saltenv {1}'.format(self.minion_id, self.saltenv))
-                return self.cache[self.minion_id][self.saltenv]
-            else:
-                # We found the minion but not the env. Store it.
-                fresh_pillar = self.fetch_pillar()
-                self.cache[self.minion_id][self.saltenv] = fresh_pillar
-                log.debug('Pillar cache miss for saltenv {0} for minion {1}'.format(self.saltenv, self.minion_id))
-                return fresh_pillar
+            entries = self.cache[self.minion_id]
+        entry = entries.get(key)
+        if not isinstance(entry, dict) or 'fingerprint' not in entry:
+            reason = 'new'
+        elif time.time() - entry['time'] > self.opts['pillar_cache_ttl']:
+            reason = 'expired'
+        elif entry['fingerprint'] != fingerprint:
+            reason = 'changed'
         else:
-            # We haven't seen this minion yet in the cache. Store it.
-            fresh_pillar = self.fetch_pillar()
-            self.cache[self.minion_id] = {self.saltenv: fresh_pillar}
-            log.debug('Pillar cache miss for minion {0}'.format(self.minion_id))
-            log.debug('Current pillar cache: {0}'.format(self.cache._dict))  # FIXME hack!
-            return fresh_pillar
+            reason = 'hit'
+        self.stats[reason] += 1
+        if reason == 'hit':
+            # We have a cache hit! Send it back.
+            log.debug(
+                'Pillar cache hit for minion {0} and saltenv {1} ({2})'.format(
+                    self.minion_id, self.saltenv, self._stats_summary()))
+            return entry['pillar']
+        if reason == 'changed':
+            log.debug(
+                'Pillar cache entry for minion {0} and saltenv {1} is stale, '
+                'changed inputs: {2}'.format(
+                    self.minion_id, self.saltenv,
+                    ', '.join(sorted(name for name in fingerprint
+                                     if fingerprint[name] != entry['fingerprint'].get(name)))))
+        fresh_pillar = self.fetch_pillar()
+        entries[key] = {'pillar': fresh_pillar,
+                        'time': time.time(),
+                        'fingerprint': fingerprint}
+        # Store the entries again so that disk caches are written out
+        self.cache[self.minion_id] = entries
+        log.debug(
+            'Pillar cache miss ({0}) for minion {1} and saltenv {2} ({3})'.format(
+                reason, self.minion_id, self.saltenv, self._stats_summary()))
+        return fresh_pillar
+
+    def _stats_summary(self):
+        '''
+        Return the hit and miss counts of this process for the log
+        '''
+        misses = sum(count for reason, count in six.iteritems(self.stats)
+                     if reason != 'hit')
+        return 'hits: {0}, misses: {1}, {2}'.format(
+            self.stats.get('hit', 0),
+            misses,
+            ', '.join('{0}: {1}'.format(reason, self.stats.get(reason, 0))
+                      for reason in ('new', 'expired', 'changed')))
 
 
 class Pillar(object):
@@ -307,6 +564,8 @@ class Pillar(object):
             self.merge_strategy = opts['pillar_source_merging_strategy']
 
         self.ext_pillars = salt.loader.pillars(ext_pillar_opts, self.functions)
+        # The duration and error of each external pillar call
+        self.ext_pillar_stats = []
         self.ignored_pillars = {}
         self.pillar_override = {}
         if pillar is not None:
@@ -599,15 +858,7 @@ class Pillar(object):
                 return None, mods, errors
         state = None
         try:
-            state = compile_template(fn_,
-                                     self.rend,
-                                     self.opts['renderer'],
-                                     self.opts['renderer_blacklist'],
-                                     self.opts['renderer_whitelist'],
-                                     saltenv,
-                                     sls,
-                                     _pillar_rend=True,
-                                     **defaults)
+            state = self._render_template(fn_, saltenv, sls, defaults)
         except Exception as exc:
             msg = 'Rendering SLS \'{0}\' failed, render error:\n{1}'.format(
                 sls, exc
@@ -666,6 +917,128 @@ class Pillar(object):
                                     errors += err
         return state, mods, errors
 
+    def _render_template(self, fn_, saltenv, sls, defaults):
+        '''
+        Render a pillar SLS file. With ``pillar_render_cache`` enabled, the
+        rendered data of the files which do not depend on the minion is kept
+        and handed out to the other minions until the files change.
+        '''
+        key = None
+        if self.opts.get('pillar_render_cache', False):
+            try:
+                key = self._render_cache_key(fn_, saltenv, sls, defaults)
+            except Exception as exc:
+                log.debug(
+                    'Unable to determine the render cache key of pillar SLS '
+                    '{0}:{1}: {2}'.format(saltenv, sls, exc)
+                )
+        if key is not None and key in _RENDER_CACHE:
+            log.trace('Pillar SLS {0}:{1} found in the render cache'.format(saltenv, sls))
+            # Move the entry to the end, the oldest entries are evicted first
+            state = _RENDER_CACHE.pop(key)
+            _RENDER_CACHE[key] = state
+            # The state is merged into the pillar of the minion, which changes
+            # it in place
+            return copy.deepcopy(state)
+        state = compile_template(fn_,
+                                 self.rend,
+                                 self.opts['renderer'],
+                                 self.opts['renderer_blacklist'],
+                                 self.opts['renderer_whitelist'],
+                                 saltenv,
+                                 sls,
+                                 _pillar_rend=True,
+                                 **defaults)
+        if key is not None:
+            _RENDER_CACHE[key] = copy.deepcopy(state)
+            while len(_RENDER_CACHE) > RENDER_CACHE_SIZE:
+                _RENDER_CACHE.popitem(last=False)
+        return state
+
+    def _render_cache_key(self, fn_, saltenv, sls, defaults):
+        '''
+        Return the key under which the rendered data of a pillar SLS file is
+        cached, made of the SLS, the include defaults, and the sizes and mtimes
+        of the file and of the templates it imports or includes. Return None
+        if the rendered data depends on the minion.
+        '''
+        versions, variables = self._render_deps(fn_, saltenv)
+        if variables is None \
+                or not variables.issubset(RENDER_CACHE_CONTEXT.union(defaults)):
+            return None
+        return json.dumps([saltenv, sls, defaults, versions],
+                          sort_keys=True,
+                          default=repr)
+
+    @staticmethod
+    def _file_versions(paths):
+        '''
+        Return the paths with their sizes and mtimes
+        '''
+        versions = []
+        for path in paths:
+            stat = os.stat(path)
+            versions.append([path, stat.st_size, stat.st_mtime])
+        return versions
+
+    def _render_deps(self, fn_, saltenv):
+        '''
+        Return a tuple of the versions of the files the render of a pillar SLS
+        file reads, and of the context variables its templates read. The
+        variables are None if the file uses a renderer the render cache does
+        not support. The result is kept until one of the files changes.
+        '''
+        cached = _RENDER_DEPS.get(fn_)
+        if cached is not None:
+            try:
+                versions = self._file_versions(path for path, _, _ in cached[0])
+            except OSError:
+                versions = None
+            if versions == cached[0]:
+                return cached
+        with salt.utils.fopen(fn_, 'rb') as fp_:
+            source = fp_.read()
+        render_pipe = template_shebang(fn_,
+                                       self.rend,
+                                       self.opts['renderer'],
+                                       self.opts['renderer_blacklist'],
+                                       self.opts['renderer_whitelist'],
+                                       source.decode('utf-8'))
+        paths = [fn_]
+        variables = set()
+        renderers = []
+        for render, argline in render_pipe:
+            name = render.__module__.split('.')[-1]
+            if name not in RENDER_CACHE_RENDERERS or (name == 'yaml' and argline):
+                variables = None
+                break
+            renderers.append(name)
+        pending = [source] if variables is not None and 'jinja' in renderers else []
+        seen = set()
+        while pending:
+            tmpl_variables, references = \
+                salt.utils.templates.jinja_template_dependencies(pending.pop())
+            variables.update(tmpl_variables)
+            for ref in references:
+                path = None
+                if ref is not None and ref not in seen:
+                    seen.add(ref)
+                    path = self.client.cache_file(salt.utils.url.create(ref), saltenv)
+                    if not path:
+                        ref = None
+                if ref is None:
+                    # The template is chosen at render time, or is missing
+                    variables = None
+                    pending = []
+                    break
+                if path:
+                    paths.append(path)
+                    with salt.utils.fopen(path, 'rb') as fp_:
+                        pending.append(fp_.read())
+        deps = (self._file_versions(paths), variables)
+        _RENDER_DEPS[fn_] = deps
+        return deps
+
     def render_pillar(self, matches, errors=None):
         '''
         Extract the sls pillar files from the matches and render them into the
@@ -705,32 +1078,34 @@ class Pillar(object):
 
         return pillar, errors
 
-    def _external_pillar_data(self, pillar, val, pillar_dirs, key):
+    def _external_pillar_data(self, pillar, val, pillar_dirs, key, func=None):
         '''
         Builds actual pillar data structure and updates the ``pillar`` variable
         '''
         ext = None
+        if func is None:
+            func = self.ext_pillars[key]
 
         if isinstance(val, dict):
-            ext = self.ext_pillars[key](self.minion_id, pillar, **val)
+            ext = func(self.minion_id, pillar, **val)
         elif isinstance(val, list):
             if key == 'git':
-                ext = self.ext_pillars[key](self.minion_id,
-                                            val,
-                                            pillar_dirs)
+                ext = func(self.minion_id,
+                           val,
+                           pillar_dirs)
             else:
-                ext = self.ext_pillars[key](self.minion_id,
-                                            pillar,
-                                            *val)
+                ext = func(self.minion_id,
+                           pillar,
+                           *val)
         else:
             if key == 'git':
-                ext = self.ext_pillars[key](self.minion_id,
-                                            val,
-                                            pillar_dirs)
+                ext = func(self.minion_id,
+                           val,
+                           pillar_dirs)
             else:
-                ext = self.ext_pillars[key](self.minion_id,
-                                            pillar,
-                                            val)
+                ext = func(self.minion_id,
+                           pillar,
+                           val)
         return ext
 
     def ext_pillar(self, pillar, pillar_dirs, errors=None):
@@ -745,7 +1120,6 @@ class Pillar(object):
             errors.append('The "ext_pillar" option is malformed')
             log.critical(errors[-1])
             return pillar, errors
-        ext = None
         # Bring in CLI pillar data
         if self.pillar_override and isinstance(self.pillar_override, dict):
             pillar = merge(pillar,
@@ -754,6 +1128,7 @@ class Pillar(object):
                            self.opts.get('renderer', 'yaml'),
                            self.opts.get('pillar_merge_lists', False))
 
+        sources = []
         for run in self.opts['ext_pillar']:
             if not isinstance(run, dict):
                 errors.append('The "ext_pillar" option is malformed')
@@ -761,6 +1136,7 @@ class Pillar(object):
                 return {}, errors
             if next(six.iterkeys(run)) in self.opts.get('exclude_ext_pillar', []):
                 continue
+            run_sources = []
             for key, val in six.iteritems(run):
                 if key not in self.ext_pillars:
                     log.critical(
@@ -768,14 +1144,31 @@ class Pillar(object):
                         'unavailable'.format(key)
                     )
                     continue
-                try:
-                    ext = self._external_pillar_data(pillar,
-                                                        val,
-                                                        pillar_dirs,
-                                                        key)
-                except Exception as exc:
-                    errors.append('Failed to load ext_pillar {0}: {1}'.format(
-                        key, exc))
+                # The functions are loaded here, the loader is not safe to
+                # use from the threads the sources may run in
+                run_sources.append((key, val, self.ext_pillars[key]))
+            if run_sources:
+                sources.append(run_sources)
+
+        concurrency = self.opts.get('ext_pillar_concurrency', 1)
+        if concurrency > 1:
+            # All of the sources are passed the pillar as it is before any of
+            # them ran, their data is merged in the configured order
+            results = self._ext_pillars_concurrently(
+                [source for run_sources in sources for source in run_sources],
+                pillar, pillar_dirs, concurrency)
+        for run_sources in sources:
+            ext = None
+            for key, val, func in run_sources:
+                if concurrency > 1:
+                    result = results.pop(0)
+                else:
+                    result = self._run_ext_pillar(
+                        key, val, pillar, pillar_dirs, func,
+                        timeout=self._ext_pillar_source_opts(key)[0])
+                data = self._ext_pillar_result(key, result, errors)
+                if result['error'] is None:
+                    ext = data
             if ext:
                 pillar = merge(
                     pillar,
@@ -783,9 +1176,167 @@ class Pillar(object):
                     self.merge_strategy,
                     self.opts.get('renderer', 'yaml'),
                     self.opts.get('pillar_merge_lists', False))
-                ext = None
         return pillar, errors
 
+    def _ext_pillar_source_opts(self, key):
+        '''
+        Return the timeout and the failure policy of an external pillar
+        '''
+        source_opts = (self.opts.get('ext_pillar_source_opts') or {}).get(key) or {}
+        return (source_opts.get('timeout', self.opts.get('ext_pillar_timeout', 0)),
+                source_opts.get('on_error', 'fail'))
+
+    @staticmethod
+    def _ext_pillar_running(key):
+        '''
+        Return an error if a call to the external pillar timed out and is
+        still running
+        '''
+        with _TIMED_OUT_EXT_PILLARS_LOCK:
+            thread = _TIMED_OUT_EXT_PILLARS.get(key)
+            if thread is None:
+                return None
+            if not thread.is_alive():
+                _TIMED_OUT_EXT_PILLARS.pop(key)
+                return None
+        log.warning(
+            'Not calling ext_pillar {0}, a previous call timed out and is '
+            'still running'.format(key)
+        )
+        return 'a previous call timed out and is still running'
+
+    @staticmethod
+    def _ext_pillar_timed_out(key, thread, start, timeout):
+        '''
+        Record a call to an external pillar which timed out and return its
+        result
+        '''
+        with _TIMED_OUT_EXT_PILLARS_LOCK:
+            _TIMED_OUT_EXT_PILLARS[key] = thread
+        return {'ext': None,
+                'duration': time.time() - start,
+                'error': 'timed out after {0}s'.format(timeout)}
+
+    def _ext_pillar_thread(self, key, val, pillar, pillar_dirs, func, result,
+                           done=None):
+        '''
+        Return a thread which calls an external pillar, stores its result and
+        then calls done. The source gets its own copy of the pillar, as it may
+        change it.
+        '''
+        pillar = copy.deepcopy(pillar)
+
+        def _run():
+            try:
+                result.update(
+                    self._run_ext_pillar(key, val, pillar, pillar_dirs, func))
+            finally:
+                if done is not None:
+                    done()
+        thread = threading.Thread(target=_run)
+        thread.daemon = True
+        return thread
+
+    def _run_ext_pillar(self, key, val, pillar, pillar_dirs, func, timeout=0):
+        '''
+        Call an external pillar and return a dict with its data, the duration
+        of the call and the error it raised, if any. If timeout is set, the
+        call runs in a thread which is no longer waited for after timeout
+        seconds.
+        '''
+        if timeout:
+            error = self._ext_pillar_running(key)
+            if error:
+                return {'ext': None, 'duration': 0, 'error': error}
+            result = {}
+            thread = self._ext_pillar_thread(
+                key, val, pillar, pillar_dirs, func, result)
+            start = time.time()
+            thread.start()
+            thread.join(timeout)
+            if thread.is_alive():
+                return self._ext_pillar_timed_out(key, thread, start, timeout)
+            return result
+        result = {'ext': None, 'error': None}
+        start = time.time()
+        try:
+            result['ext'] = self._external_pillar_data(pillar,
+                                                       val,
+                                                       pillar_dirs,
+                                                       key,
+                                                       func)
+        except Exception as exc:
+            result['error'] = exc
+        result['duration'] = time.time() - start
+        return result
+
+    def _ext_pillars_concurrently(self, sources, pillar, pillar_dirs, concurrency):
+        '''
+        Call the external pillars in up to concurrency threads, give up on
+        the ones which take longer than their timeout. Return their results in
+        the order of the sources.
+        '''
+        results = [{} for _ in sources]
+        done = queue.Queue()
+        pending = list(range(len(sources)))
+        running = {}
+
+        while pending or running:
+            while pending and len(running) < concurrency:
+                idx = pending.pop(0)
+                key, val, func = sources[idx]
+                error = self._ext_pillar_running(key)
+                if error:
+                    results[idx] = {'ext': None, 'duration': 0, 'error': error}
+                    continue
+                thread = self._ext_pillar_thread(
+                    key, val, pillar, pillar_dirs, func, results[idx],
+                    done=lambda idx=idx: done.put(idx))
+                thread.start()
+                timeout = self._ext_pillar_source_opts(key)[0]
+                running[idx] = (time.time(), timeout, thread)
+            if not running:
+                break
+            deadlines = [start + timeout for start, timeout, _ in
+                         six.itervalues(running) if timeout]
+            wait = max(0, min(deadlines) - time.time()) if deadlines else None
+            try:
+                running.pop(done.get(timeout=wait), None)
+            except queue.Empty:
+                now = time.time()
+                for idx, (start, timeout, thread) in list(running.items()):
+                    if timeout and now - start >= timeout:
+                        # The thread no longer writes to the returned results
+                        results[idx] = self._ext_pillar_timed_out(
+                            sources[idx][0], thread, start, timeout)
+                        running.pop(idx)
+        return [dict(result) for result in results]
+
+    def _ext_pillar_result(self, key, result, errors):
+        '''
+        Record the timing of an external pillar and apply its failure policy,
+        return its data
+        '''
+        self.ext_pillar_stats.append({'name': key,
+                                      'duration': result['duration'],
+                                      'error': result['error']})
+        log.debug(
+            'ext_pillar {0} for minion {1} took {2:.3f}s{3}'.format(
+                key, self.minion_id, result['duration'],
+                ' ({0})'.format(result['error']) if result['error'] else '')
+        )
+        if result['error'] is None:
+            return result['ext']
+        if self._ext_pillar_source_opts(key)[1] == 'skip':
+            log.error(
+                'Skipping ext_pillar {0} for minion {1}: {2}'.format(
+                    key, self.minion_id, result['error'])
+            )
+        else:
+            errors.append('Failed to load ext_pillar {0}: {1}'.format(
+                key, result['error']))
+        return None
+
     def compile_pillar(self, ext=True, pillar_dirs=None):
         '''
         Render the pillar data and return
@@ -52,6 +52,7 @@ from contextlib import contextmanager
 import logging
 
 # Import Salt libs
+import salt.utils.sqlpool
 from salt.pillar.sql_base import SqlBaseExtPillar
 
 # Set up logging
@@ -105,18 +106,23 @@ class MySQLExtPillar(SqlBaseExtPillar):
         Yield a MySQL cursor
         '''
         _options = self._get_options()
-        conn = MySQLdb.connect(host=_options['host'],
-                               user=_options['user'],
-                               passwd=_options['pass'],
-                               db=_options['db'], port=_options['port'],
-                               ssl=_options['ssl'])
-        cursor = conn.cursor()
-        try:
-            yield cursor
-        except MySQLdb.DatabaseError as err:
-            log.exception('Error in ext_pillar MySQL: {0}'.format(err.args))
-        finally:
-            conn.close()
+        params = {'host': _options['host'],
+                  'user': _options['user'],
+                  'passwd': _options['pass'],
+                  'db': _options['db'],
+                  'port': _options['port'],
+                  'ssl': _options['ssl']}
+        pool = salt.utils.sqlpool.get_pool(__opts__,
+                                           'mysql',
+                                           params,
+                                           lambda: MySQLdb.connect(**params),
+                                           check=lambda conn: conn.ping())
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                yield cursor
+            except MySQLdb.DatabaseError as err:
+                log.exception('Error in ext_pillar MySQL: {0}'.format(err.args))
 
     def extract_queries(self, args, kwargs):
         '''
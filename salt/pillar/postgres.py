@@ -33,6 +33,7 @@ from contextlib import contextmanager
 import logging
 
 # Import Salt libs
+import salt.utils.sqlpool
 from salt.pillar.sql_base import SqlBaseExtPillar
 
 # Set up logging
@@ -85,18 +86,22 @@ class POSTGRESExtPillar(SqlBaseExtPillar):
         Yield a POSTGRES cursor
         '''
         _options = self._get_options()
-        conn = psycopg2.connect(host=_options['host'],
-                                user=_options['user'],
-                                password=_options['pass'],
-                                dbname=_options['db'])
-        cursor = conn.cursor()
-        try:
-            yield cursor
-            log.debug('Connected to POSTGRES DB')
-        except psycopg2.DatabaseError as err:
-            log.exception('Error in ext_pillar POSTGRES: {0}'.format(err.args))
-        finally:
-            conn.close()
+        params = {'host': _options['host'],
+                  'user': _options['user'],
+                  'password': _options['pass'],
+                  'dbname': _options['db']}
+        pool = salt.utils.sqlpool.get_pool(__opts__,
+                                           'postgres',
+                                           params,
+                                           lambda: psycopg2.connect(**params),
+                                           check=salt.utils.sqlpool.select_one)
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                yield cursor
+                log.debug('Connected to POSTGRES DB')
+            except psycopg2.DatabaseError as err:
+                log.exception('Error in ext_pillar POSTGRES: {0}'.format(err.args))
 
     def extract_queries(self, args, kwargs):
         '''
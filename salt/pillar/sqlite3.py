@@ -54,6 +54,7 @@ import logging
 import sqlite3
 
 # Import Salt libs
+import salt.utils.sqlpool
 from salt.pillar.sql_base import SqlBaseExtPillar
 
 # Set up logging
@@ -96,15 +97,21 @@ class SQLite3ExtPillar(SqlBaseExtPillar):
         Yield a SQLite3 cursor
         '''
         _options = self._get_options()
-        conn = sqlite3.connect(_options.get('database'),
-                               timeout=float(_options.get('timeout')))
-        cursor = conn.cursor()
-        try:
-            yield cursor
-        except sqlite3.Error as err:
-            log.exception('Error in ext_pillar SQLite3: {0}'.format(err.args))
-        finally:
-            conn.close()
+        params = {'database': _options.get('database'),
+                  'timeout': float(_options.get('timeout')),
+                  # The pooled connections are used by one thread at a time,
+                  # but not always by the thread which opened them
+                  'check_same_thread': False}
+        pool = salt.utils.sqlpool.get_pool(__opts__,
+                                           'sqlite3',
+                                           params,
+                                           lambda: sqlite3.connect(**params))
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                yield cursor
+            except sqlite3.Error as err:
+                log.exception('Error in ext_pillar SQLite3: {0}'.format(err.args))
 
 
 def ext_pillar(minion_id,
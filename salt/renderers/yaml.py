@@ -27,7 +27,9 @@ log = logging.getLogger(__name__)
 
 _ERROR_MAP = {
     ("found character '\\t' that cannot "
-     "start any token"): 'Illegal tab character'
+     "start any token"): 'Illegal tab character',
+    # The libyaml based loader does not name the character
+    "found character that cannot start any token": 'Illegal tab character',
 }
 
 
@@ -55,7 +57,8 @@ def render(yaml_data, saltenv='base', sls='', argline='', **kws):
         except ScannerError as exc:
             err_type = _ERROR_MAP.get(exc.problem, exc.problem)
             line_num = exc.problem_mark.line + 1
-            raise SaltRenderError(err_type, line_num, exc.problem_mark.buffer)
+            # The libyaml based loader does not keep the buffer in the mark
+            raise SaltRenderError(err_type, line_num, exc.problem_mark.buffer or yaml_data)
         except (ParserError, ConstructorError) as exc:
             raise SaltRenderError(exc)
         if len(warn_list) > 0:
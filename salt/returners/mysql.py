@@ -151,6 +151,7 @@ import logging
 # Import salt libs
 import salt.returners
 import salt.utils.jid
+import salt.utils.sqlpool
 import salt.exceptions
 from salt.ext.six import string_types
 
@@ -214,6 +215,17 @@ def _get_options(ret=None):
     return _options
 
 
+def _connect(params):
+    '''
+    Open a new connection for the pool
+    '''
+    log.debug('Generating new MySQL connection')
+    try:
+        return MySQLdb.connect(**params)
+    except MySQLdb.connections.OperationalError as exc:
+        raise salt.exceptions.SaltMasterError('MySQL returner could not connect to database: {exc}'.format(exc=exc))
+
+
 @contextmanager
 def _get_serv(ret=None, commit=False):
     '''
@@ -221,56 +233,41 @@ def _get_serv(ret=None, commit=False):
     '''
     _options = _get_options(ret)
 
-    connect = True
-    if __context__ and 'mysql_returner_conn' in __context__:
-        try:
-            log.debug('Trying to reuse MySQL connection pool')
-            conn = __context__['mysql_returner_conn']
-            conn.ping()
-            connect = False
-        except MySQLdb.connections.OperationalError as exc:
-            log.debug('OperationalError on ping: {0}'.format(exc))
-
-    if connect:
-        log.debug('Generating new MySQL connection pool')
+    # An empty ssl_options dictionary passed to MySQLdb.connect will
+    # effectively connect w/o SSL.
+    ssl_options = {}
+    if _options.get('ssl_ca'):
+        ssl_options['ca'] = _options.get('ssl_ca')
+    if _options.get('ssl_cert'):
+        ssl_options['cert'] = _options.get('ssl_cert')
+    if _options.get('ssl_key'):
+        ssl_options['key'] = _options.get('ssl_key')
+    params = {'host': _options.get('host'),
+              'user': _options.get('user'),
+              'passwd': _options.get('pass'),
+              'db': _options.get('db'),
+              'port': _options.get('port'),
+              'ssl': ssl_options}
+    pool = salt.utils.sqlpool.get_pool(__opts__,
+                                       'mysql',
+                                       params,
+                                       lambda: _connect(params),
+                                       check=lambda conn: conn.ping())
+
+    with pool.connection() as conn:
+        cursor = conn.cursor()
         try:
-            # An empty ssl_options dictionary passed to MySQLdb.connect will
-            # effectively connect w/o SSL.
-            ssl_options = {}
-            if _options.get('ssl_ca'):
-                ssl_options['ca'] = _options.get('ssl_ca')
-            if _options.get('ssl_cert'):
-                ssl_options['cert'] = _options.get('ssl_cert')
-            if _options.get('ssl_key'):
-                ssl_options['key'] = _options.get('ssl_key')
-            conn = MySQLdb.connect(host=_options.get('host'),
-                                   user=_options.get('user'),
-                                   passwd=_options.get('pass'),
-                                   db=_options.get('db'),
-                                   port=_options.get('port'),
-                                   ssl=ssl_options)
-
-            try:
-                __context__['mysql_returner_conn'] = conn
-            except TypeError:
-                pass
-        except MySQLdb.connections.OperationalError as exc:
-            raise salt.exceptions.SaltMasterError('MySQL returner could not connect to database: {exc}'.format(exc=exc))
-
-    cursor = conn.cursor()
-
-    try:
-        yield cursor
-    except MySQLdb.DatabaseError as err:
-        error = err.args
-        sys.stderr.write(str(error))
-        cursor.execute("ROLLBACK")
-        raise err
-    else:
-        if commit:
-            cursor.execute("COMMIT")
-        else:
+            yield cursor
+        except MySQLdb.DatabaseError as err:
+            error = err.args
+            sys.stderr.write(str(error))
             cursor.execute("ROLLBACK")
+            raise err
+        else:
+            if commit:
+                cursor.execute("COMMIT")
+            else:
+                cursor.execute("ROLLBACK")
 
 
 def returner(ret):
@@ -305,13 +302,13 @@ def event_return(events):
     Requires that configuration be enabled via 'event_return'
     option in master config.
     '''
+    rows = [(event.get('tag', ''), json.dumps(event.get('data', '')), __opts__['id'])
+            for event in events]
     with _get_serv(events, commit=True) as cur:
-        for event in events:
-            tag = event.get('tag', '')
-            data = event.get('data', '')
-            sql = '''INSERT INTO `salt_events` (`tag`, `data`, `master_id` )
-                     VALUES (%s, %s, %s)'''
-            cur.execute(sql, (tag, json.dumps(data), __opts__['id']))
+        # The rows are sent with one multi-row INSERT
+        sql = '''INSERT INTO `salt_events` (`tag`, `data`, `master_id` )
+                 VALUES (%s, %s, %s)'''
+        cur.executemany(sql, rows)
 
 
 def save_load(jid, load, minions=None):
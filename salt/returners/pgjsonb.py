@@ -142,6 +142,7 @@ import logging
 # Import salt libs
 import salt.returners
 import salt.utils.jid
+import salt.utils.sqlpool
 import salt.exceptions
 
 # Import third party libs
@@ -192,47 +193,47 @@ def _get_options(ret=None):
     return _options
 
 
-@contextmanager
-def _get_serv(ret=None, commit=False):
+def _connect(params):
     '''
-    Return a Pg cursor
+    Open a new connection for the pool
     '''
-    _options = _get_options(ret)
     try:
-        # An empty ssl_options dictionary passed to MySQLdb.connect will
-        # effectively connect w/o SSL.
-        ssl_options = {}
-        if _options.get('ssl_ca'):
-            ssl_options['ca'] = _options.get('ssl_ca')
-        if _options.get('ssl_cert'):
-            ssl_options['cert'] = _options.get('ssl_cert')
-        if _options.get('ssl_key'):
-            ssl_options['key'] = _options.get('ssl_key')
-        conn = psycopg2.connect(host=_options.get('host'),
-                                user=_options.get('user'),
-                                password=_options.get('pass'),
-                                database=_options.get('db'),
-                                port=_options.get('port'))
-#                                ssl=ssl_options)
+        return psycopg2.connect(**params)
     except psycopg2.OperationalError as exc:
         raise salt.exceptions.SaltMasterError('pgjsonb returner could not connect to database: {exc}'.format(exc=exc))
 
-    cursor = conn.cursor()
 
-    try:
-        yield cursor
-    except psycopg2.DatabaseError as err:
-        error = err.args
-        sys.stderr.write(str(error))
-        cursor.execute("ROLLBACK")
-        raise err
-    else:
-        if commit:
-            cursor.execute("COMMIT")
-        else:
+@contextmanager
+def _get_serv(ret=None, commit=False):
+    '''
+    Return a Pg cursor
+    '''
+    _options = _get_options(ret)
+    params = {'host': _options.get('host'),
+              'user': _options.get('user'),
+              'password': _options.get('pass'),
+              'database': _options.get('db'),
+              'port': _options.get('port')}
+    pool = salt.utils.sqlpool.get_pool(__opts__,
+                                       'pgjsonb',
+                                       params,
+                                       lambda: _connect(params),
+                                       check=salt.utils.sqlpool.select_one)
+
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            yield cursor
+        except psycopg2.DatabaseError as err:
+            error = err.args
+            sys.stderr.write(str(error))
             cursor.execute("ROLLBACK")
-    finally:
-        conn.close()
+            raise err
+        else:
+            if commit:
+                cursor.execute("COMMIT")
+            else:
+                cursor.execute("ROLLBACK")
 
 
 def returner(ret):
@@ -262,14 +263,14 @@ def event_return(events):
     Requires that configuration be enabled via 'event_return'
     option in master config.
     '''
+    alter_time = time.strftime('%Y-%m-%d %H:%M:%S %z', time.localtime())
+    rows = [(event.get('tag', ''), psycopg2.extras.Json(event.get('data', '')),
+             __opts__['id'], alter_time)
+            for event in events]
     with _get_serv(events, commit=True) as cur:
-        for event in events:
-            tag = event.get('tag', '')
-            data = event.get('data', '')
-            sql = '''INSERT INTO salt_events (tag, data, master_id, alter_time)
-                     VALUES (%s, %s, %s, %s)'''
-            cur.execute(sql, (tag, psycopg2.extras.Json(data),
-                              __opts__['id'], time.strftime('%Y-%m-%d %H:%M:%S %z', time.localtime())))
+        sql = '''INSERT INTO salt_events (tag, data, master_id, alter_time)
+                 VALUES (%s, %s, %s, %s)'''
+        cur.executemany(sql, rows)
 
 
 def save_load(jid, load, minions=None):
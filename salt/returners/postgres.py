@@ -134,6 +134,7 @@ from contextlib import contextmanager
 
 # Import Salt libs
 import salt.utils.jid
+import salt.utils.sqlpool
 import salt.returners
 import salt.exceptions
 
@@ -183,38 +184,47 @@ def _get_options(ret=None):
     return _options
 
 
-@contextmanager
-def _get_serv(ret=None, commit=False):
+def _connect(params):
     '''
-    Return a Pg cursor
+    Open a new connection for the pool
     '''
-    _options = _get_options(ret)
     try:
-        conn = psycopg2.connect(host=_options.get('host'),
-                                user=_options.get('user'),
-                                password=_options.get('passwd'),
-                                database=_options.get('db'),
-                                port=_options.get('port'))
-
+        return psycopg2.connect(**params)
     except psycopg2.OperationalError as exc:
         raise salt.exceptions.SaltMasterError('postgres returner could not connect to database: {exc}'.format(exc=exc))
 
-    cursor = conn.cursor()
 
-    try:
-        yield cursor
-    except psycopg2.DatabaseError as err:
-        error = err.args
-        sys.stderr.write(str(error))
-        cursor.execute("ROLLBACK")
-        raise err
-    else:
-        if commit:
-            cursor.execute("COMMIT")
-        else:
+@contextmanager
+def _get_serv(ret=None, commit=False):
+    '''
+    Return a Pg cursor
+    '''
+    _options = _get_options(ret)
+    params = {'host': _options.get('host'),
+              'user': _options.get('user'),
+              'password': _options.get('passwd'),
+              'database': _options.get('db'),
+              'port': _options.get('port')}
+    pool = salt.utils.sqlpool.get_pool(__opts__,
+                                       'postgres',
+                                       params,
+                                       lambda: _connect(params),
+                                       check=salt.utils.sqlpool.select_one)
+
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            yield cursor
+        except psycopg2.DatabaseError as err:
+            error = err.args
+            sys.stderr.write(str(error))
             cursor.execute("ROLLBACK")
-    finally:
-        conn.close()
+            raise err
+        else:
+            if commit:
+                cursor.execute("COMMIT")
+            else:
+                cursor.execute("ROLLBACK")
 
 
 def returner(ret):
@@ -245,15 +255,12 @@ def event_return(events):
     Requires that configuration be enabled via 'event_return'
     option in master config.
     '''
+    rows = [(event.get('tag', ''), json.dumps(event.get('data', '')), __opts__['id'])
+            for event in events]
     with _get_serv(events, commit=True) as cur:
-        for event in events:
-            tag = event.get('tag', '')
-            data = event.get('data', '')
-            sql = '''INSERT INTO salt_events (tag, data, master_id)
-                     VALUES (%s, %s, %s)'''
-            cur.execute(sql, (tag,
-                              json.dumps(data),
-                              __opts__['id']))
+        sql = '''INSERT INTO salt_events (tag, data, master_id)
+                 VALUES (%s, %s, %s)'''
+        cur.executemany(sql, rows)
 
 
 def save_load(jid, load, minions=None):  # pylint: disable=unused-argument
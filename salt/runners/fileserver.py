@@ -280,7 +280,7 @@ def empty_dir_list(saltenv='base', backend=None):
     return fileserver.file_list_emptydirs(load=load)
 
 
-def update(backend=None):
+def update(backend=None, remote=None, ref=None):
     '''
     Update the fileserver cache. If no backend is provided, then the cache for
     all configured backends will be updated.
@@ -299,15 +299,33 @@ def update(backend=None):
             comma-separated list. In earlier versions, they needed to be passed
             as a python list (ex: ``backend="['roots', 'git']"``)
 
+    remote
+        Only update the remotes with a URL matching this glob pattern, in the
+        backends which support it (currently only :mod:`git
+        <salt.fileserver.gitfs>`). Only the file list caches of the saltenvs
+        served by these remotes are cleared, the other backends and remotes
+        are left alone. This is meant to be run from a reactor when a push
+        hook or webhook reports a change to a remote.
+
+        .. versionadded:: Nitrogen
+
+    ref
+        The branch or tag which changed in the remote, to clear the file list
+        cache of its saltenv only. Both ``master`` and ``refs/heads/master``
+        are accepted.
+
+        .. versionadded:: Nitrogen
+
     CLI Example:
 
     .. code-block:: bash
 
         salt-run fileserver.update
         salt-run fileserver.update backend=roots,git
+        salt-run fileserver.update backend=git remote='*github.com/myorg/states*' ref=master
     '''
     fileserver = salt.fileserver.Fileserver(__opts__)
-    fileserver.update(back=backend)
+    fileserver.update(back=backend, remote=remote, ref=ref)
     return True
 
 
@@ -30,7 +30,9 @@ BaseDumper = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
 
 ERROR_MAP = {
     ("found character '\\t' "
-     "that cannot start any token"): 'Illegal tab character'
+     "that cannot start any token"): 'Illegal tab character',
+    # The libyaml based loader does not name the character
+    "found character that cannot start any token": 'Illegal tab character',
 }
 
 
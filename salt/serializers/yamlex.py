@@ -134,7 +134,9 @@ BaseDumper = yaml.SafeDumper if six.PY3 else getattr(yaml, 'CSafeDumper', yaml.S
 
 ERROR_MAP = {
     ("found character '\\t' "
-     "that cannot start any token"): 'Illegal tab character'
+     "that cannot start any token"): 'Illegal tab character',
+    # The libyaml based loader does not name the character
+    "found character that cannot start any token": 'Illegal tab character',
 }
 
 
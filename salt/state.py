@@ -17,6 +17,8 @@ from __future__ import absolute_import
 import os
 import sys
 import copy
+import json
+import hashlib
 import site
 import fnmatch
 import logging
@@ -24,19 +26,32 @@ import datetime
 import traceback
 import re
 import random
+import select
+import threading
+import multiprocessing
+from multiprocessing.pool import ThreadPool
 
 # Import salt libs
 import salt.utils
+import salt.utils.atomicfile
 import salt.loader
 import salt.minion
 import salt.pillar
 import salt.fileclient
 import salt.utils.dictupdate
 import salt.utils.event
+import salt.utils.jid
+import salt.utils.process
+import salt.utils.templates
 import salt.utils.url
+import salt.version
 import salt.syspaths as syspaths
 from salt.utils import immutabletypes
-from salt.template import compile_template, compile_template_str
+from salt.template import (
+    compile_template,
+    compile_template_str,
+    template_shebang
+)
 from salt.exceptions import (
     SaltException,
     SaltInvocationError,
@@ -85,6 +100,7 @@ STATE_RUNTIME_KEYWORDS = frozenset([
     'unless',
     'retry',
     'order',
+    'parallel',
     'prereq',
     'prereq_in',
     'prerequired',
@@ -112,6 +128,41 @@ STATE_RUNTIME_KEYWORDS = frozenset([
 
 STATE_INTERNAL_KEYWORDS = STATE_REQUISITE_KEYWORDS.union(STATE_REQUISITE_IN_KEYWORDS).union(STATE_RUNTIME_KEYWORDS)
 
+# The renderers whose output only depends on the source and the render context
+# known to the SLS render cache, and the context variables that may be read
+RENDER_CACHE_RENDERERS = frozenset(['jinja', 'yaml'])
+RENDER_CACHE_CONTEXT = frozenset([
+    'grains', 'pillar', 'saltenv', 'sls', 'slspath', 'sls_path', 'slsdotpath',
+    'slscolonpath', 'tplpath', 'tplfile', 'tpldir', 'tpldot', 'odict', 'range',
+    'dict', 'cycler', 'joiner',
+])
+# Options which change the output of those renderers
+RENDER_CACHE_OPTS = (
+    'jinja_trim_blocks',
+    'jinja_lstrip_blocks',
+    'allow_undefined',
+    'yaml_utf8',
+)
+# The number of compiled highstates kept by the low state cache
+LOWSTATE_CACHE_SIZE = 10
+# The state functions the state journal supports, and the argument which
+# holds the path of their target
+JOURNAL_TARGETS = {
+    'file.managed': 'name',
+    'archive.extracted': 'name',
+    'git.latest': 'target',
+}
+# Arguments which do not change the result of a state
+JOURNAL_IGNORED_KEYWORDS = STATE_REQUISITE_KEYWORDS.union(
+    STATE_REQUISITE_IN_KEYWORDS).union([
+        'order', 'fire_event', 'parallel', 'prerequired', '__prereq__', '__agg__',
+    ])
+# The variables file.managed passes to its templates besides the render
+# context, all of them are arguments of the state
+JOURNAL_TEMPLATE_CONTEXT = RENDER_CACHE_CONTEXT.union([
+    'name', 'source', 'user', 'group', 'mode',
+])
+
 VALID_PILLAR_ENC = ('gpg',)
 
 
@@ -177,15 +228,27 @@ def state_args(id_, state, high):
     return args
 
 
-def find_name(name, state, high):
+def find_name(name, state, high, index=None):
     '''
     Scan high data for the id referencing the given name and return a list of (IDs, state) tuples that match
 
     Note: if `state` is sls, then we are looking for all IDs that match the given SLS
+
+    An index returned by high_name_index can be passed to look the name up
+    without scanning the high data.
     '''
     ext_id = []
     if name in high:
         ext_id.append((name, state))
+    elif index is not None:
+        try:
+            if state == 'sls':
+                ext_id.extend(index['sls'].get(name, ()))
+            else:
+                ext_id.extend(index['names'].get((state, name), ()))
+        except TypeError:
+            # Unhashable name, it cannot be in the index
+            pass
     # if we are requiring an entire SLS, then we need to add ourselves to everything in that SLS
     elif state == 'sls':
         for nid, item in six.iteritems(high):
@@ -207,6 +270,345 @@ def find_name(name, state, high):
     return ext_id
 
 
+def high_name_index(high):
+    '''
+    Build the index used by find_name to look up the IDs of an SLS and the
+    IDs which reference a name, in the order find_name would find them
+    '''
+    index = {'sls': {}, 'names': {}}
+    for nid, item in six.iteritems(high):
+        if not isinstance(item, dict):
+            continue
+        if '__sls__' in item:
+            index['sls'].setdefault(item['__sls__'], []).append(
+                (nid, next(iter(item))))
+        for state, run in six.iteritems(item):
+            if not isinstance(run, list):
+                continue
+            for arg in run:
+                if not isinstance(arg, dict) or len(arg) != 1:
+                    continue
+                try:
+                    index['names'].setdefault(
+                        (state, arg[next(iter(arg))]), []).append((nid, state))
+                except TypeError:
+                    # Unhashable argument, it cannot be a name
+                    continue
+    return index
+
+
+def find_requisite_chunks(chunks, req_key, req_val):
+    '''
+    Return the low chunks matched by a requisite, in the order of chunks
+    '''
+    found = []
+    for chunk in chunks:
+        if req_key == 'sls':
+            # Allow requisite tracking of entire sls files
+            if fnmatch.fnmatch(chunk['__sls__'], req_val):
+                found.append(chunk)
+            continue
+        try:
+            if (fnmatch.fnmatch(chunk['name'], req_val) or
+                fnmatch.fnmatch(chunk['__id__'], req_val)):
+                if req_key == 'id' or chunk['state'] == req_key:
+                    found.append(chunk)
+        except KeyError:
+            raise SaltRenderError('Could not locate requisite of [{0}] present in state with name [{1}]'.format(req_key, chunk['name']))
+    return found
+
+
+class RequisiteIndex(object):
+    '''
+    Index of a list of low chunks by name, ID and SLS, used to resolve
+    requisites without matching every chunk against every requisite
+    '''
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.size = len(chunks)
+        self.names = {}
+        self.sls = {}
+        self.globs = {}
+        for pos, chunk in enumerate(chunks):
+            keys = set()
+            for key in (chunk.get('name'), chunk.get('__id__')):
+                try:
+                    keys.add(self._norm(key))
+                except TypeError:
+                    continue
+            for key in keys:
+                self.names.setdefault(key, []).append(pos)
+            try:
+                self.sls.setdefault(self._norm(chunk.get('__sls__')), []).append(pos)
+            except TypeError:
+                continue
+
+    @staticmethod
+    def _norm(key):
+        # fnmatch compares normalized paths, which is case insensitive on
+        # Windows
+        if isinstance(key, six.string_types):
+            return os.path.normcase(key)
+        hash(key)
+        return key
+
+    def current(self, chunks):
+        '''
+        Return True if the index was built from this list of chunks
+        '''
+        return self.chunks is chunks and self.size == len(chunks)
+
+    def find(self, req_key, req_val):
+        '''
+        Return the chunks matched by a requisite, in the order of the chunks
+        '''
+        if req_val is None:
+            return []
+        if not isinstance(req_val, six.string_types):
+            return find_requisite_chunks(self.chunks, req_key, req_val)
+        if any(char in req_val for char in '*?['):
+            # Glob matches are looked up once for each requisite
+            if (req_key, req_val) not in self.globs:
+                self.globs[(req_key, req_val)] = find_requisite_chunks(
+                    self.chunks, req_key, req_val)
+            return list(self.globs[(req_key, req_val)])
+        req_val = self._norm(req_val)
+        if req_key == 'sls':
+            return [self.chunks[pos] for pos in self.sls.get(req_val, ())]
+        return [self.chunks[pos] for pos in self.names.get(req_val, ())
+                if req_key == 'id' or self.chunks[pos]['state'] == req_key]
+
+
+class StateJournal(object):
+    '''
+    Journal of the states which succeeded, recording a digest of the
+    arguments of each state and a fingerprint of its target. A state whose
+    digest and fingerprint are unchanged on the next run is not checked again.
+    '''
+    def __init__(self, opts, functions, verify=False):
+        self.opts = opts
+        self.functions = functions
+        self.verify = verify
+        self.path = os.path.join(opts['cachedir'], 'state_journal.p')
+        self.serial = salt.payload.Serial(opts)
+        self.context_digest = None
+        self.entries = {}
+        self.dirty = False
+        if os.path.isfile(self.path):
+            try:
+                with salt.utils.fopen(self.path, 'rb') as fp_:
+                    entries = self.serial.load(fp_)
+                if isinstance(entries, dict):
+                    self.entries = entries
+            except Exception as exc:
+                log.debug('Unable to read the state journal {0}: {1}'.format(self.path, exc))
+
+    def _source_token(self, source, saltenv):
+        '''
+        Return a token which changes when the source file changes, or None if
+        the source cannot be checked cheaply
+        '''
+        if isinstance(source, dict):
+            # A source with a hash in a list of sources
+            return json.dumps(source, sort_keys=True, default=repr)
+        if not isinstance(source, six.string_types):
+            return None
+        if source.startswith('salt://'):
+            hash_ = self.functions['cp.hash_file'](source, saltenv)
+            return hash_.get('hsum') if isinstance(hash_, dict) else None
+        path = source[7:] if source.startswith('file://') else source
+        if os.path.isabs(path):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return None
+            return [stat.st_mtime, stat.st_size, stat.st_ino]
+        return None
+
+    def _template_digests(self, low, sources):
+        '''
+        Return the digests of the jinja template of a state and of every
+        template it imports, includes or extends, or None if the rendered
+        content may change without them changing, for instance when the
+        template calls execution modules through ``salt``
+        '''
+        if low['template'] != 'jinja':
+            return None
+        saltenv = low.get('__env__', 'base')
+        if isinstance(low.get('contents'), six.string_types):
+            source = low['contents']
+        else:
+            if len(sources) != 1 or not isinstance(sources[0], six.string_types):
+                return None
+            path = sources[0]
+            if path.startswith('salt://'):
+                path = self.functions['cp.cache_file'](path, saltenv)
+            elif path.startswith('file://'):
+                path = path[7:]
+            if not path or not os.path.isabs(path):
+                return None
+            with salt.utils.fopen(path, 'rb') as fp_:
+                source = fp_.read()
+        context = JOURNAL_TEMPLATE_CONTEXT
+        for name in ('context', 'defaults'):
+            if isinstance(low.get(name), dict):
+                context = context.union(low[name])
+        digests = []
+        pending = [source]
+        seen = set()
+        while pending:
+            source = pending.pop()
+            if isinstance(source, six.text_type):
+                source = source.encode('utf-8')
+            digests.append(hashlib.sha256(source).hexdigest())
+            variables, references = \
+                salt.utils.templates.jinja_template_dependencies(source)
+            if not variables.issubset(context):
+                return None
+            for ref in references:
+                if ref is None:
+                    # Referenced through an expression
+                    return None
+                if ref in seen:
+                    continue
+                seen.add(ref)
+                path = self.functions['cp.cache_file'](
+                    salt.utils.url.create(ref), saltenv)
+                if not path:
+                    return None
+                with salt.utils.fopen(path, 'rb') as fp_:
+                    pending.append(fp_.read())
+        return digests
+
+    def _digest(self, low):
+        '''
+        Return the digest of the arguments of a state and of everything else
+        its result depends on, or None if the state cannot be journaled
+        '''
+        target = JOURNAL_TARGETS.get('{0[state]}.{0[fun]}'.format(low))
+        if target is None or not isinstance(low.get(target), six.string_types) \
+                or not os.path.isabs(low[target]):
+            return None
+        if low['state'] == 'git' and not re.match(r'^[0-9a-f]{40}$', str(low.get('rev'))):
+            # Without a commit ID the remote may have moved on
+            return None
+        args = dict((key, value) for key, value in six.iteritems(low)
+                    if key not in JOURNAL_IGNORED_KEYWORDS)
+        sources = low.get('source')
+        if sources is None:
+            sources = low.get('sources', [])
+        if not isinstance(sources, list):
+            sources = [sources]
+        source_hash = low.get('source_hash')
+        if not isinstance(source_hash, six.string_types) \
+                or '://' in source_hash or os.path.isabs(source_hash):
+            # Without a literal hash the sources themselves are checked
+            tokens = []
+            for source in sources:
+                token = self._source_token(source, low.get('__env__', 'base'))
+                if token is None:
+                    return None
+                tokens.append(token)
+            args['__sources__'] = tokens
+        if low.get('template'):
+            templates = self._template_digests(low, sources)
+            if templates is None:
+                return None
+            args['__templates__'] = templates
+        if low.get('template') or 'contents_pillar' in low or 'contents_grains' in low:
+            # Rendered content depends on the grains and pillar data
+            if self.context_digest is None:
+                self.context_digest = hashlib.sha256(json.dumps(
+                    [self.opts.get('grains', {}), self.opts.get('pillar', {})],
+                    sort_keys=True,
+                    default=repr).encode('utf-8')).hexdigest()
+            args['__context__'] = self.context_digest
+        return hashlib.sha256(
+            json.dumps(args, sort_keys=True, default=repr).encode('utf-8')
+        ).hexdigest()
+
+    def _fingerprint(self, low):
+        '''
+        Return a fingerprint of the target of a state, or None if the target
+        cannot be fingerprinted
+        '''
+        path = low[JOURNAL_TARGETS['{0[state]}.{0[fun]}'.format(low)]]
+        paths = [path]
+        if low['state'] == 'git':
+            paths = [os.path.join(path, '.git', 'HEAD'),
+                     os.path.join(path, '.git', 'index')]
+        fingerprint = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return None
+            fingerprint.append([stat.st_mtime, stat.st_size, stat.st_ino,
+                                stat.st_mode, stat.st_uid, stat.st_gid])
+        if low['state'] == 'git':
+            # Changes to the files of the worktree show neither in HEAD nor
+            # in the index, only a clean checkout is fingerprinted
+            kwargs = {'ignore_retcode': True}
+            if low.get('user'):
+                kwargs['user'] = low['user']
+            if self.functions['git.status'](low['target'], **kwargs):
+                return None
+        return fingerprint
+
+    def unchanged(self, low):
+        '''
+        Return True if the arguments and the target of a state have not
+        changed since it last succeeded
+        '''
+        entry = self.entries.get(_gen_tag(low))
+        if self.verify or not entry:
+            return False
+        try:
+            digest = self._digest(low)
+            if digest is None or digest != entry.get('digest'):
+                return False
+            fingerprint = self._fingerprint(low)
+        except Exception as exc:
+            log.debug('Unable to check the journal of state {0}: {1}'.format(_gen_tag(low), exc))
+            return False
+        return fingerprint is not None and fingerprint == entry.get('fingerprint')
+
+    def update(self, low, ret):
+        '''
+        Record the state if it succeeded, otherwise forget it
+        '''
+        tag = _gen_tag(low)
+        digest = fingerprint = None
+        if ret.get('result') is True and not low.get('__prereq__'):
+            try:
+                digest = self._digest(low)
+                if digest is not None:
+                    fingerprint = self._fingerprint(low)
+            except Exception as exc:
+                log.debug('Unable to journal state {0}: {1}'.format(tag, exc))
+        if fingerprint is None:
+            if self.entries.pop(tag, None) is not None:
+                self.dirty = True
+            return
+        entry = {'digest': digest, 'fingerprint': fingerprint}
+        if self.entries.get(tag) != entry:
+            self.entries[tag] = entry
+            self.dirty = True
+
+    def write(self):
+        '''
+        Write the journal to the cachedir if it has changed
+        '''
+        if not self.dirty:
+            return
+        try:
+            with salt.utils.atomicfile.atomic_open(self.path, 'w+b') as fp_:
+                self.serial.dump(self.entries, fp_)
+            self.dirty = False
+        except (IOError, OSError) as exc:
+            log.debug('Unable to write the state journal {0}: {1}'.format(self.path, exc))
+
+
 def format_log(ret):
     '''
     Format the state into a log message
@@ -667,6 +1069,10 @@ class State(object):
         self.active = set()
         self.mod_init = set()
         self.pre = {}
+        self.requisite_index = None
+        self.journal = None
+        self.parallel_procs = OrderedDict()
+        self.parallel_failhard = False
         self.__run_num = 0
         self.jid = jid
         self.instance_id = str(id(self))
@@ -766,7 +1172,7 @@ class State(object):
             agg_opt = low['aggregate']
         if agg_opt is True:
             agg_opt = [low['state']]
-        else:
+        elif not isinstance(agg_opt, list):
             return low
         if low['state'] in agg_opt and not low.get('__agg__'):
             agg_fun = '{0}.mod_aggregate'.format(low['state'])
@@ -1323,8 +1729,20 @@ class State(object):
                         live['fun'] = fun
                         chunks.append(live)
         chunks = self.order_chunks(chunks)
+        self.requisite_index = RequisiteIndex(chunks)
         return chunks
 
+    def find_requisite(self, chunks, req_key, req_val):
+        '''
+        Return the chunks matched by a requisite. The chunks are indexed the
+        first time a requisite is resolved against them, later lookups reuse
+        the index until the list of chunks changes.
+        '''
+        if self.requisite_index is None or \
+                not self.requisite_index.current(chunks):
+            self.requisite_index = RequisiteIndex(chunks)
+        return self.requisite_index.find(req_key, req_val)
+
     def reconcile_extend(self, high):
         '''
         Pull the extend data and add it to the respective high data
@@ -1456,6 +1874,9 @@ class State(object):
                     ]))
         extend = {}
         errors = []
+        # The names are looked up for every prereq and use requisite, index
+        # them once instead of scanning the high data for each lookup
+        index = high_name_index(high)
         for id_, body in six.iteritems(high):
             if not isinstance(body, dict):
                 continue
@@ -1552,7 +1973,7 @@ class State(object):
                                             )
                                 if key == 'prereq':
                                     # Add prerequired to prereqs
-                                    ext_ids = find_name(name, _state, high)
+                                    ext_ids = find_name(name, _state, high, index)
                                     for ext_id, _req_state in ext_ids:
                                         if ext_id not in extend:
                                             extend[ext_id] = {}
@@ -1565,7 +1986,7 @@ class State(object):
                                 if key == 'use_in':
                                     # Add the running states args to the
                                     # use_in states
-                                    ext_ids = find_name(name, _state, high)
+                                    ext_ids = find_name(name, _state, high, index)
                                     for ext_id, _req_state in ext_ids:
                                         if not ext_id:
                                             continue
@@ -1592,7 +2013,7 @@ class State(object):
                                 if key == 'use':
                                     # Add the use state's args to the
                                     # running state
-                                    ext_ids = find_name(name, _state, high)
+                                    ext_ids = find_name(name, _state, high, index)
                                     for ext_id, _req_state in ext_ids:
                                         if not ext_id:
                                             continue
@@ -1748,6 +2169,15 @@ class State(object):
                 self.states.inject_globals = inject_globals
                 if self.mocked:
                     ret = mock_ret(cdata)
+                elif self.journal is not None and self.journal.unchanged(low):
+                    ret = {'result': True,
+                           'name': low['name'],
+                           'changes': {},
+                           'comment': 'The arguments and the target of this '
+                                      'state are unchanged since it last '
+                                      'succeeded, the state was not checked'}
+                elif self._run_parallel(low):
+                    ret = self.call_parallel(cdata, low, start_time, chunks)
                 else:
                     ret = self.states[cdata['full']](*cdata['args'],
                                                      **cdata['kwargs'])
@@ -1755,6 +2185,8 @@ class State(object):
             if 'check_cmd' in low and '{0[state]}.mod_run_check_cmd'.format(low) not in self.states:
                 ret.update(self._run_check_cmd(low))
             self.verify_ret(ret)
+            if self.journal is not None and id(ret) not in self.parallel_procs:
+                self.journal.update(low, ret)
         except Exception:
             trb = traceback.format_exc()
             # There are a number of possibilities to not have the cdata
@@ -1794,6 +2226,12 @@ class State(object):
         ret['__sls__'] = low.get('__sls__')
         ret['__run_num__'] = self.__run_num
         self.__run_num += 1
+        if id(ret) in self.parallel_procs:
+            # The rest of the return is filled in by reconcile_procs once the
+            # state process has finished
+            ret['start_time'] = start_time.time().isoformat()
+            ret['__id__'] = low['__id__']
+            return ret
         format_log(ret)
         self.check_refresh(low, ret)
         finish_time = datetime.datetime.now()
@@ -1849,6 +2287,157 @@ class State(object):
                                                 low['retry']['splay'])])
         return ret
 
+    def _run_parallel(self, low):
+        '''
+        Return True if the state in the low chunk should be executed in a
+        separate process
+        '''
+        if not low.get('parallel') or low.get('__prereq__'):
+            return False
+        if 'retry' in low or 'check_cmd' in low:
+            # Both need the result of the state before the call returns
+            return False
+        # The state process is forked from this one, which is not possible
+        # on Windows
+        return not salt.utils.is_windows()
+
+    def _call_parallel_target(self, cdata, low, conn):
+        '''
+        Execute the state function inside of the parallel state process and
+        send the return back to the parent process
+        '''
+        try:
+            ret = self.states[cdata['full']](*cdata['args'], **cdata['kwargs'])
+            self.verify_ret(ret)
+        except Exception:
+            trb = traceback.format_exc()
+            ret = {
+                'result': False,
+                'name': low['name'],
+                'changes': {},
+                'comment': 'An exception occurred in this state: {0}'.format(
+                    trb)
+            }
+        try:
+            conn.send(ret)
+        except Exception as exc:
+            conn.send({
+                'result': False,
+                'name': low['name'],
+                'changes': {},
+                'comment': 'The state return could not be sent back from '
+                           'the parallel state process: {0}'.format(exc)
+            })
+        conn.close()
+
+    def call_parallel(self, cdata, low, start_time, chunks=None):
+        '''
+        Start the state function in a separate process and return a
+        placeholder return. The placeholder is updated in place by
+        reconcile_procs once the process has finished.
+        '''
+        parallel_max = self.opts.get('state_parallel_max', 0)
+        if parallel_max > 0:
+            while len(self.parallel_procs) >= parallel_max:
+                self._poll_parallel(timeout=1)
+        parent_conn, child_conn = multiprocessing.Pipe(duplex=False)
+        proc = salt.utils.process.MultiprocessingProcess(
+            target=self._call_parallel_target,
+            args=(cdata, low, child_conn))
+        proc.start()
+        # Only the state process writes to the pipe, closing our end makes
+        # sure that the pipe is readable (EOF) if that process dies
+        child_conn.close()
+        ret = {'name': low['name'],
+               'result': None,
+               'changes': {},
+               'comment': 'Started in a separate process'}
+        self.parallel_procs[id(ret)] = {
+            'ret': ret,
+            'low': low,
+            'proc': proc,
+            'conn': parent_conn,
+            'start_time': start_time,
+            'length': len(chunks) if chunks else 0}
+        return ret
+
+    def _poll_parallel(self, timeout=None):
+        '''
+        Collect the returns of the parallel state processes which have
+        finished, waiting up to ``timeout`` seconds for one to finish
+        '''
+        if timeout and self.parallel_procs:
+            select.select(
+                [entry['conn'] for entry in six.itervalues(self.parallel_procs)],
+                [], [], timeout)
+        for key, entry in list(self.parallel_procs.items()):
+            if not entry['conn'].poll():
+                continue
+            try:
+                result = entry['conn'].recv()
+            except EOFError:
+                result = None
+            entry['conn'].close()
+            entry['proc'].join()
+            del self.parallel_procs[key]
+            self._finish_parallel(entry, result)
+
+    def _finish_parallel(self, entry, result):
+        '''
+        Fill in the placeholder return of a parallel state
+        '''
+        ret = entry['ret']
+        low = entry['low']
+        if result is None:
+            result = {
+                'result': False,
+                'changes': {},
+                'comment': 'The parallel state process exited without a '
+                           'return, exit code: {0}'.format(
+                               entry['proc'].exitcode)}
+        ret.update(result)
+        format_log(ret)
+        self.check_refresh(low, ret)
+        if self.journal is not None:
+            self.journal.update(low, ret)
+        finish_time = datetime.datetime.now()
+        delta = (finish_time - entry['start_time'])
+        # duration in milliseconds.microseconds
+        ret['duration'] = (delta.seconds * 1000000 + delta.microseconds)/1000.0
+        log.info(
+            'Completed parallel state [{0}] at time {1} duration_in_ms={2}'.format(
+                low['name'].strip() if isinstance(low['name'], str)
+                    else low['name'],
+                finish_time.time().isoformat(),
+                ret['duration']
+            )
+        )
+        if 'chunk' in entry:
+            # call_chunk has already stored the return, fire the event it
+            # held back and check if the state run needs to stop
+            chunk = entry['chunk']
+            self.event(ret, entry['length'], fire_event=chunk.get('fire_event'),
+                       state_tag=_gen_tag(chunk))
+            if self.check_failhard(chunk, {_gen_tag(chunk): ret}):
+                self.parallel_failhard = True
+
+    def reconcile_procs(self, wait=None):
+        '''
+        Collect the returns of the states which were run in parallel. If
+        ``wait`` is True, wait for all of them to finish, if it is a list of
+        returns, wait for the states which those returns belong to.
+        '''
+        def _pending():
+            if wait is True:
+                return bool(self.parallel_procs)
+            elif wait:
+                return any(id(ret) in self.parallel_procs for ret in wait)
+            return False
+
+        self._poll_parallel()
+        while _pending():
+            self._poll_parallel(timeout=1)
+
     def verify_retry_data(self, retry_data):
         '''
         verifies the specified retry data
@@ -1889,16 +2478,24 @@ class State(object):
         Iterate over a list of chunks and call them, checking for requires.
         '''
         running = {}
+        self.parallel_failhard = False
         for low in chunks:
             if '__FAILHARD__' in running:
                 running.pop('__FAILHARD__')
-                return running
+                break
             tag = _gen_tag(low)
             if tag not in running:
                 running = self.call_chunk(low, running, chunks)
                 if self.check_failhard(low, running):
-                    return running
+                    break
             self.active = set()
+            if self.parallel_procs:
+                self.reconcile_procs()
+                if self.parallel_failhard:
+                    break
+        # Parallel states which are still running are always waited for, the
+        # run is not complete without their returns
+        self.reconcile_procs(wait=True)
         return running
 
     def check_failhard(self, low, running):
@@ -1956,28 +2553,20 @@ class State(object):
                     if isinstance(req, six.string_types):
                         req = {'id': req}
                     req = trim_req(req)
-                    found = False
-                    for chunk in chunks:
-                        req_key = next(iter(req))
-                        req_val = req[req_key]
-                        if req_val is None:
-                            continue
-                        if req_key == 'sls':
-                            # Allow requisite tracking of entire sls files
-                            if fnmatch.fnmatch(chunk['__sls__'], req_val):
-                                found = True
-                                reqs[r_state].append(chunk)
-                            continue
-                        try:
-                            if (fnmatch.fnmatch(chunk['name'], req_val) or
-                                fnmatch.fnmatch(chunk['__id__'], req_val)):
-                                if req_key == 'id' or chunk['state'] == req_key:
-                                    found = True
-                                    reqs[r_state].append(chunk)
-                        except KeyError:
-                            raise SaltRenderError('Could not locate requisite of [{0}] present in state with name [{1}]'.format(req_key, chunk['name']))
+                    req_key = next(iter(req))
+                    found = self.find_requisite(chunks, req_key, req[req_key])
                     if not found:
                         return 'unmet', ()
+                    reqs[r_state].extend(found)
+        if self.parallel_procs:
+            # Requisites which are still running in parallel need to finish
+            # before their results can be checked
+            self.reconcile_procs(wait=[
+                running[_gen_tag(chunk)]
+                for r_state, r_chunks in six.iteritems(reqs)
+                if r_state != 'prereq'
+                for chunk in r_chunks
+                if _gen_tag(chunk) in running])
         fun_stats = set()
         for r_state, chunks in six.iteritems(reqs):
             if r_state == 'prereq':
@@ -2033,7 +2622,7 @@ class State(object):
 
         return status, reqs
 
-    def event(self, chunk_ret, length, fire_event=False):
+    def event(self, chunk_ret, length, fire_event=False, state_tag=None):
         '''
         Fire an event on the master bus
 
@@ -2047,8 +2636,18 @@ class State(object):
         If the `state_events` is set to True in the config, then after the
         chunk is evaluated an event will be set up to the master with the
         results.
-        '''
-        if not self.opts.get('local') and (self.opts.get('state_events', True) or fire_event):
+
+        If `state_stream_returns` is set to True in the config, the event also
+        carries the `state_tag` of the chunk, and the chunk result is marked as
+        streamed once the master has received it. The minion then leaves the
+        result out of the job return and the master puts it back in.
+        '''
+        stream = state_tag is not None \
+            and not fire_event \
+            and self.opts.get('state_stream_returns', False) \
+            and bool(self.opts.get('master_uri')) \
+            and salt.utils.jid.is_jid(self.jid)
+        if not self.opts.get('local') and (self.opts.get('state_events', True) or fire_event or stream):
             if not self.opts.get('master_uri'):
                 ev_func = lambda ret, tag, preload=None: salt.utils.event.get_master_event(
                     self.opts, self.opts['sock_dir'], listen=False).fire_event(ret, tag)
@@ -2069,8 +2668,11 @@ class State(object):
                         [self.jid, 'prog', self.opts['id'], str(chunk_ret['__run_num__'])], 'job'
                         )
                 ret['len'] = length
+                if stream:
+                    ret['state_tag'] = state_tag
             preload = {'jid': self.jid}
-            ev_func(ret, tag, preload=preload)
+            if ev_func(ret, tag, preload=preload) and stream:
+                chunk_ret['__streamed__'] = True
 
     def call_chunk(self, low, running, chunks):
         '''
@@ -2102,26 +2704,13 @@ class State(object):
                     found = False
                     req_key = next(iter(req))
                     req_val = req[req_key]
-                    for chunk in chunks:
-                        if req_val is None:
-                            continue
-                        if req_key == 'sls':
-                            # Allow requisite tracking of entire sls files
-                            if fnmatch.fnmatch(chunk['__sls__'], req_val):
-                                if requisite == 'prereq':
-                                    chunk['__prereq__'] = True
-                                reqs.append(chunk)
-                                found = True
-                            continue
-                        if (fnmatch.fnmatch(chunk['name'], req_val) or
-                            fnmatch.fnmatch(chunk['__id__'], req_val)):
-                            if req_key == 'id' or chunk['state'] == req_key:
-                                if requisite == 'prereq':
-                                    chunk['__prereq__'] = True
-                                elif requisite == 'prerequired':
-                                    chunk['__prerequired__'] = True
-                                reqs.append(chunk)
-                                found = True
+                    for chunk in self.find_requisite(chunks, req_key, req_val):
+                        if requisite == 'prereq':
+                            chunk['__prereq__'] = True
+                        elif requisite == 'prerequired' and req_key != 'sls':
+                            chunk['__prerequired__'] = True
+                        reqs.append(chunk)
+                        found = True
                     if not found:
                         lost[requisite].append(req)
             if lost['require'] or lost['watch'] or lost['prereq'] or lost['onfail'] or lost['onchanges'] or lost.get('prerequired'):
@@ -2142,7 +2731,8 @@ class State(object):
                                 '__run_num__': self.__run_num,
                                 '__sls__': low['__sls__']}
                 self.__run_num += 1
-                self.event(running[tag], len(chunks), fire_event=low.get('fire_event'))
+                self.event(running[tag], len(chunks), fire_event=low.get('fire_event'),
+                           state_tag=tag)
                 return running
             for chunk in reqs:
                 # Check to see if the chunk has been run, only run it if
@@ -2167,7 +2757,8 @@ class State(object):
                                     '__run_num__': self.__run_num,
                                     '__sls__': low['__sls__']}
                         self.__run_num += 1
-                        self.event(running[tag], len(chunks), fire_event=low.get('fire_event'))
+                        self.event(running[tag], len(chunks), fire_event=low.get('fire_event'),
+                                   state_tag=tag)
                         return running
                     running = self.call_chunk(chunk, running, chunks)
                     if self.check_failhard(chunk, running):
@@ -2229,6 +2820,10 @@ class State(object):
                 }
             self.__run_num += 1
         elif status == 'change' and not low.get('__prereq__'):
+            # Whether mod_watch is needed depends on the changes the state
+            # made, so a state with a firing watch is not run in parallel
+            low = low.copy()
+            low.pop('parallel', None)
             ret = self.call(low, chunks, running)
             if not ret['changes'] and not ret.get('skip_watch', False):
                 low = low.copy()
@@ -2266,7 +2861,13 @@ class State(object):
             else:
                 running[tag] = self.call(low, chunks, running)
         if tag in running:
-            self.event(running[tag], len(chunks), fire_event=low.get('fire_event'))
+            if id(running[tag]) in self.parallel_procs:
+                # The event is fired once the parallel state has finished
+                self.parallel_procs[id(running[tag])].update({
+                    'chunk': low, 'length': len(chunks)})
+            else:
+                self.event(running[tag], len(chunks), fire_event=low.get('fire_event'),
+                           state_tag=tag)
         return running
 
     def call_listen(self, chunks, running):
@@ -2331,25 +2932,125 @@ class State(object):
         running.update(errors)
         return running
 
-    def call_high(self, high, orchestration_jid=None):
+    def _lowstate_cache_key(self, high, orchestration_jid=None):
         '''
-        Process a high data call and ensure the defined states.
+        Return the low state cache key of the given high data
+        '''
+        key_data = json.dumps(
+            [high, orchestration_jid, salt.version.__version__],
+            default=repr
+        )
+        return hashlib.sha256(key_data.encode('utf-8')).hexdigest()
+
+    def _get_lowstate_cache(self, key):
+        '''
+        Return the low chunks cached under the given key, if any
+        '''
+        cache_path = os.path.join(self.opts['cachedir'],
+                                  'lowstate',
+                                  '{0}.json'.format(key))
+        if not os.path.isfile(cache_path):
+            return None
+        try:
+            with salt.utils.fopen(cache_path, 'r') as fp_:
+                chunks = json.load(fp_, object_pairs_hook=OrderedDict)
+        except Exception as exc:
+            log.debug('Unable to read low state cache {0}: {1}'.format(cache_path, exc))
+            return None
+        if not isinstance(chunks, list):
+            return None
+        try:
+            os.utime(cache_path, None)
+        except OSError:
+            pass
+        log.debug('Using cached low state {0}'.format(key))
+        return chunks
+
+    def _set_lowstate_cache(self, key, chunks):
+        '''
+        Store the compiled low chunks under the given key, and remove the
+        least recently used compiled highstates beyond LOWSTATE_CACHE_SIZE
+        '''
+        try:
+            cache = json.dumps(chunks)
+            unchanged = json.loads(cache, object_pairs_hook=OrderedDict) == chunks
+        except (TypeError, ValueError):
+            unchanged = False
+        if not unchanged:
+            log.trace('Low state {0} cannot be cached'.format(key))
+            return
+        cache_dir = os.path.join(self.opts['cachedir'], 'lowstate')
+        try:
+            if not os.path.isdir(cache_dir):
+                os.makedirs(cache_dir)
+            with salt.utils.atomicfile.atomic_open(
+                    os.path.join(cache_dir, '{0}.json'.format(key)), 'w') as fp_:
+                fp_.write(cache)
+            files = []
+            for fn_ in os.listdir(cache_dir):
+                path = os.path.join(cache_dir, fn_)
+                try:
+                    files.append((os.path.getmtime(path), path))
+                except OSError:
+                    continue
+            for _, path in sorted(files, reverse=True)[LOWSTATE_CACHE_SIZE:]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        except (IOError, OSError) as exc:
+            log.debug('Unable to write low state cache {0}: {1}'.format(key, exc))
+
+    def compile_high(self, high, orchestration_jid=None):
         '''
+        Reconcile, verify and compile the high data into ordered low chunks.
+        Returns a tuple of the chunks and a list of errors.
+
+        If state_lowstate_cache is enabled the chunks are stored in the
+        cachedir and reused the next time the same high data is compiled.
+        '''
+        key = None
+        if self.opts.get('state_lowstate_cache', False):
+            try:
+                key = self._lowstate_cache_key(high, orchestration_jid)
+            except (TypeError, ValueError) as exc:
+                log.debug('Unable to determine the low state cache key: {0}'.format(exc))
+            if key is not None:
+                chunks = self._get_lowstate_cache(key)
+                if chunks is not None:
+                    self.requisite_index = None
+                    return chunks, []
         errors = []
         # If there is extension data reconcile it
         high, ext_errors = self.reconcile_extend(high)
         errors += ext_errors
+        # Verify that the high data is structurally sound
         errors += self.verify_high(high)
         if errors:
-            return errors
+            return [], errors
         high, req_in_errors = self.requisite_in(high)
         errors += req_in_errors
         high = self.apply_exclude(high)
-        # Verify that the high data is structurally sound
         if errors:
-            return errors
+            return [], errors
         # Compile and verify the raw chunks
         chunks = self.compile_high_data(high, orchestration_jid)
+        if key is not None:
+            self._set_lowstate_cache(key, chunks)
+        return chunks, errors
+
+    def call_high(self, high, orchestration_jid=None):
+        '''
+        Process a high data call and ensure the defined states.
+        '''
+        chunks, errors = self.compile_high(high, orchestration_jid)
+        if errors:
+            return errors
+        if self.opts.get('state_journal', False):
+            self.journal = StateJournal(
+                self.opts,
+                self.functions,
+                verify=self.opts.get('state_verify') == 'full')
 
         # Check for any disabled states
         disabled = {}
@@ -2381,6 +3082,13 @@ class State(object):
             return errors
         ret = dict(list(disabled.items()) + list(self.call_chunks(chunks).items()))
         ret = self.call_listen(chunks, ret)
+        if 'service.snapshot' in self.functions:
+            # Drop the state of the services read by the aggregation, the
+            # services it covered may not all have been checked
+            self.functions['service.snapshot']([])
+        if self.journal is not None:
+            self.journal.write()
+            self.journal = None
 
         def _cleanup_accumulator_data():
             accum_data_path = os.path.join(
@@ -2526,6 +3234,118 @@ class BaseHighState(object):
         self.avail = self.__gather_avail()
         self.serial = salt.payload.Serial(self.opts)
         self.building_highstate = {}
+        self.prefetched = {}
+        # The idle fileclients of the prefetch threads, reused by every
+        # prefetch of the highstate
+        self._prefetch_clients = []
+        self._prefetch_clients_lock = threading.Lock()
+
+    def _prefetch(self, requests):
+        '''
+        Run fileclient requests, given as tuples of the fileclient method, the
+        path and the saltenv, ahead of the state compiler. The files of each
+        saltenv are fetched with a single archive request if the master
+        supports it, the other requests are run up to state_prefetch_max at
+        the same time, each thread uses a fileclient of the pool kept until
+        _destroy_prefetch_clients is called. The results are used by _fetch.
+        '''
+        max_ = self.opts.get('state_prefetch_max', 0)
+        if max_ < 1 \
+                or not isinstance(self.client, salt.fileclient.RemoteClient) \
+                or isinstance(self.client, salt.fileclient.FSClient):
+            return
+        requests = [request for request in OrderedDict.fromkeys(requests)
+                    if request not in self.prefetched]
+        requests = self._prefetch_archive(requests)
+        if max_ < 2 or len(requests) < 2:
+            return
+
+        def _fetch(request):
+            with self._prefetch_clients_lock:
+                client = self._prefetch_clients.pop() \
+                    if self._prefetch_clients else None
+            if client is None:
+                client = salt.fileclient.get_file_client(self.opts)
+            method, path, saltenv = request
+            try:
+                return request, getattr(client, method)(path, saltenv)
+            except Exception as exc:
+                log.debug('Unable to prefetch {0}:{1}: {2}'.format(saltenv, path, exc))
+                return request, None
+            finally:
+                with self._prefetch_clients_lock:
+                    self._prefetch_clients.append(client)
+
+        log.debug('Prefetching {0} files from the fileserver'.format(len(requests)))
+        pool = ThreadPool(min(max_, len(requests)))
+        try:
+            for request, result in pool.imap_unordered(_fetch, requests):
+                if result is not None:
+                    self.prefetched[request] = result
+        finally:
+            pool.close()
+            pool.join()
+
+    def _destroy_prefetch_clients(self):
+        '''
+        Close the fileclients of the prefetch threads
+        '''
+        with self._prefetch_clients_lock:
+            clients, self._prefetch_clients = self._prefetch_clients, []
+        for client in clients:
+            client.destroy()
+
+    def _prefetch_archive(self, requests):
+        '''
+        Fetch the files of the get_state and cache_file requests with one
+        archive request per saltenv, return the requests which are left
+        '''
+        paths = OrderedDict()
+        for request in requests:
+            method, path, saltenv = request
+            if method == 'get_state':
+                sls = path.replace('.', '/')
+                paths[request] = [sls + '.sls', sls + '/init.sls']
+            elif method == 'cache_file' and path.startswith('salt://'):
+                rel_path, senv = salt.utils.url.parse(path)
+                if not senv or senv == saltenv:
+                    paths[request] = [rel_path]
+        if not paths:
+            return requests
+
+        left = []
+        cached = {}
+        for saltenv in set(request[2] for request in paths):
+            env_paths = [path for request in paths if request[2] == saltenv
+                         for path in paths[request]]
+            cached[saltenv] = self.client.cache_archive(env_paths, saltenv)
+            if cached[saltenv] is None:
+                return requests
+        for request in requests:
+            if request not in paths:
+                left.append(request)
+                continue
+            method, path, saltenv = request
+            found = [(rel_path, cached[saltenv][rel_path])
+                     for rel_path in paths[request]
+                     if rel_path in cached[saltenv]]
+            if method == 'get_state':
+                self.prefetched[request] = {} if not found else \
+                    {'source': salt.utils.url.create(found[0][0]),
+                     'dest': found[0][1]}
+            else:
+                self.prefetched[request] = found[0][1] if found else False
+        return left
+
+    def _fetch(self, method, path, saltenv):
+        '''
+        Return the result of a fileclient request, using the prefetched result
+        if there is one
+        '''
+        request = (method, path, saltenv)
+        if request in self.prefetched:
+            return self.prefetched.pop(request)
+        return getattr(self.client, method)(path, saltenv)
 
     def __gather_avail(self):
         '''
@@ -2652,9 +3472,13 @@ class BaseHighState(object):
                     and not isinstance(state_top_saltenv, six.string_types):
                 state_top_saltenv = str(state_top_saltenv)
 
-            for saltenv in [state_top_saltenv] if state_top_saltenv \
-                    else self._get_envs():
-                contents = self.client.cache_file(
+            saltenvs = [state_top_saltenv] if state_top_saltenv \
+                else self._get_envs()
+            self._prefetch([('cache_file', self.opts['state_top'], saltenv)
+                            for saltenv in saltenvs])
+            for saltenv in saltenvs:
+                contents = self._fetch(
+                    'cache_file',
                     self.opts['state_top'],
                     saltenv
                 )
@@ -3034,13 +3858,134 @@ class BaseHighState(object):
             self.state.opts['pillar'] = self.state._gather_pillar()
         self.state.module_refresh()
 
+    def _render_cache_key(self, fn_, sls, saltenv):
+        '''
+        Return the key under which the rendered data of an SLS file is cached.
+        The key is a digest of the SLS source, every template it imports or
+        includes, and the values of the context variables the templates read.
+        Return None if the rendered data cannot be reused, for instance when
+        a template calls execution modules through ``salt``.
+        '''
+        sources = []
+        context = set()
+        with salt.utils.fopen(fn_, 'rb') as fp_:
+            source = fp_.read()
+        render_pipe = template_shebang(fn_,
+                                       self.state.rend,
+                                       self.state.opts['renderer'],
+                                       self.state.opts['renderer_blacklist'],
+                                       self.state.opts['renderer_whitelist'],
+                                       source.decode('utf-8'))
+        renderers = []
+        for render, argline in render_pipe:
+            name = render.__module__.split('.')[-1]
+            if name not in RENDER_CACHE_RENDERERS or (name == 'yaml' and argline):
+                return None
+            renderers.append(name)
+        pending = [source] if 'jinja' in renderers else []
+        sources.append(hashlib.sha256(source).hexdigest())
+        seen = set()
+        while pending:
+            variables, references = \
+                salt.utils.templates.jinja_template_dependencies(pending.pop())
+            if not variables.issubset(RENDER_CACHE_CONTEXT):
+                return None
+            context.update(variables)
+            for ref in references:
+                if ref is None:
+                    return None
+                if ref in seen:
+                    continue
+                seen.add(ref)
+                path = self.client.cache_file(salt.utils.url.create(ref), saltenv)
+                if not path:
+                    return None
+                with salt.utils.fopen(path, 'rb') as fp_:
+                    ref_source = fp_.read()
+                sources.append(hashlib.sha256(ref_source).hexdigest())
+                pending.append(ref_source)
+        values = {}
+        for name in context & set(['grains', 'pillar']):
+            values[name] = self.state.opts.get(name, {})
+        key_data = json.dumps(
+            [saltenv, sls, renderers, sources, values, salt.version.__version__,
+             [self.state.opts.get(opt, False) for opt in RENDER_CACHE_OPTS]],
+            sort_keys=True,
+            default=repr
+        )
+        return hashlib.sha256(key_data.encode('utf-8')).hexdigest()
+
+    def _render_cache_path(self, sls, saltenv):
+        '''
+        Return the path of the render cache file for an SLS
+        '''
+        name = hashlib.sha1('{0}:{1}'.format(saltenv, sls).encode('utf-8'))
+        return os.path.join(self.opts['cachedir'],
+                            'sls_render',
+                            '{0}.json'.format(name.hexdigest()))
+
+    def _get_render_cache(self, fn_, sls, saltenv):
+        '''
+        Return a tuple of the render cache key for an SLS and the rendered
+        data cached under it, if any
+        '''
+        try:
+            key = self._render_cache_key(fn_, sls, saltenv)
+        except Exception as exc:
+            log.debug(
+                'Unable to determine the render cache key of SLS {0}:{1}: {2}'
+                .format(saltenv, sls, exc)
+            )
+            return None, None
+        if key is None:
+            log.trace('SLS {0}:{1} cannot use the render cache'.format(saltenv, sls))
+            return None, None
+        cache_path = self._render_cache_path(sls, saltenv)
+        if not os.path.isfile(cache_path):
+            return key, None
+        try:
+            with salt.utils.fopen(cache_path, 'r') as fp_:
+                cache = json.load(fp_, object_pairs_hook=OrderedDict)
+        except Exception as exc:
+            log.debug('Unable to read render cache {0}: {1}'.format(cache_path, exc))
+            return key, None
+        if not isinstance(cache, dict) or cache.get('key') != key:
+            return key, None
+        log.debug('Using cached render of SLS {0}:{1}'.format(saltenv, sls))
+        return key, cache.get('data')
+
+    def _set_render_cache(self, key, state, sls, saltenv):
+        '''
+        Store the rendered data of an SLS under the given render cache key
+        '''
+        # JSON keeps the order of the rendered data, which the state auto
+        # ordering relies on. Only cache data which makes it through
+        # serialization unchanged.
+        try:
+            cache = json.dumps({'key': key, 'data': state})
+            unchanged = json.loads(cache, object_pairs_hook=OrderedDict)['data'] == state
+        except (TypeError, ValueError):
+            unchanged = False
+        if not unchanged:
+            log.trace('Rendered data of SLS {0}:{1} cannot be cached'.format(saltenv, sls))
+            return
+        cache_path = self._render_cache_path(sls, saltenv)
+        try:
+            cache_dir = os.path.dirname(cache_path)
+            if not os.path.isdir(cache_dir):
+                os.makedirs(cache_dir)
+            with salt.utils.atomicfile.atomic_open(cache_path, 'w') as fp_:
+                fp_.write(cache)
+        except (IOError, OSError) as exc:
+            log.debug('Unable to write render cache {0}: {1}'.format(cache_path, exc))
+
     def render_state(self, sls, saltenv, mods, matches, local=False):
         '''
         Render a state file and retrieve all of the include states
         '''
         errors = []
         if not local:
-            state_data = self.client.get_state(sls, saltenv)
+            state_data = self._fetch('get_state', sls, saltenv)
             fn_ = state_data.get('dest', False)
         else:
             fn_ = sls
@@ -3056,16 +4001,22 @@ class BaseHighState(object):
                 'fileserver'.format(sls, saltenv)
             )
         state = None
+        cache_key = None
+        if fn_ and not local and self.opts.get('state_render_cache', False):
+            cache_key, state = self._get_render_cache(fn_, sls, saltenv)
         try:
-            state = compile_template(fn_,
-                                     self.state.rend,
-                                     self.state.opts['renderer'],
-                                     self.state.opts['renderer_blacklist'],
-                                     self.state.opts['renderer_whitelist'],
-                                     saltenv,
-                                     sls,
-                                     rendered_sls=mods
-                                     )
+            if state is None:
+                state = compile_template(fn_,
+                                         self.state.rend,
+                                         self.state.opts['renderer'],
+                                         self.state.opts['renderer_blacklist'],
+                                         self.state.opts['renderer_whitelist'],
+                                         saltenv,
+                                         sls,
+                                         rendered_sls=mods
+                                         )
+                if cache_key is not None and isinstance(state, dict):
+                    self._set_render_cache(cache_key, state, sls, saltenv)
         except SaltRenderError as exc:
             msg = 'Rendering SLS \'{0}:{1}\' failed: {2}'.format(
                 saltenv, sls, exc
@@ -3105,6 +4056,9 @@ class BaseHighState(object):
                 self._handle_exclude(state, sls, saltenv, errors)
                 self._handle_state_decls(state, sls, saltenv, errors)
 
+                # Resolve all of the includes first, so that the included
+                # SLS files can be fetched at the same time
+                targets = []
                 for inc_sls in include:
                     # inc_sls may take the form of:
                     #   'sls.to.include' <- same as {<saltenv>: 'sls.to.include'}
@@ -3180,19 +4134,7 @@ class BaseHighState(object):
 
                         for sls_target in sls_targets:
                             r_env = resolved_envs[0] if len(resolved_envs) == 1 else saltenv
-                            mod_tgt = '{0}:{1}'.format(r_env, sls_target)
-                            if mod_tgt not in mods:
-                                nstate, err = self.render_state(
-                                    sls_target,
-                                    r_env,
-                                    mods,
-                                    matches
-                                )
-                                if nstate:
-                                    self.merge_included_states(state, nstate, errors)
-                                    state.update(nstate)
-                                if err:
-                                    errors.extend(err)
+                            targets.append((sls_target, r_env))
                     else:
                         msg = ''
                         if not resolved_envs:
@@ -3209,6 +4151,24 @@ class BaseHighState(object):
                                             ', '.join(resolved_envs))
                         log.critical(msg)
                         errors.append(msg)
+
+                self._prefetch([('get_state', sls_target, r_env)
+                                for sls_target, r_env in targets
+                                if '{0}:{1}'.format(r_env, sls_target) not in mods])
+                for sls_target, r_env in targets:
+                    mod_tgt = '{0}:{1}'.format(r_env, sls_target)
+                    if mod_tgt not in mods:
+                        nstate, err = self.render_state(
+                            sls_target,
+                            r_env,
+                            mods,
+                            matches
+                        )
+                        if nstate:
+                            self.merge_included_states(state, nstate, errors)
+                            state.update(nstate)
+                        if err:
+                            errors.extend(err)
                 try:
                     self._handle_iorder(state)
                 except TypeError:
@@ -3365,6 +4325,12 @@ class BaseHighState(object):
         all_errors = []
         mods = set()
         statefiles = []
+        prefetch = []
+        for saltenv, states in six.iteritems(matches):
+            for sls_match in states:
+                for sls in fnmatch.filter(self.avail.get(saltenv, []), sls_match) or [sls_match]:
+                    prefetch.append(('get_state', sls, saltenv))
+        self._prefetch(prefetch)
         for saltenv, states in six.iteritems(matches):
             for sls_match in states:
                 try:
@@ -3400,6 +4366,8 @@ class BaseHighState(object):
                                     'in env \'{1}\''.format(sls_match, saltenv))
                     all_errors.extend(errors)
 
+        # Every file of the highstate has been fetched
+        self._destroy_prefetch_clients()
         self.clean_duplicate_extends(highstate)
         return highstate, all_errors
 
@@ -3573,22 +4541,11 @@ class BaseHighState(object):
         matches = self.top_matches(top)
         high, errors = self.render_highstate(matches)
 
-        # If there is extension data reconcile it
-        high, ext_errors = self.state.reconcile_extend(high)
-        errors += ext_errors
-
-        # Verify that the high data is structurally sound
-        errors += self.state.verify_high(high)
-        high, req_in_errors = self.state.requisite_in(high)
-        errors += req_in_errors
-        high = self.state.apply_exclude(high)
-
+        chunks, compile_errors = self.state.compile_high(high)
+        errors += compile_errors
         if errors:
             return errors
 
-        # Compile and verify the raw chunks
-        chunks = self.state.compile_high_data(high)
-
         return chunks
 
     def compile_state_usage(self):
@@ -3683,7 +4640,7 @@ class HighState(BaseHighState):
 
     @classmethod
     def pop_active(cls):
-        cls.stack.pop()
+        cls.stack.pop()._destroy_prefetch_clients()
 
     @classmethod
     def get_active(cls):
@@ -715,6 +715,49 @@ def unmasked(name, runtime=False):
         return ret
 
 
+def mod_aggregate(low, chunks, running):
+    '''
+    The mod_aggregate function which reads the state of the services managed
+    by this and the directly following service states with a single
+    ``service.snapshot`` call, if the service module supports it. States with
+    requisites or conditions may not run, or may run other states first, so
+    they end the group.
+    '''
+    agg_enabled = [
+        'running',
+        'dead',
+        'enabled',
+        'disabled',
+    ]
+    if low.get('fun') not in agg_enabled or 'service.snapshot' not in __salt__:
+        return low
+    conditions = set(['onlyif', 'unless', 'require', 'watch', 'prereq',
+                      'prerequired', 'onchanges', 'onfail', 'listen'])
+    low_tag = salt.utils.gen_state_tag(low)
+    names = []
+    started = False
+    for chunk in chunks:
+        tag = salt.utils.gen_state_tag(chunk)
+        if not started:
+            started = tag == low_tag
+            if not started:
+                continue
+        elif tag in running or '__agg__' in chunk:
+            continue
+        # Only the states up to the next non service state are included,
+        # other states may change the services before they are checked
+        if chunk.get('state') != 'service' \
+                or chunk.get('fun') not in agg_enabled \
+                or conditions.intersection(chunk):
+            break
+        if chunk is not low:
+            chunk['__agg__'] = True
+        names.append(chunk['name'])
+    if len(names) > 1:
+        __salt__['service.snapshot'](names)
+    return low
+
+
 def mod_watch(name,
               sfun=None,
               sig=None,
@@ -7,7 +7,6 @@ import contextlib
 import distutils.version  # pylint: disable=import-error,no-name-in-module
 import errno
 import fnmatch
-import glob
 import hashlib
 import logging
 import os
@@ -16,6 +15,8 @@ import shlex
 import shutil
 import stat
 import subprocess
+import tempfile
+import threading
 import time
 from datetime import datetime
 
@@ -27,15 +28,26 @@ import salt.fileserver
 from salt.utils.process import os_is_running as pid_exists
 from salt.exceptions import FileserverConfigError, GitLockError, get_error_message
 from salt.utils.event import tagify
+from salt.utils.odict import OrderedDict
 
 # Import third party libs
 import salt.ext.six as six
+from salt.ext.six.moves import queue  # pylint: disable=import-error
 
 VALID_PROVIDERS = ('gitpython', 'pygit2', 'dulwich')
 # Optional per-remote params that can only be used on a per-remote basis, and
 # thus do not have defaults in salt/config.py.
 PER_REMOTE_ONLY = ('name',)
 SYMLINK_RECURSE_DEPTH = 100
+# The number of pygit2 tree indexes kept by each process
+TREE_INDEX_SIZE = 16
+# The pygit2 tree indexes, by cachedir of the remote and tree oid, least
+# recently used first
+_TREE_INDEXES = OrderedDict()
+_TREE_INDEXES_LOCK = threading.Lock()
+# Blobs in the gitfs blob cache which have not been written for this many
+# seconds are removed, they are written again when they are requested
+BLOB_CACHE_MAX_AGE = 7 * 86400
 
 # Auth support (auth params can be global or per-remote, too)
 AUTH_PROVIDERS = ('pygit2',)
@@ -377,6 +389,13 @@ class GitProvider(object):
     def _get_lock_file(self, lock_type='update'):
         return salt.utils.path_join(self.gitdir, lock_type + '.lk')
 
+    def _get_fetch_timeout_file(self):
+        '''
+        Return the path of the file which marks a fetch which timed out, and
+        may have brought new refs after the update gave up on it
+        '''
+        return salt.utils.path_join(self.gitdir, 'fetch_timeout')
+
     @classmethod
     def add_conf_overlay(cls, name):
         '''
@@ -1351,43 +1370,13 @@ class Pygit2(GitProvider):
         '''
         Get a list of directories for the target environment using pygit2
         '''
-        def _traverse(tree, blobs, prefix):
-            '''
-            Traverse through a pygit2 Tree object recursively, accumulating all
-            the empty directories within it in the "blobs" list
-            '''
-            for entry in iter(tree):
-                if entry.oid not in self.repo:
-                    # Entry is a submodule, skip it
-                    continue
-                blob = self.repo[entry.oid]
-                if not isinstance(blob, pygit2.Tree):
-                    continue
-                blobs.append(salt.utils.path_join(prefix, entry.name))
-                if len(blob):
-                    _traverse(blob, blobs, salt.utils.path_join(prefix, entry.name))
-
         ret = set()
-        tree = self.get_tree(tgt_env)
-        if not tree:
+        tree = self._root_tree(tgt_env)
+        if tree is None:
             return ret
-        if self.root(tgt_env):
-            try:
-                oid = tree[self.root(tgt_env)].oid
-                tree = self.repo[oid]
-            except KeyError:
-                return ret
-            if not isinstance(tree, pygit2.Tree):
-                return ret
-            relpath = lambda path: os.path.relpath(path, self.root(tgt_env))
-        else:
-            relpath = lambda path: path
-        blobs = []
-        if len(tree):
-            _traverse(tree, blobs, self.root(tgt_env))
         add_mountpoint = lambda path: salt.utils.path_join(self.mountpoint(tgt_env), path)
-        for blob in blobs:
-            ret.add(add_mountpoint(relpath(blob)))
+        for path in self.tree_index(tree)['dirs']:
+            ret.add(add_mountpoint(path))
         if self.mountpoint(tgt_env):
             ret.add(self.mountpoint(tgt_env))
         return ret
@@ -1464,53 +1453,78 @@ class Pygit2(GitProvider):
         '''
         Get file list for the target environment using pygit2
         '''
-        def _traverse(tree, blobs, prefix):
-            '''
-            Traverse through a pygit2 Tree object recursively, accumulating all
-            the file paths and symlink info in the "blobs" dict
-            '''
-            for entry in iter(tree):
-                if entry.oid not in self.repo:
-                    # Entry is a submodule, skip it
-                    continue
-                obj = self.repo[entry.oid]
-                if isinstance(obj, pygit2.Blob):
-                    repo_path = salt.utils.path_join(prefix, entry.name)
-                    blobs.setdefault('files', []).append(repo_path)
-                    if stat.S_ISLNK(tree[entry.name].filemode):
-                        link_tgt = self.repo[tree[entry.name].oid].data
-                        blobs.setdefault('symlinks', {})[repo_path] = link_tgt
-                elif isinstance(obj, pygit2.Tree):
-                    _traverse(obj, blobs, salt.utils.path_join(prefix, entry.name))
-
         files = set()
         symlinks = {}
-        tree = self.get_tree(tgt_env)
-        if not tree:
+        tree = self._root_tree(tgt_env)
+        if tree is None:
             # Not found, return empty objects
             return files, symlinks
+        index = self.tree_index(tree)
+        add_mountpoint = lambda path: salt.utils.path_join(self.mountpoint(tgt_env), path)
+        for repo_path in index['files']:
+            files.add(add_mountpoint(repo_path))
+        for repo_path, link_tgt in six.iteritems(index['symlinks']):
+            symlinks[add_mountpoint(repo_path)] = link_tgt
+        return files, symlinks
+
+    def _root_tree(self, tgt_env):
+        '''
+        Return the pygit2.Tree object of the root of the target environment, or
+        None if it is not found
+        '''
+        tree = self.get_tree(tgt_env)
+        if not tree:
+            return None
         if self.root(tgt_env):
             try:
                 # This might need to be changed to account for a root that
                 # spans more than one directory
-                oid = tree[self.root(tgt_env)].oid
-                tree = self.repo[oid]
+                tree = self.repo[tree[self.root(tgt_env)].oid]
             except KeyError:
-                return files, symlinks
+                return None
             if not isinstance(tree, pygit2.Tree):
-                return files, symlinks
-            relpath = lambda path: os.path.relpath(path, self.root(tgt_env))
-        else:
-            relpath = lambda path: path
-        blobs = {}
-        if len(tree):
-            _traverse(tree, blobs, self.root(tgt_env))
-        add_mountpoint = lambda path: salt.utils.path_join(self.mountpoint(tgt_env), path)
-        for repo_path in blobs.get('files', []):
-            files.add(add_mountpoint(relpath(repo_path)))
-        for repo_path, link_tgt in six.iteritems(blobs.get('symlinks', {})):
-            symlinks[add_mountpoint(relpath(repo_path))] = link_tgt
-        return files, symlinks
+                return None
+        return tree
+
+    def tree_index(self, tree):
+        '''
+        Return an index of the files, symlinks and directories in a pygit2.Tree
+        object, with the paths relative to the tree. Trees never change, so the
+        index is kept by the repository and the oid of the tree, and reused
+        for every saltenv and every file list which has the same tree. The
+        indexes are kept by the process, as the fileserver builds new
+        providers for every request.
+        '''
+        key = (self.cachedir, tree.hex)
+        with _TREE_INDEXES_LOCK:
+            index = _TREE_INDEXES.pop(key, None)
+            if index is not None:
+                _TREE_INDEXES[key] = index
+                return index
+        index = {'files': [], 'symlinks': {}, 'dirs': []}
+        # The type of each entry is taken from its filemode, so the blobs
+        # do not have to be loaded to walk the tree
+        trees = [('', tree)]
+        while trees:
+            prefix, subtree = trees.pop()
+            for entry in subtree:
+                if entry.oid not in self.repo:
+                    # Entry is a submodule, skip it
+                    continue
+                path = salt.utils.path_join(prefix, entry.name) \
+                    if prefix else entry.name
+                if stat.S_ISDIR(entry.filemode):
+                    index['dirs'].append(path)
+                    trees.append((path, self.repo[entry.oid]))
+                else:
+                    index['files'].append(path)
+                    if stat.S_ISLNK(entry.filemode):
+                        index['symlinks'][path] = self.repo[entry.oid].data
+        with _TREE_INDEXES_LOCK:
+            _TREE_INDEXES[key] = index
+            while len(_TREE_INDEXES) > TREE_INDEX_SIZE:
+                _TREE_INDEXES.popitem(last=False)
+        return index
 
     def find_file(self, path, tgt_env):
         '''
@@ -2119,6 +2133,8 @@ class GitBase(object):
             self.cache_root, 'hash')
         self.file_list_cachedir = salt.utils.path_join(
             self.opts['cachedir'], 'file_lists', self.role)
+        # The duration and outcome of the last fetch of each remote
+        self.fetch_stats = {}
 
     def init_remotes(self, remotes, per_remote_overrides,
                      per_remote_only=PER_REMOTE_ONLY):
@@ -2259,7 +2275,7 @@ class GitBase(object):
                 pass
         to_remove = []
         for item in cachedir_ls:
-            if item in ('hash', 'refs'):
+            if item in ('blobs', 'hash', 'refs'):
                 continue
             path = salt.utils.path_join(self.cache_root, item)
             if os.path.isdir(path):
@@ -2323,28 +2339,134 @@ class GitBase(object):
             errors.extend(failed)
         return cleared, errors
 
-    def fetch_remotes(self):
+    def fetch_remotes(self, remote=None):
         '''
         Fetch all remotes and return a boolean to let the calling function know
-        whether or not any remotes were updated in the process of fetching
+        whether or not any remotes were updated in the process of fetching.
+        If ``remote`` is passed, only the remotes with a URL matching this
+        pattern are fetched.
+
+        Up to ``<role>_fetch_concurrency`` remotes are fetched at the same
+        time. A fetch which takes longer than ``<role>_fetch_timeout`` seconds
+        is no longer waited for, it keeps its update lock until it finishes so
+        the remote is skipped by the following updates until then. The first
+        update after it finished reports the remote as changed, as the fetch
+        may have brought new refs. The duration and outcome of the fetch of
+        each remote are kept in ``fetch_stats``.
+        '''
+        concurrency = self.opts.get('{0}_fetch_concurrency'.format(self.role), 1)
+        timeout = self.opts.get('{0}_fetch_timeout'.format(self.role), 0)
+        fetch_stats = self.fetch_stats = {}
+        remotes = [repo for repo in self.remotes
+                   if remote is None or self._remote_matches(repo, remote)]
+        if concurrency <= 1 and not timeout:
+            for repo in remotes:
+                fetch_stats[repo.id] = self._fetch_remote(repo)
+        else:
+            self._fetch_concurrently(
+                remotes, fetch_stats, max(concurrency, 1), timeout)
+        # We can't just use the return value from repo.fetch() because the
+        # data could still have changed if old remotes were cleared above.
+        return any(stats['changed'] for stats in six.itervalues(fetch_stats))
+
+    @staticmethod
+    def _remote_matches(repo, remote):
         '''
-        changed = False
-        for repo in self.remotes:
+        Return True if the URL of the repo matches the remote pattern
+        '''
+        try:
+            return fnmatch.fnmatch(repo.url, remote)
+        except TypeError:
+            # remote was non-string, try again
+            return fnmatch.fnmatch(repo.url, six.text_type(remote))
+
+    def _fetch_remote(self, repo):
+        '''
+        Fetch a single remote, return the duration and outcome of the fetch
+        '''
+        stats = {'changed': False}
+        # A fetch which timed out may have brought new refs since, they are
+        # reported as a change once it released the update lock
+        timed_out = False
+        timeout_file = repo._get_fetch_timeout_file()
+        if os.path.isfile(timeout_file) \
+                and not os.path.isfile(repo._get_lock_file(lock_type='update')):
+            timed_out = True
             try:
-                if repo.fetch():
-                    # We can't just use the return value from repo.fetch()
-                    # because the data could still have changed if old remotes
-                    # were cleared above. Additionally, we're running this in a
-                    # loop and later remotes without changes would override
-                    # this value and make it incorrect.
-                    changed = True
-            except Exception as exc:
+                os.remove(timeout_file)
+            except OSError as exc:
                 log.error(
-                    'Exception \'{0}\' caught while fetching {1} remote '
-                    '\'{2}\''.format(exc, self.role, repo.id),
-                    exc_info_on_loglevel=logging.DEBUG
+                    'Unable to remove %s: %s', timeout_file, exc
                 )
-        return changed
+        start = time.time()
+        try:
+            stats['changed'] = bool(repo.fetch()) or timed_out
+        except Exception as exc:
+            stats['changed'] = timed_out
+            stats['error'] = six.text_type(exc)
+            log.error(
+                'Exception \'{0}\' caught while fetching {1} remote '
+                '\'{2}\''.format(exc, self.role, repo.id),
+                exc_info_on_loglevel=logging.DEBUG
+            )
+        stats['duration'] = time.time() - start
+        log.debug(
+            'Fetched %s remote \'%s\' in %.2fs (changed: %s)',
+            self.role, repo.id, stats['duration'], stats['changed']
+        )
+        return stats
+
+    def _fetch_concurrently(self, remotes, fetch_stats, concurrency, timeout):
+        '''
+        Fetch the remotes in up to concurrency threads, give up on the fetches
+        which take longer than timeout seconds
+        '''
+        done = queue.Queue()
+        pending = list(remotes)
+        running = {}
+
+        def _fetch(repo):
+            try:
+                fetch_stats.setdefault(repo.id, self._fetch_remote(repo))
+            finally:
+                done.put(repo)
+
+        while pending or running:
+            while pending and len(running) < concurrency:
+                repo = pending.pop(0)
+                thread = threading.Thread(target=_fetch, args=(repo,))
+                thread.daemon = True
+                thread.start()
+                running[repo] = time.time()
+            wait = None
+            if timeout:
+                wait = max(0, min(running.values()) + timeout - time.time())
+            try:
+                running.pop(done.get(timeout=wait), None)
+            except queue.Empty:
+                now = time.time()
+                for repo, start in list(running.items()):
+                    if now - start >= timeout:
+                        log.error(
+                            'Fetch of %s remote \'%s\' timed out after %ds, '
+                            'the remote will be skipped until the fetch '
+                            'finishes', self.role, repo.id, timeout
+                        )
+                        fetch_stats.setdefault(
+                            repo.id,
+                            {'changed': False,
+                             'duration': now - start,
+                             'error': 'timed out'})
+                        running.pop(repo)
+                        try:
+                            with salt.utils.fopen(
+                                    repo._get_fetch_timeout_file(), 'w'):
+                                pass
+                        except (IOError, OSError) as exc:
+                            log.error(
+                                'Unable to mark the fetch of %s remote \'%s\' '
+                                'as timed out: %s', self.role, repo.id, exc
+                            )
 
     def lock(self, remote=None):
         '''
@@ -2368,18 +2490,33 @@ class GitBase(object):
             errors.extend(failed)
         return locked, errors
 
-    def update(self):
+    def update(self, remote=None, ref=None):
         '''
         Execute a git fetch on all of the repos and perform maintenance on the
         fileserver cache.
+
+        If ``remote`` is passed, only the remotes with a URL matching this
+        pattern are fetched, and the file list caches of the saltenvs they
+        serve are cleared if they changed. ``ref`` narrows these saltenvs down
+        to the ones mapped to this branch or tag.
         '''
         # data for the fileserver event
         data = {'changed': False,
                 'backend': 'gitfs'}
 
-        data['changed'] = self.clear_old_remotes()
-        if self.fetch_remotes():
+        if remote is None:
+            data['changed'] = self.clear_old_remotes()
+        if self.fetch_remotes(remote=remote):
             data['changed'] = True
+        data['remotes'] = self.fetch_stats
+        if remote is not None:
+            data['remote'] = remote
+            data['ref'] = ref
+            self.clear_file_list_cache(
+                [repo for repo in self.remotes
+                 if self.fetch_stats.get(repo.id, {}).get('changed')],
+                ref=ref
+            )
 
         if data['changed'] is True or not os.path.isfile(self.env_cache):
             env_cachedir = os.path.dirname(self.env_cache)
@@ -2403,14 +2540,46 @@ class GitBase(object):
                 data,
                 tagify(['gitfs', 'update'], prefix='fileserver')
             )
-        try:
-            salt.fileserver.reap_fileserver_cache_dir(
-                self.hash_cachedir,
-                self.find_file
+        if remote is not None:
+            # The caches are maintained by the full updates
+            return
+        self.reap_blob_cache()
+
+    def clear_file_list_cache(self, remotes, ref=None):
+        '''
+        Remove the file list caches of the saltenvs served by the remotes, so
+        that they are rebuilt on the next request. If ``ref`` is passed, only
+        the caches of the saltenvs mapped to this branch or tag are removed.
+        The cached file hashes are keyed by blob SHA and never go stale.
+        '''
+        if ref is not None:
+            ref = re.sub('^refs/(heads|tags)/', '', ref)
+        saltenvs = set()
+        for repo in remotes:
+            if ref is None:
+                saltenvs.update(repo.envs())
+            else:
+                saltenvs.update(repo._get_envs_from_ref_paths(
+                    ['refs/remotes/origin/' + ref]))
+        for saltenv in saltenvs:
+            list_cache = salt.utils.path_join(
+                self.file_list_cachedir,
+                '{0}.p'.format(saltenv.replace(os.path.sep, '_|-'))
             )
-        except (OSError, IOError):
-            # Hash file won't exist if no files have yet been served up
-            pass
+            try:
+                os.remove(list_cache)
+            except OSError as exc:
+                if exc.errno != errno.ENOENT:
+                    log.error(
+                        'Unable to remove file list cache {0}: {1}'
+                        .format(list_cache, exc)
+                    )
+                continue
+            log.debug(
+                'Cleared the %s file list cache of saltenv \'%s\'',
+                self.role, saltenv
+            )
+        return sorted(saltenvs)
 
     def get_provider(self):
         '''
@@ -2731,33 +2900,6 @@ class GitFS(GitBase):
                 (not salt.utils.is_hex(tgt_env) and tgt_env not in self.envs()):
             return fnd
 
-        dest = salt.utils.path_join(self.cache_root, 'refs', tgt_env, path)
-        hashes_glob = salt.utils.path_join(self.hash_cachedir,
-                                           tgt_env,
-                                           '{0}.hash.*'.format(path))
-        blobshadest = salt.utils.path_join(self.hash_cachedir,
-                                           tgt_env,
-                                           '{0}.hash.blob_sha1'.format(path))
-        lk_fn = salt.utils.path_join(self.hash_cachedir,
-                                     tgt_env,
-                                     '{0}.lk'.format(path))
-        destdir = os.path.dirname(dest)
-        hashdir = os.path.dirname(blobshadest)
-        if not os.path.isdir(destdir):
-            try:
-                os.makedirs(destdir)
-            except OSError:
-                # Path exists and is a file, remove it and retry
-                os.remove(destdir)
-                os.makedirs(destdir)
-        if not os.path.isdir(hashdir):
-            try:
-                os.makedirs(hashdir)
-            except OSError:
-                # Path exists and is a file, remove it and retry
-                os.remove(hashdir)
-                os.makedirs(hashdir)
-
         for repo in self.remotes:
             if repo.mountpoint(tgt_env) \
                     and not path.startswith(repo.mountpoint(tgt_env) + os.sep):
@@ -2770,51 +2912,85 @@ class GitFS(GitBase):
             if blob is None:
                 continue
 
-            def _add_file_stat(fnd, mode):
-                '''
-                Add a the mode to the return dict. In other fileserver backends
-                we stat the file to get its mode, and add the stat result
-                (passed through list() for better serialization) to the 'stat'
-                key in the return dict. However, since we aren't using the
-                stat result for anything but the mode at this time, we can
-                avoid unnecessary work by just manually creating the list and
-                not running an os.stat() on all files in the repo.
-                '''
-                if mode is not None:
-                    fnd['stat'] = [mode]
-                return fnd
-
-            salt.fileserver.wait_lock(lk_fn, dest)
-            if os.path.isfile(blobshadest) and os.path.isfile(dest):
-                with salt.utils.fopen(blobshadest, 'r') as fp_:
-                    sha = fp_.read()
-                    if sha == blob_hexsha:
-                        fnd['rel'] = path
-                        fnd['path'] = dest
-                        return _add_file_stat(fnd, blob_mode)
-            with salt.utils.fopen(lk_fn, 'w+') as fp_:
-                fp_.write('')
-            for filename in glob.glob(hashes_glob):
+            # Blobs are cached by their SHA, a file which is the same in many
+            # saltenvs is only written once, and never has to be checked again
+            dest = self._blob_path(blob_hexsha)
+            if not os.path.isfile(dest):
+                destdir = os.path.dirname(dest)
+                if not os.path.isdir(destdir):
+                    try:
+                        os.makedirs(destdir)
+                    except OSError as exc:
+                        if exc.errno != errno.EEXIST:
+                            raise
+                # Write the blob under a temporary name and move it into
+                # place, other processes may be serving it at the same time
+                fd_, tmp = tempfile.mkstemp(dir=destdir, prefix='.tmp')
+                os.close(fd_)
+                try:
+                    repo.write_file(blob, tmp)
+                    os.rename(tmp, dest)
+                finally:
+                    if os.path.exists(tmp):
+                        os.remove(tmp)
+            else:
+                # Mark the blob as used so that it is not reaped
                 try:
-                    os.remove(filename)
-                except Exception:
+                    os.utime(dest, None)
+                except OSError:
                     pass
-            # Write contents of file to their destination in the FS cache
-            repo.write_file(blob, dest)
-            with salt.utils.fopen(blobshadest, 'w+') as fp_:
-                fp_.write(blob_hexsha)
-            try:
-                os.remove(lk_fn)
-            except OSError:
-                pass
             fnd['rel'] = path
             fnd['path'] = dest
-            return _add_file_stat(fnd, blob_mode)
+            if blob_mode is not None:
+                # In other fileserver backends we stat the file to get its
+                # mode, and add the stat result (passed through list() for
+                # better serialization) to the 'stat' key in the return dict.
+                # However, since we aren't using the stat result for anything
+                # but the mode at this time, we can avoid unnecessary work by
+                # just manually creating the list and not running an os.stat()
+                # on all files in the repo.
+                fnd['stat'] = [blob_mode]
+            return fnd
 
         # No matching file was found in tgt_env. Return a dict with empty paths
         # so the calling function knows the file could not be found.
         return fnd
 
+    def _blob_path(self, blob_hexsha):
+        '''
+        Return the path of a blob in the blob cache
+        '''
+        return salt.utils.path_join(self.cache_root, 'blobs',
+                                    blob_hexsha[:2], blob_hexsha)
+
+    def reap_blob_cache(self):
+        '''
+        Remove the blobs which have not been used for BLOB_CACHE_MAX_AGE
+        seconds, along with their hashes. The copies of the files and their
+        hashes which were kept by saltenv before the blob cache are removed.
+        '''
+        for legacy_dir in (salt.utils.path_join(self.cache_root, 'refs'),
+                           self.hash_cachedir):
+            if os.path.isdir(legacy_dir):
+                try:
+                    shutil.rmtree(legacy_dir)
+                except OSError as exc:
+                    log.error(
+                        'Unable to remove old {0} cache directory {1}: {2}'
+                        .format(self.role, legacy_dir, exc)
+                    )
+        expired = time.time() - BLOB_CACHE_MAX_AGE
+        for root, _, files in os.walk(
+                salt.utils.path_join(self.cache_root, 'blobs')):
+            for name in files:
+                blob_path = os.path.join(root, name.split('.hash.')[0])
+                try:
+                    if not os.path.isfile(blob_path) \
+                            or os.path.getmtime(blob_path) < expired:
+                        os.remove(os.path.join(root, name))
+                except OSError:
+                    pass
+
     def serve_file(self, load, fnd):
         '''
         Return a chunk from a file based on the data received
@@ -2868,15 +3044,10 @@ class GitFS(GitBase):
         if not all(x in load for x in ('path', 'saltenv')):
             return '', None
         ret = {'hash_type': self.opts['hash_type']}
-        relpath = fnd['rel']
         path = fnd['path']
-        hashdest = salt.utils.path_join(self.hash_cachedir,
-                                        load['saltenv'],
-                                        '{0}.hash.{1}'.format(relpath,
-                                                              self.opts['hash_type']))
+        # The cached blobs never change, so neither do their hashes
+        hashdest = '{0}.hash.{1}'.format(path, self.opts['hash_type'])
         if not os.path.isfile(hashdest):
-            if not os.path.exists(os.path.dirname(hashdest)):
-                os.makedirs(os.path.dirname(hashdest))
             ret['hsum'] = salt.utils.get_hash(path, self.opts['hash_type'])
             with salt.utils.fopen(hashdest, 'w+') as fp_:
                 fp_.write(ret['hsum'])
@@ -2922,7 +3093,9 @@ class GitFS(GitBase):
                 self.opts, form, list_cache, w_lock
             )
         if cache_match is not None:
-            return cache_match
+            if form == 'symlinks':
+                return cache_match
+            return salt.fileserver.prefix_filter(cache_match, load.get('prefix'))
         if refresh_cache:
             ret = {'files': set(), 'symlinks': {}, 'dirs': set()}
             if salt.utils.is_hex(load['saltenv']) \
@@ -2942,7 +3115,10 @@ class GitFS(GitBase):
             # NOTE: symlinks are organized in a dict instead of a list, however
             # the 'symlinks' key will be defined above so it will never get to
             # the default value in the call to ret.get() below.
-            return ret.get(form, [])
+            if form == 'symlinks':
+                return ret['symlinks']
+            return salt.fileserver.prefix_filter(ret.get(form, []),
+                                                 load.get('prefix'))
         # Shouldn't get here, but if we do, this prevents a TypeError
         return {} if form == 'symlinks' else []
 
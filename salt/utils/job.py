@@ -3,12 +3,20 @@
 # Import Python libs
 from __future__ import absolute_import
 import logging
+import os
+import shutil
+import time
 
 # Import Salt libs
 import salt.minion
+import salt.payload
+import salt.utils
+import salt.utils.atomicfile
+import salt.utils.gzip_util
 import salt.utils.jid
 import salt.utils.event
 import salt.utils.verify
+import salt.ext.six as six
 
 log = logging.getLogger(__name__)
 
@@ -27,6 +35,14 @@ def store_job(opts, load, event=None, mminion=None):
     if mminion is None:
         mminion = salt.minion.MasterMinion(opts, states=False, rend=False)
 
+    if isinstance(load['return'], dict) and '__compact_state__' in load['return']:
+        # Expand a compact state run return, the job cache, returners and
+        # outputters only get to see the regular return
+        load['return'] = expand_state_return(opts, load['return'])
+    if isinstance(load['return'], dict) and '__state_stream__' in load['return']:
+        # Put back the state results which were streamed during the state run
+        load['return'] = gather_state_stream(opts, load)
+
     job_cache = opts['master_job_cache']
     if load['jid'] == 'req':
         # The minion is returning a standalone job, request a jobid
@@ -125,6 +141,187 @@ def store_minions(opts, jid, minions, mminion=None, syndic_id=None):
         )
 
 
+def compress_state_return(opts, ret, compression=None):
+    '''
+    Return the state run return in the compact, column oriented form, which
+    stores each field of the state results once as a list of values. The
+    fields which only some of the results have are kept per result.
+
+    If ``compression`` is ``gzip`` the compact return is also compressed.
+    '''
+    if not isinstance(ret, dict):
+        return ret
+    tags = [tag for tag, chunk in six.iteritems(ret)
+            if isinstance(chunk, dict) and '__run_num__' in chunk]
+    if not tags:
+        return ret
+    tags.sort(key=lambda tag: ret[tag]['__run_num__'])
+    fields = set(ret[tags[0]])
+    for tag in tags[1:]:
+        fields.intersection_update(ret[tag])
+    fields = sorted(fields)
+    compact = {'tags': tags,
+               'columns': dict((field, [ret[tag][field] for tag in tags])
+                               for field in fields),
+               'extra': [dict((key, value)
+                              for key, value in six.iteritems(ret[tag])
+                              if key not in fields)
+                         for tag in tags]}
+    if compression == 'gzip':
+        compact = salt.utils.gzip_util.compress(
+            salt.payload.Serial(opts).dumps(compact))
+    elif compression:
+        log.warning('Unsupported state return compression {0}, the return is '
+                    'not compressed'.format(compression))
+        compression = None
+    tagset = set(tags)
+    ret = dict((key, value) for key, value in six.iteritems(ret)
+               if key not in tagset)
+    ret['__compact_state__'] = {'compression': compression, 'data': compact}
+    return ret
+
+
+def expand_state_return(opts, ret):
+    '''
+    Return the regular form of a state run return made compact by
+    compress_state_return
+    '''
+    ret = dict(ret)
+    compact = ret.pop('__compact_state__')
+    data = compact['data']
+    if compact.get('compression') == 'gzip':
+        data = salt.payload.Serial(opts).loads(
+            salt.utils.gzip_util.uncompress(data))
+    for idx, tag in enumerate(data['tags']):
+        chunk = dict(data['extra'][idx])
+        for field, values in six.iteritems(data['columns']):
+            chunk[field] = values[idx]
+        ret[tag] = chunk
+    return ret
+
+
+def compact_state_return(ret):
+    '''
+    Replace the results of the states which were streamed to the master while
+    the state run was in progress with a reference to them. The references map
+    the state tags to their run numbers.
+    '''
+    if not isinstance(ret, dict):
+        return ret
+    compact = {}
+    streamed = {}
+    for tag, chunk in six.iteritems(ret):
+        if isinstance(chunk, dict) and chunk.get('__streamed__'):
+            streamed[tag] = chunk.get('__run_num__')
+        else:
+            compact[tag] = chunk
+    if not streamed:
+        return ret
+    compact['__state_stream__'] = streamed
+    return compact
+
+
+def _state_stream_dir(opts, jid, minion_id):
+    '''
+    Return the directory the streamed state results of a minion are kept in
+    '''
+    return os.path.join(opts['cachedir'], 'state_stream', jid, minion_id)
+
+
+def store_state_stream(opts, load):
+    '''
+    Keep a state result streamed by a minion until the return of the state
+    run arrives
+    '''
+    data = load.get('data')
+    if not isinstance(data, dict) or not isinstance(data.get('ret'), dict) \
+            or 'state_tag' not in data:
+        return False
+    if not salt.utils.jid.is_jid(load.get('jid')) \
+            or not salt.utils.verify.valid_id(opts, load.get('id')):
+        return False
+    try:
+        run_num = int(data['ret']['__run_num__'])
+    except (KeyError, TypeError, ValueError):
+        return False
+    stream_dir = _state_stream_dir(opts, load['jid'], load['id'])
+    serial = salt.payload.Serial(opts)
+    try:
+        if not os.path.isdir(stream_dir):
+            os.makedirs(stream_dir)
+        with salt.utils.atomicfile.atomic_open(
+                os.path.join(stream_dir, '{0}.p'.format(run_num)), 'w+b') as fp_:
+            serial.dump({'tag': data['state_tag'], 'ret': data['ret']}, fp_)
+    except (IOError, OSError) as exc:
+        log.error(
+            'Unable to store the state result streamed by {0} for job {1}: '
+            '{2}'.format(load['id'], load['jid'], exc)
+        )
+        return False
+    return True
+
+
+def gather_state_stream(opts, load):
+    '''
+    Return the state run return with the results streamed by the minion put
+    back in place of their references
+    '''
+    ret = dict(load['return'])
+    streamed = ret.pop('__state_stream__')
+    if not isinstance(streamed, dict):
+        return ret
+    stream_dir = _state_stream_dir(opts, load['jid'], load['id'])
+    serial = salt.payload.Serial(opts)
+    if salt.utils.jid.is_jid(load['jid']) \
+            and salt.utils.verify.valid_id(opts, load['id']) \
+            and os.path.isdir(stream_dir):
+        for fn_ in os.listdir(stream_dir):
+            try:
+                with salt.utils.fopen(os.path.join(stream_dir, fn_), 'rb') as fp_:
+                    chunk = serial.load(fp_)
+            except Exception as exc:
+                log.error('Unable to read streamed state result {0}: {1}'
+                          .format(fn_, exc))
+                continue
+            if chunk.get('tag') in streamed:
+                ret[chunk['tag']] = chunk['ret']
+        shutil.rmtree(stream_dir, ignore_errors=True)
+        try:
+            os.rmdir(os.path.dirname(stream_dir))
+        except OSError:
+            # Results streamed by other minions are still waiting
+            pass
+    for tag, run_num in six.iteritems(streamed):
+        if tag not in ret:
+            log.error('The result of state {0} streamed by {1} for job {2} '
+                      'was not received'.format(tag, load['id'], load['jid']))
+            ret[tag] = {'changes': {},
+                        'result': False,
+                        'comment': 'The result of this state was streamed by '
+                                   'the minion but not received by the master',
+                        '__run_num__': run_num}
+    return ret
+
+
+def clean_state_stream(opts):
+    '''
+    Remove the streamed state results of jobs which never returned
+    '''
+    stream_root = os.path.join(opts['cachedir'], 'state_stream')
+    if not os.path.isdir(stream_root):
+        return
+    if not opts.get('keep_jobs'):
+        return
+    cutoff = time.time() - opts['keep_jobs'] * 3600
+    for jid in os.listdir(stream_root):
+        jid_dir = os.path.join(stream_root, jid)
+        try:
+            if os.path.getmtime(jid_dir) < cutoff:
+                shutil.rmtree(jid_dir, ignore_errors=True)
+        except OSError:
+            continue
+
+
 def get_retcode(ret):
     '''
     Determine a retcode for a given return
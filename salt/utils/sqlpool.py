@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+'''
+Per-process pools of SQL connections
+
+The SQL external pillars (:mod:`mysql <salt.pillar.mysql>`,
+:mod:`postgres <salt.pillar.postgres>` and :mod:`sqlite3
+<salt.pillar.sqlite3>`) and returners (:mod:`mysql <salt.returners.mysql>`,
+:mod:`postgres <salt.returners.postgres>` and :mod:`pgjsonb
+<salt.returners.pgjsonb>`) take their connections from a pool kept by each
+process, instead of connecting to the database for every pillar compile or
+job return. The pools are tuned with the following options:
+
+.. code-block:: yaml
+
+    # The number of idle connections kept by each pool, 0 disables pooling
+    sql_pool_size: 5
+    # Idle connections are closed after this number of seconds
+    sql_pool_max_idle: 300
+    # Connections are closed once they are this number of seconds old
+    sql_pool_max_lifetime: 3600
+
+A connection which has been idle for more than a few seconds is checked
+before it is handed out again, and is replaced if the check fails.
+
+.. code-block:: python
+
+    import salt.utils.sqlpool
+    pool = salt.utils.sqlpool.get_pool(__opts__,
+                                       'mysql',
+                                       connect_kwargs,
+                                       lambda: MySQLdb.connect(**connect_kwargs),
+                                       check=lambda conn: conn.ping())
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Set up logging
+log = logging.getLogger(__name__)
+
+# Connections which have been idle for less than this number of seconds are
+# handed out again without a health check
+CHECK_IDLE = 5
+
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+# The pools inherited from the parent process. Their connections share their
+# sockets with the parent, and the drivers end the server session when a
+# connection is garbage collected, so they are kept referenced and never used.
+_INHERITED = []
+
+
+class ConnectionPool(object):
+    '''
+    A pool of the connections to one database. The connections are DB-API
+    connections, which are rolled back before they go back into the pool.
+    '''
+    def __init__(self, connect, check=None, size=5, max_idle=300,
+                 max_lifetime=3600):
+        self.connect = connect
+        self.check = check
+        self.size = size
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.pid = os.getpid()
+        # Tuples of the idle connections, the time they were opened and the
+        # time they were last used
+        self._idle = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _close(conn):
+        '''
+        Close a connection, ignoring the errors of broken connections
+        '''
+        try:
+            conn.close()
+        except Exception as exc:
+            log.trace('Error closing pooled connection: {0}'.format(exc))
+
+    def acquire(self):
+        '''
+        Return a tuple of a connection and the time it was opened. An idle
+        connection is reused if it is still fresh and healthy, otherwise a
+        new one is opened.
+        '''
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                conn, opened, used = self._idle.pop()
+            now = time.time()
+            if now - opened > self.max_lifetime or now - used > self.max_idle:
+                self._close(conn)
+                continue
+            if self.check is not None and now - used > CHECK_IDLE:
+                try:
+                    self.check(conn)
+                except Exception as exc:
+                    log.debug(
+                        'Pooled connection failed its health check, '
+                        'closing it: {0}'.format(exc)
+                    )
+                    self._close(conn)
+                    continue
+            return conn, opened
+        return self.connect(), time.time()
+
+    def release(self, conn, opened):
+        '''
+        Put a connection back into the pool, or close it if the pool is full
+        or the connection is too old
+        '''
+        now = time.time()
+        if self.size > 0 and now - opened < self.max_lifetime:
+            try:
+                # Do not keep a transaction, or its snapshot, open on an
+                # idle connection
+                conn.rollback()
+            except Exception as exc:
+                log.debug('Unable to reset pooled connection: {0}'.format(exc))
+            else:
+                with self._lock:
+                    if len(self._idle) < self.size:
+                        self._idle.append((conn, opened, now))
+                        return
+        self._close(conn)
+
+    @contextmanager
+    def connection(self):
+        '''
+        Yield a connection from the pool. It goes back into the pool when the
+        block exits, unless it raised an exception, in which case the
+        connection is closed.
+        '''
+        conn, opened = self.acquire()
+        try:
+            yield conn
+        except Exception:
+            self._close(conn)
+            raise
+        else:
+            self.release(conn, opened)
+
+    def clear(self):
+        '''
+        Close all of the idle connections
+        '''
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _, _ in idle:
+            self._close(conn)
+
+
+def select_one(conn):
+    '''
+    Check a connection with a trivial query, for the drivers which have no
+    ping
+    '''
+    cursor = conn.cursor()
+    try:
+        cursor.execute('SELECT 1')
+        cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def get_pool(opts, name, params, connect, check=None):
+    '''
+    Return the pool of this process for the connections of the named driver
+    with these parameters. ``connect`` opens a new connection and ``check``
+    raises an exception if a connection is no longer usable.
+    '''
+    key = (name, json.dumps(params, sort_keys=True, default=repr))
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None or pool.pid != os.getpid():
+            if pool is not None:
+                _INHERITED.append(pool)
+            pool = ConnectionPool(
+                connect,
+                check=check,
+                size=opts.get('sql_pool_size', 5),
+                max_idle=opts.get('sql_pool_max_idle', 300),
+                max_lifetime=opts.get('sql_pool_max_lifetime', 3600))
+            _POOLS[key] = pool
+        return pool
@@ -7,6 +7,9 @@ from __future__ import absolute_import
 
 # Import python libs
 import codecs
+import errno
+import fnmatch
+import hashlib
 import os
 import imp
 import logging
@@ -16,10 +19,13 @@ import sys
 
 # Import third party libs
 import jinja2
+import jinja2.bccache
 import jinja2.ext
+import jinja2.meta
 
 # Import salt libs
 import salt.utils
+import salt.utils.atomicfile
 import salt.utils.files
 import salt.utils.yamlencoding
 import salt.utils.locales
@@ -42,6 +48,15 @@ TEMPLATE_DIRNAME = os.path.join(saltpath[0], 'templates')
 SLS_ENCODING = 'utf-8'  # this one has no BOM.
 SLS_ENCODER = codecs.getencoder(SLS_ENCODING)
 
+# Compiled code of the jinja templates rendered from strings in this process,
+# keyed by the environment settings that affect compilation and the source
+JINJA_CODE_CACHE = {}
+JINJA_CODE_CACHE_SIZE = 1000
+
+# Number of compiled templates kept in the jinja bytecode cache directory, the
+# least recently used ones are removed when a new template is stored
+JINJA_BYTECODE_CACHE_SIZE = 1000
+
 ALIAS_WARN = (
         'Starting in 2015.5, cmd.run uses python_shell=False by default, '
         'which doesn\'t support shellisms (pipes, env variables, etc). '
@@ -292,6 +307,170 @@ def _get_jinja_error(trace, context=None):
     return line, out
 
 
+def _get_jinja_extensions():
+    '''
+    Return the extensions loaded into the jinja environment
+    '''
+    extensions = []
+    if hasattr(jinja2.ext, 'with_'):
+        extensions.append('jinja2.ext.with_')
+    if hasattr(jinja2.ext, 'do'):
+        extensions.append('jinja2.ext.do')
+    if hasattr(jinja2.ext, 'loopcontrols'):
+        extensions.append('jinja2.ext.loopcontrols')
+    extensions.append(salt.utils.jinja.SerializerExtension)
+    return extensions
+
+
+def jinja_template_dependencies(tmplstr):
+    '''
+    Parse a jinja template and return a tuple of the set of variables it reads
+    from the render context and the list of templates it imports, includes or
+    extends. Templates referenced through an expression instead of a constant
+    name are listed as None.
+    '''
+    if tmplstr and not isinstance(tmplstr, six.text_type):
+        tmplstr = tmplstr.decode(SLS_ENCODING)
+    jinja_env = jinja2.Environment(extensions=_get_jinja_extensions())
+    ast = jinja_env.parse(tmplstr)
+    return (jinja2.meta.find_undeclared_variables(ast),
+            list(jinja2.meta.find_referenced_templates(ast)))
+
+
+class SaltBytecodeCache(jinja2.bccache.FileSystemBytecodeCache):
+    '''
+    A jinja bytecode cache which can be shared by concurrent processes. The
+    cache files are written atomically, files which cannot be read are
+    treated as a cache miss and the least recently used files are removed
+    once there are more than JINJA_BYTECODE_CACHE_SIZE of them. The cache keys
+    include the settings of the environment, so code compiled with other
+    settings is never loaded, also for the templates pulled in through the
+    loader.
+    '''
+    def get_cache_key(self, name, filename=None, environment=None):
+        key = super(SaltBytecodeCache, self).get_cache_key(name, filename)
+        if environment is None:
+            return key
+        settings = (environment.trim_blocks,
+                    environment.lstrip_blocks,
+                    tuple(sorted(environment.extensions)),
+                    key)
+        return hashlib.sha1(repr(settings).encode(SLS_ENCODING)).hexdigest()
+
+    def get_bucket(self, environment, name, filename, source):
+        key = self.get_cache_key(name, filename, environment)
+        checksum = self.get_source_checksum(source)
+        bucket = jinja2.bccache.Bucket(environment, key, checksum)
+        self.load_bytecode(bucket)
+        return bucket
+
+    def load_bytecode(self, bucket):
+        filename = self._get_cache_filename(bucket)
+        try:
+            super(SaltBytecodeCache, self).load_bytecode(bucket)
+        except Exception as exc:
+            log.debug(
+                'Unable to load jinja bytecode from {0}: {1}'
+                .format(filename, exc)
+            )
+            bucket.reset()
+            return
+        if bucket.code is not None:
+            try:
+                # The modification time is used to find the least recently
+                # used files
+                os.utime(filename, None)
+            except OSError:
+                pass
+
+    def dump_bytecode(self, bucket):
+        filename = self._get_cache_filename(bucket)
+        try:
+            with salt.utils.atomicfile.atomic_open(filename, 'wb') as fp_:
+                bucket.write_bytecode(fp_)
+        except (IOError, OSError) as exc:
+            log.warning(
+                'Unable to write jinja bytecode to {0}: {1}'
+                .format(filename, exc)
+            )
+            return
+        self.prune()
+
+    def prune(self, size=None):
+        '''
+        Remove the least recently used cache files until at most ``size``
+        files, by default JINJA_BYTECODE_CACHE_SIZE, are left
+        '''
+        if size is None:
+            size = JINJA_BYTECODE_CACHE_SIZE
+        files = []
+        for filename in fnmatch.filter(os.listdir(self.directory),
+                                       self.pattern % '*'):
+            path = os.path.join(self.directory, filename)
+            try:
+                files.append((os.stat(path).st_mtime, path))
+            except OSError:
+                continue
+        if len(files) <= size:
+            return
+        files.sort()
+        for _, path in files[:len(files) - size]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _get_jinja_bytecode_cache(opts):
+    '''
+    Return a jinja bytecode cache stored in the cachedir, or None if the
+    jinja_bytecode_cache option is disabled
+    '''
+    if not opts.get('jinja_bytecode_cache', False):
+        return None
+    cache_dir = os.path.join(opts['cachedir'], 'jinja')
+    try:
+        os.makedirs(cache_dir)
+    except OSError as exc:
+        if exc.errno != errno.EEXIST:
+            log.warning(
+                'Unable to create jinja bytecode cache directory {0}: {1}'
+                .format(cache_dir, exc)
+            )
+            return None
+    return SaltBytecodeCache(cache_dir)
+
+
+def _get_jinja_template(jinja_env, tmplstr):
+    '''
+    Return a template object for tmplstr. The compiled code is reused from
+    earlier renders of the same source, either in this process or through
+    the environment's bytecode cache, instead of compiling it every time.
+    '''
+    checksum = hashlib.sha1(tmplstr.encode(SLS_ENCODING)).hexdigest()
+    key = (jinja_env.trim_blocks,
+           jinja_env.lstrip_blocks,
+           tuple(sorted(jinja_env.extensions)),
+           checksum)
+    code = JINJA_CODE_CACHE.get(key)
+    if code is None:
+        bcc = jinja_env.bytecode_cache
+        bucket = None
+        if bcc is not None:
+            bucket = bcc.get_bucket(jinja_env, checksum, None, tmplstr)
+            code = bucket.code
+        if code is None:
+            code = jinja_env.compile(tmplstr)
+            if bucket is not None:
+                bucket.code = code
+                bcc.set_bucket(bucket)
+        if len(JINJA_CODE_CACHE) >= JINJA_CODE_CACHE_SIZE:
+            JINJA_CODE_CACHE.clear()
+        JINJA_CODE_CACHE[key] = code
+    return jinja_env.template_class.from_code(
+        jinja_env, code, jinja_env.make_globals(None), None)
+
+
 def render_jinja_tmpl(tmplstr, context, tmplpath=None):
     opts = context['opts']
     saltenv = context['saltenv']
@@ -318,15 +497,9 @@ def render_jinja_tmpl(tmplstr, context, tmplpath=None):
     else:
         loader = salt.utils.jinja.SaltCacheLoader(opts, saltenv, pillar_rend=context.get('_pillar_rend', False))
 
-    env_args = {'extensions': [], 'loader': loader}
-
-    if hasattr(jinja2.ext, 'with_'):
-        env_args['extensions'].append('jinja2.ext.with_')
-    if hasattr(jinja2.ext, 'do'):
-        env_args['extensions'].append('jinja2.ext.do')
-    if hasattr(jinja2.ext, 'loopcontrols'):
-        env_args['extensions'].append('jinja2.ext.loopcontrols')
-    env_args['extensions'].append(salt.utils.jinja.SerializerExtension)
+    env_args = {'extensions': _get_jinja_extensions(),
+                'loader': loader,
+                'bytecode_cache': _get_jinja_bytecode_cache(opts)}
 
     # Pass through trim_blocks and lstrip_blocks Jinja parameters
     # trim_blocks removes newlines around Jinja blocks
@@ -374,7 +547,7 @@ def render_jinja_tmpl(tmplstr, context, tmplpath=None):
         decoded_context[key] = salt.utils.locales.sdecode(value)
 
     try:
-        template = jinja_env.from_string(tmplstr)
+        template = _get_jinja_template(jinja_env, tmplstr)
         template.globals.update(decoded_context)
         output = template.render(**decoded_context)
     except jinja2.exceptions.TemplateSyntaxError as exc:
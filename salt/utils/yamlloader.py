@@ -28,15 +28,18 @@ class DuplicateKeyWarning(RuntimeWarning):
 warnings.simplefilter('always', category=DuplicateKeyWarning)
 
 
+HAS_LIBYAML = hasattr(yaml, 'CSafeLoader')
+
+
 # with code integrated from https://gist.github.com/844388
-class SaltYamlSafeLoader(yaml.SafeLoader, object):
+class SaltYamlConstructor(object):
     '''
-    Create a custom YAML loader that uses the custom constructor. This allows
-    for the YAML loading defaults to be manipulated based on needs within salt
-    to make things like sls file more intuitive.
+    The custom constructor used by the Salt YAML loaders. This allows for the
+    YAML loading defaults to be manipulated based on needs within salt to make
+    things like sls file more intuitive. It is combined below with both the
+    pure Python and the libyaml based parsers.
     '''
-    def __init__(self, stream, dictclass=dict):
-        yaml.SafeLoader.__init__(self, stream)
+    def _set_dictclass(self, dictclass):
         if dictclass is not dict:
             # then assume ordered dict and use it for both !map and !omap
             self.add_constructor(
@@ -95,7 +98,7 @@ class SaltYamlSafeLoader(yaml.SafeLoader, object):
                 # an empty string. Change it to '0'.
                 if node.value == '':
                     node.value = '0'
-        return super(SaltYamlSafeLoader, self).construct_scalar(node)
+        return super(SaltYamlConstructor, self).construct_scalar(node)
 
     def flatten_mapping(self, node):
         merge = []
@@ -137,3 +140,27 @@ class SaltYamlSafeLoader(yaml.SafeLoader, object):
             mergeable_items = [x for x in merge if x[0].value not in existing_nodes]
 
             node.value = mergeable_items + node.value
+
+
+class SaltYamlPySafeLoader(SaltYamlConstructor, yaml.SafeLoader):
+    '''
+    Salt YAML loader using the pure Python YAML parser
+    '''
+    def __init__(self, stream, dictclass=dict):
+        yaml.SafeLoader.__init__(self, stream)
+        self._set_dictclass(dictclass)
+
+
+if HAS_LIBYAML:
+    class SaltYamlCSafeLoader(SaltYamlConstructor, yaml.CSafeLoader):
+        '''
+        Salt YAML loader using the libyaml parser, which is several times
+        faster than the pure Python one
+        '''
+        def __init__(self, stream, dictclass=dict):
+            yaml.CSafeLoader.__init__(self, stream)
+            self._set_dictclass(dictclass)
+
+    SaltYamlSafeLoader = SaltYamlCSafeLoader
+else:
+    SaltYamlSafeLoader = SaltYamlPySafeLoader
@@ -147,6 +147,23 @@ class LazyLoaderVirtualEnabledTest(TestCase):
             break
         self.assertNotEqual(self.loader._dict, {})
 
+    def test_preload(self):
+        '''
+        Make sure preload only loads the requested modules and functions
+        '''
+        self.assertEqual(self.loader._dict, {})
+        self.loader.preload(['test', 'grains.get'])
+        self.assertIn('test.ping', self.loader._dict)
+        self.assertIn('grains.get', self.loader._dict)
+        for key in self.loader._dict:
+            self.assertIn(key.split('.', 1)[0], ('test', 'grains'))
+        self.assertFalse(self.loader.loaded)
+
+    def test_preload_all(self):
+        self.assertEqual(self.loader._dict, {})
+        self.loader.preload(['*'])
+        self.assertTrue(self.loader.loaded)
+
     def test_context(self):
         '''
         Make sure context is shared across modules
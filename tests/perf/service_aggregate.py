@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+'''
+Compare a state run of many service states with and without aggregation.
+
+A state tree with a ``service.running`` state for each of the running systemd
+services is written to a temporary directory, and applied with ``test=True``
+once as is and once with aggregation enabled. Aggregation reads the state of
+all of the services with a single ``systemctl show`` call instead of running
+systemctl several times for each service. Must be run on a minion booted with
+systemd, service names can be passed to check those instead:
+
+.. code-block:: bash
+
+    python tests/perf/service_aggregate.py [service ...]
+'''
+
+from __future__ import absolute_import, print_function
+# Import system libs
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+COUNT = 40
+
+
+def running_services(count=COUNT):
+    '''
+    Return the names of up to count running services
+    '''
+    out = subprocess.check_output(
+        ['systemctl', 'list-units', '--type=service', '--state=running',
+         '--no-legend', '--no-pager', '--plain'])
+    names = []
+    for line in out.decode('utf-8').splitlines():
+        if line.strip():
+            names.append(line.split()[0])
+    return names[:count]
+
+
+def state_tree(root, names):
+    '''
+    Write an SLS with a service.running state for each of the services, and
+    a copy of it which enables aggregation
+    '''
+    for sls, aggregate in (('services', False), ('services_agg', True)):
+        lines = []
+        for name in names:
+            lines.extend([
+                '{0}:'.format(name),
+                '  service.running:',
+                '    - enable: True',
+            ])
+            if aggregate:
+                lines.append('    - aggregate: True')
+        with open(os.path.join(root, '{0}.sls'.format(sls)), 'w') as fp_:
+            fp_.write('\n'.join(lines) + '\n')
+
+
+def bench(root, sls):
+    '''
+    Apply the SLS with test=True and return how long it took
+    '''
+    cmd = ['salt-call', '--local', '--retcode-passthrough',
+           '--file-root={0}'.format(root), '--out=quiet',
+           'state.sls', sls, 'test=True']
+    start = time.time()
+    subprocess.check_call(cmd)
+    return time.time() - start
+
+
+if __name__ == '__main__':
+    names = sys.argv[1:] or running_services()
+    root = tempfile.mkdtemp()
+    try:
+        state_tree(root, names)
+        # Warm up the minion cache so both runs start from the same state
+        bench(root, 'services')
+        plain = bench(root, 'services')
+        aggregated = bench(root, 'services_agg')
+    finally:
+        shutil.rmtree(root)
+    print('{0} service states'.format(len(names)))
+    print('  plain      {0:.2f}s'.format(plain))
+    print('  aggregated {0:.2f}s'.format(aggregated))
+    print('  speedup    {0:.1f}x'.format(plain / aggregated))
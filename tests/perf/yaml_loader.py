@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+'''
+Compare the speed of the pure Python and the libyaml based Salt YAML loaders.
+
+By default representative state and pillar documents are generated. Paths to
+rendered SLS or pillar files can be passed to benchmark those instead:
+
+.. code-block:: bash
+
+    python tests/perf/yaml_loader.py [/path/to/file.sls ...]
+'''
+
+from __future__ import absolute_import, print_function
+# Import system libs
+import sys
+import timeit
+
+# Import salt libs
+from salt.utils.odict import OrderedDict
+from salt.utils import yamlloader
+
+RUNS = 10
+
+
+def state_document(count=500):
+    '''
+    Return a rendered SLS with file, service and pkg states using requisites
+    '''
+    lines = []
+    for idx in range(count):
+        lines.extend([
+            '/etc/app{0}/app.conf:'.format(idx),
+            '  file.managed:',
+            '    - source: salt://app/files/app.conf',
+            '    - template: jinja',
+            '    - user: root',
+            '    - group: root',
+            '    - mode: 0644',
+            '    - makedirs: True',
+            '    - context:',
+            '        port: {0}'.format(8000 + idx),
+            '        workers: 4',
+            '    - require:',
+            '      - pkg: app{0}'.format(idx),
+            'app{0}:'.format(idx),
+            '  pkg.installed:',
+            '    - version: 1.2.{0}'.format(idx),
+            '  service.running:',
+            '    - enable: True',
+            '    - watch:',
+            '      - file: /etc/app{0}/app.conf'.format(idx),
+        ])
+    return '\n'.join(lines)
+
+
+def pillar_document(count=1000):
+    '''
+    Return a rendered pillar with a user list and nested repository data
+    '''
+    lines = ['users:']
+    for idx in range(count):
+        lines.extend([
+            '  user{0}:'.format(idx),
+            '    fullname: "User Number {0}"'.format(idx),
+            '    uid: {0}'.format(2000 + idx),
+            '    shell: /bin/bash',
+            '    groups: [users, wheel, docker]',
+            '    ssh_keys:',
+            '      - ssh-rsa AAAAB3NzaC1yc2EAAAADAQABAAABAQC{0} user{0}@example.com'.format(idx),
+        ])
+    lines.append('repos:')
+    for idx in range(count // 10):
+        lines.extend([
+            '  repo{0}: &repo{0}'.format(idx),
+            '    baseurl: https://mirror.example.com/repo{0}/$basearch'.format(idx),
+            '    gpgcheck: 1',
+            '    enabled: true',
+            '  repo{0}-debug:'.format(idx),
+            '    <<: *repo{0}'.format(idx),
+            '    enabled: false',
+        ])
+    return '\n'.join(lines)
+
+
+def bench(name, data):
+    '''
+    Load the document with both loaders, check that the results are the same
+    and print how long each loader took
+    '''
+    results = {}
+    timings = {}
+    loaders = [('python', yamlloader.SaltYamlPySafeLoader)]
+    if yamlloader.HAS_LIBYAML:
+        loaders.append(('libyaml', yamlloader.SaltYamlCSafeLoader))
+    for loader_name, loader in loaders:
+        def load(loader=loader):
+            return yamlloader.load(
+                data,
+                Loader=lambda stream: loader(stream, dictclass=OrderedDict))
+        results[loader_name] = load()
+        timings[loader_name] = min(timeit.repeat(load, number=1, repeat=RUNS))
+    print('{0} ({1} bytes)'.format(name, len(data)))
+    for loader_name, _ in loaders:
+        print('  {0:<8} {1:.4f}s'.format(loader_name, timings[loader_name]))
+    if 'libyaml' in results:
+        if results['libyaml'] != results['python']:
+            print('  WARNING: the loaders returned different data')
+        print('  speedup  {0:.1f}x'.format(timings['python'] / timings['libyaml']))
+
+
+if __name__ == '__main__':
+    if not yamlloader.HAS_LIBYAML:
+        print('libyaml is not available, only the pure Python loader is timed')
+    if len(sys.argv) > 1:
+        for path in sys.argv[1:]:
+            with open(path) as fp_:
+                bench(path, fp_.read())
+    else:
+        bench('state', state_document())
+        bench('pillar', pillar_document())
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+'''
+    tests.unit.fileclient_test
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Test fetching files from the fileserver with archives
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import os
+import shutil
+import tempfile
+
+# Import Salt Testing libs
+from salttesting import TestCase, skipIf
+from salttesting.helpers import ensure_in_syspath
+from salttesting.mock import NO_MOCK, NO_MOCK_REASON, MagicMock
+ensure_in_syspath('../')
+
+# Import salt libs
+import salt.config
+import salt.fileclient
+import salt.fileserver
+import salt.utils
+
+FILES = {'top.sls': 'base:\n  \'*\':\n    - web\n',
+         'web/init.sls': 'nginx:\n  pkg.installed: []\n',
+         'web/files/nginx.conf': 'worker_processes 4;\n',
+         'web/files/mime.types': 'types {}\n'}
+
+
+class _LocalRemoteClient(salt.fileclient.RemoteClient):
+    '''
+    A RemoteClient whose requests are served by the local fileserver
+    '''
+    def __init__(self, opts):  # pylint: disable=W0231
+        self.opts = opts
+        self.channel = salt.fileserver.FSChan(opts)
+        self.auth = salt.fileclient.DumbAuth()
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class FileArchiveTestCase(TestCase):
+
+    def setUp(self):
+        self.root_dir = tempfile.mkdtemp()
+        self.file_root = os.path.join(self.root_dir, 'file_root')
+        for path, contents in FILES.items():
+            full = os.path.join(self.file_root, path)
+            if not os.path.isdir(os.path.dirname(full)):
+                os.makedirs(os.path.dirname(full))
+            with salt.utils.fopen(full, 'w') as fp_:
+                fp_.write(contents)
+        os.chmod(os.path.join(self.file_root, 'web/files/nginx.conf'), 0o600)
+        opts = salt.config.minion_config(None)
+        opts['cachedir'] = os.path.join(self.root_dir, 'cache')
+        opts['file_roots'] = {'base': [self.file_root]}
+        opts['fileserver_backend'] = ['roots']
+        self.opts = opts
+        self.client = _LocalRemoteClient(opts)
+        self.send = MagicMock(side_effect=self.client.channel.send)
+        self.client.channel.send = self.send
+        self.archives = []
+        file_archive = self.client.channel.fs.file_archive
+
+        def _file_archive(load):
+            ret = file_archive(load)
+            self.archives.append(ret)
+            return ret
+        self.client.channel.fs.file_archive = _file_archive
+
+    def tearDown(self):
+        shutil.rmtree(self.root_dir)
+
+    def _cached(self, path):
+        return os.path.join(self.root_dir, 'cache', 'files', 'base', path)
+
+    def _archived(self):
+        '''
+        Return the files which were sent in archives
+        '''
+        return sorted(path for ret in self.archives
+                      for path, info in ret['files'].items()
+                      if info['archived'])
+
+    def test_cache_files(self):
+        '''
+        Test that the files are fetched with one request, and that only the
+        changed files are sent again
+        '''
+        ret = self.client.cache_files(
+            ['salt://top.sls', 'salt://web/init.sls', 'salt://missing.sls'])
+        self.assertEqual(ret, [self._cached('top.sls'),
+                               self._cached('web/init.sls'),
+                               False])
+        self.assertEqual([call[0][0]['cmd'] for call in self.send.call_args_list],
+                         ['_file_archive'])
+        self.assertEqual(self._archived(), ['top.sls', 'web/init.sls'])
+        with salt.utils.fopen(self._cached('web/init.sls')) as fp_:
+            self.assertEqual(fp_.read(), FILES['web/init.sls'])
+
+        self.archives = []
+        with salt.utils.fopen(os.path.join(self.file_root, 'top.sls'), 'w') as fp_:
+            fp_.write('base: {}\n')
+        ret = self.client.cache_files(['salt://top.sls', 'salt://web/init.sls'])
+        self.assertEqual(ret, [self._cached('top.sls'),
+                               self._cached('web/init.sls')])
+        self.assertEqual(self._archived(), ['top.sls'])
+        with salt.utils.fopen(self._cached('top.sls')) as fp_:
+            self.assertEqual(fp_.read(), 'base: {}\n')
+
+    def test_cache_dir(self):
+        '''
+        Test that a directory is fetched with an archive, and that the file
+        modes are kept
+        '''
+        ret = self.client.cache_dir('salt://web/files')
+        self.assertEqual(ret, [self._cached('web/files/mime.types'),
+                               self._cached('web/files/nginx.conf')])
+        self.assertEqual(os.stat(self._cached('web/files/nginx.conf')).st_mode & 0o777,
+                         0o600)
+        self.assertEqual(self._archived(), ['web/files/mime.types',
+                                            'web/files/nginx.conf'])
+
+    def test_cache_files_fallback(self):
+        '''
+        Test that the files are fetched one by one from a master which does
+        not support archives
+        '''
+        self.client.channel.fs.file_archive = MagicMock(return_value=False)
+        ret = self.client.cache_files(['salt://top.sls', 'salt://web/init.sls'])
+        self.assertEqual(ret, [self._cached('top.sls'),
+                               self._cached('web/init.sls')])
+        self.assertFalse(self.client._archive)
+        self.assertIsNone(self.client.cache_archive(['top.sls']))
+
+    def test_fsclient(self):
+        '''
+        Test that the local file client copies the files one by one
+        '''
+        client = salt.fileclient.FSClient(self.opts)
+        send = MagicMock(side_effect=client.channel.send)
+        client.channel.send = send
+        ret = client.cache_files(['salt://top.sls', 'salt://web/init.sls'])
+        self.assertEqual(ret, [self._cached('top.sls'),
+                               self._cached('web/init.sls')])
+        self.assertEqual(client.cache_dir('salt://web/files'),
+                         [self._cached('web/files/mime.types'),
+                          self._cached('web/files/nginx.conf')])
+        self.assertNotIn('_file_archive',
+                         [call[0][0]['cmd'] for call in send.call_args_list])
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests(FileArchiveTestCase, needs_daemon=False)
@@ -5,9 +5,12 @@
 
 # Import Python libs
 from __future__ import absolute_import
+import os
 import shutil
 import tempfile
 import textwrap
+import threading
+import time
 import yaml
 
 try:
@@ -19,11 +22,13 @@ except ImportError:
 # Import Salt Testing Libs
 from salttesting import TestCase, skipIf
 from salttesting.helpers import ensure_in_syspath
+from salttesting.mock import NO_MOCK, NO_MOCK_REASON, MagicMock, patch
 ensure_in_syspath('../../')
 
 import integration
 
 # Import salt libs
+import salt.utils
 import salt.utils.gitfs
 from salt.fileserver.gitfs import PER_REMOTE_OVERRIDES, PER_REMOTE_ONLY
 
@@ -131,6 +136,259 @@ class GitfsConfigTestCase(TestCase):
         self.assertEqual(gitfs.remotes[1].root('baz'), 'baz_root')
 
 
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class GitfsFetchTestCase(TestCase):
+
+    def setUp(self):
+        # Skip __init__, which needs a working git provider
+        self.gitfs = salt.utils.gitfs.GitFS.__new__(salt.utils.gitfs.GitFS)
+        self.gitfs.role = 'gitfs'
+        self.gitfs.opts = {'gitfs_fetch_concurrency': 1,
+                           'gitfs_fetch_timeout': 0}
+        self.gitdir = tempfile.mkdtemp(dir=integration.TMP)
+        self.addCleanup(shutil.rmtree, self.gitdir)
+
+    def _remote(self, id_, changed=False, delay=0, error=None):
+        def _fetch():
+            time.sleep(delay)
+            if error:
+                raise error
+            return changed
+        gitdir = os.path.join(self.gitdir, id_)
+        if not os.path.isdir(gitdir):
+            os.makedirs(gitdir)
+        return MagicMock(
+            id=id_,
+            fetch=MagicMock(side_effect=_fetch),
+            _get_fetch_timeout_file=MagicMock(
+                return_value=os.path.join(gitdir, 'fetch_timeout')),
+            _get_lock_file=MagicMock(
+                return_value=os.path.join(gitdir, 'update.lk')))
+
+    def test_fetch_remotes(self):
+        '''
+        Test that the remotes are fetched one by one, and that the outcome of
+        each fetch is kept
+        '''
+        self.gitfs.remotes = [self._remote('a'),
+                              self._remote('b', changed=True),
+                              self._remote('c', error=Exception('boom'))]
+        self.assertTrue(self.gitfs.fetch_remotes())
+        stats = self.gitfs.fetch_stats
+        self.assertEqual(sorted(stats), ['a', 'b', 'c'])
+        self.assertFalse(stats['a']['changed'])
+        self.assertTrue(stats['b']['changed'])
+        self.assertEqual(stats['c']['error'], 'boom')
+
+        self.gitfs.remotes = [self._remote('a')]
+        self.assertFalse(self.gitfs.fetch_remotes())
+
+    def test_fetch_remotes_concurrently(self):
+        '''
+        Test that no more than gitfs_fetch_concurrency remotes are fetched at
+        the same time, and that slow fetches are no longer waited for
+        '''
+        self.gitfs.opts.update({'gitfs_fetch_concurrency': 2,
+                                'gitfs_fetch_timeout': 1})
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def _remote(id_, delay):
+            remote = self._remote(id_, changed=True, delay=delay)
+            fetch = remote.fetch.side_effect
+
+            def _fetch():
+                with lock:
+                    running.append(id_)
+                    peak.append(len(running))
+                try:
+                    return fetch()
+                finally:
+                    with lock:
+                        running.remove(id_)
+            remote.fetch.side_effect = _fetch
+            return remote
+
+        self.gitfs.remotes = [_remote('slow', 5)] + \
+            [_remote(str(idx), 0.1) for idx in range(4)]
+        start = time.time()
+        self.assertTrue(self.gitfs.fetch_remotes())
+        self.assertLess(time.time() - start, 4)
+        self.assertLessEqual(max(peak), 2)
+        stats = self.gitfs.fetch_stats
+        self.assertEqual(stats['slow']['error'], 'timed out')
+        self.assertFalse(stats['slow']['changed'])
+        self.assertTrue(os.path.isfile(
+            self.gitfs.remotes[0]._get_fetch_timeout_file.return_value))
+        for idx in range(4):
+            self.assertTrue(stats[str(idx)]['changed'])
+
+    def test_fetch_timed_out(self):
+        '''
+        Test that a remote whose fetch timed out is reported as changed by
+        the first update after the fetch released its lock
+        '''
+        slow = self._remote('slow')
+        lock_file = slow._get_lock_file.return_value
+        with salt.utils.fopen(slow._get_fetch_timeout_file.return_value, 'w'):
+            pass
+        self.gitfs.remotes = [slow]
+        # The fetch is still running
+        with salt.utils.fopen(lock_file, 'w'):
+            pass
+        self.assertFalse(self.gitfs.fetch_remotes())
+        os.remove(lock_file)
+        self.assertTrue(self.gitfs.fetch_remotes())
+        self.assertFalse(self.gitfs.fetch_remotes())
+
+    def test_update_remote(self):
+        '''
+        Test that only the matching remote is fetched, and that only the file
+        list caches of the saltenvs mapped to the ref are cleared
+        '''
+        tmp_cachedir = tempfile.mkdtemp(dir=integration.TMP)
+        self.addCleanup(shutil.rmtree, tmp_cachedir)
+        self.gitfs.file_list_cachedir = tmp_cachedir
+        self.gitfs.env_cache = os.path.join(tmp_cachedir, 'envs.p')
+        for saltenv in ('base', 'dev', 'prod'):
+            with salt.utils.fopen(
+                    os.path.join(tmp_cachedir, saltenv + '.p'), 'w') as fp_:
+                fp_.write('')
+        repo_a = self._remote('a', changed=True)
+        repo_a.url = 'https://example.com/a.git'
+        repo_a.envs.return_value = ['base', 'dev']
+        repo_a._get_envs_from_ref_paths.return_value = set(['dev'])
+        repo_b = self._remote('b', changed=True)
+        repo_b.url = 'https://example.com/b.git'
+        repo_b.envs.return_value = ['prod']
+        self.gitfs.remotes = [repo_a, repo_b]
+
+        self.gitfs.update(remote='*/a.git', ref='refs/heads/dev')
+        self.assertTrue(repo_a.fetch.called)
+        self.assertFalse(repo_b.fetch.called)
+        repo_a._get_envs_from_ref_paths.assert_called_once_with(
+            ['refs/remotes/origin/dev'])
+        self.assertEqual(sorted(os.listdir(tmp_cachedir)),
+                         ['base.p', 'envs.p', 'prod.p'])
+
+        self.assertEqual(self.gitfs.clear_file_list_cache([repo_a]),
+                         ['base', 'dev'])
+        self.assertEqual(sorted(os.listdir(tmp_cachedir)), ['envs.p', 'prod.p'])
+
+
+class _Entry(object):
+    '''
+    A pygit2 tree entry
+    '''
+    def __init__(self, name, oid, filemode):
+        self.name = name
+        self.oid = oid
+        self.filemode = filemode
+
+
+class _Tree(list):
+    '''
+    A pygit2 tree
+    '''
+    def __init__(self, hex_, entries):
+        super(_Tree, self).__init__(entries)
+        self.hex = hex_
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class GitfsIndexTestCase(TestCase):
+
+    def setUp(self):
+        self.tmp_cachedir = tempfile.mkdtemp(dir=integration.TMP)
+
+    def tearDown(self):
+        salt.utils.gitfs._TREE_INDEXES.clear()
+        shutil.rmtree(self.tmp_cachedir)
+
+    def test_tree_index(self):
+        '''
+        Test that a tree is indexed without loading its blobs, and that the
+        index is reused for the same tree
+        '''
+        objects = {
+            'sub': _Tree('sub', [_Entry('init.sls', 'blob1', 0o100644),
+                                 _Entry('link', 'blob2', 0o120000)]),
+            'blob2': MagicMock(data='init.sls'),
+            'blob1': None,
+            'module': None,
+        }
+        repo = MagicMock()
+        repo.__contains__.side_effect = lambda oid: oid != 'submodule'
+        repo.__getitem__.side_effect = objects.__getitem__
+        tree = _Tree('root', [_Entry('top.sls', 'blob1', 0o100644),
+                              _Entry('web', 'sub', 0o040000),
+                              _Entry('submodule', 'submodule', 0o160000)])
+        provider = salt.utils.gitfs.Pygit2.__new__(salt.utils.gitfs.Pygit2)
+        provider.repo = repo
+        provider.cachedir = self.tmp_cachedir
+        index = provider.tree_index(tree)
+        self.assertEqual(sorted(index['files']),
+                         ['top.sls', 'web/init.sls', 'web/link'])
+        self.assertEqual(index['dirs'], ['web'])
+        self.assertEqual(index['symlinks'], {'web/link': 'init.sls'})
+        self.assertEqual(sorted(call[0][0] for call in repo.__getitem__.call_args_list),
+                         ['blob2', 'sub'])
+        repo.__getitem__.reset_mock()
+        self.assertIs(provider.tree_index(tree), index)
+        # The index outlives the provider, which is built for each request
+        other = salt.utils.gitfs.Pygit2.__new__(salt.utils.gitfs.Pygit2)
+        other.repo = repo
+        other.cachedir = self.tmp_cachedir
+        self.assertIs(other.tree_index(tree), index)
+        self.assertFalse(repo.__getitem__.called)
+
+    def test_find_file_blob_cache(self):
+        '''
+        Test that a file which is the same in two saltenvs is written to the
+        cache once, and that its hash is cached with it
+        '''
+        gitfs = salt.utils.gitfs.GitFS.__new__(salt.utils.gitfs.GitFS)
+        gitfs.role = 'gitfs'
+        gitfs.cache_root = self.tmp_cachedir
+        gitfs.opts = {'hash_type': 'sha256'}
+        gitfs.envs = MagicMock(return_value=['base', 'dev'])
+
+        def _write_file(blob, dest):
+            with salt.utils.fopen(dest, 'w') as fp_:
+                fp_.write(blob)
+        remote = MagicMock(mountpoint=MagicMock(return_value=''),
+                           root=MagicMock(return_value=''),
+                           find_file=MagicMock(return_value=('foo\n', 'ab12', 0o100644)),
+                           write_file=MagicMock(side_effect=_write_file))
+        gitfs.remotes = [remote]
+        base = gitfs.find_file('top.sls', 'base')
+        dev = gitfs.find_file('top.sls', 'dev')
+        self.assertEqual(base, dev)
+        self.assertEqual(base['path'],
+                         os.path.join(self.tmp_cachedir, 'blobs', 'ab', 'ab12'))
+        self.assertEqual(base['stat'], [0o100644])
+        self.assertEqual(remote.write_file.call_count, 1)
+        self.assertEqual(gitfs.find_file('missing.sls', 'nope'),
+                         {'path': '', 'rel': ''})
+
+        hsum = salt.utils.get_hash(base['path'], 'sha256')
+        load = {'path': 'top.sls', 'saltenv': 'base'}
+        self.assertEqual(gitfs.file_hash(load, base)['hsum'], hsum)
+        with patch('salt.utils.get_hash', MagicMock()) as get_hash:
+            self.assertEqual(gitfs.file_hash(load, dev)['hsum'], hsum)
+        self.assertFalse(get_hash.called)
+
+        # The copies kept by saltenv before the blob cache are removed
+        gitfs.hash_cachedir = os.path.join(self.tmp_cachedir, 'hash')
+        for legacy in ('refs/base', 'hash/base'):
+            os.makedirs(os.path.join(self.tmp_cachedir, legacy))
+        gitfs.reap_blob_cache()
+        self.assertEqual(sorted(os.listdir(self.tmp_cachedir)), ['blobs'])
+        self.assertTrue(os.path.isfile(base['path']))
+
+
 if __name__ == '__main__':
     from integration import run_tests
-    run_tests(GitfsConfigTestCase, needs_daemon=False)
+    run_tests(GitfsConfigTestCase, GitfsFetchTestCase, GitfsIndexTestCase,
+              needs_daemon=False)
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+'''
+    tests.unit.fileserver.roots_test
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+'''
+
+# Import Python libs
+from __future__ import absolute_import
+import os
+import shutil
+import tempfile
+
+# Import Salt Testing libs
+from salttesting import TestCase, skipIf
+from salttesting.helpers import ensure_in_syspath
+from salttesting.mock import NO_MOCK, NO_MOCK_REASON, MagicMock, patch
+ensure_in_syspath('../../')
+
+# Import salt libs
+import salt.fileserver
+import salt.payload
+import salt.utils
+import salt.utils.atomicfile
+from salt.fileserver import roots
+
+roots.__opts__ = {}
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class RootsFileHashTestCase(TestCase):
+
+    def setUp(self):
+        self.root_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.root_dir, 'testfile')
+        with salt.utils.fopen(self.path, 'w') as fp_:
+            fp_.write('foo\n')
+        self.opts = {'cachedir': os.path.join(self.root_dir, 'cache'),
+                     'hash_type': 'sha256'}
+        self.load = {'saltenv': 'base', 'path': 'testfile'}
+        self.fnd = {'path': self.path, 'rel': 'testfile'}
+
+    def tearDown(self):
+        roots._HASH_INDEX.clear()
+        shutil.rmtree(self.root_dir)
+
+    def _file_hash(self):
+        get_hash = MagicMock(side_effect=salt.utils.get_hash)
+        with patch.dict(roots.__opts__, self.opts), \
+                patch('salt.utils.get_hash', get_hash):
+            ret = roots.file_hash(dict(self.load), self.fnd)
+        return ret, get_hash.call_count
+
+    def test_file_hash_cache(self):
+        '''
+        Test that the file is only hashed again when it changed
+        '''
+        ret, hashed = self._file_hash()
+        self.assertEqual(ret, {'hsum': salt.utils.get_hash(self.path, 'sha256'),
+                               'hash_type': 'sha256'})
+        self.assertEqual(hashed, 1)
+        self.assertEqual(self._file_hash(), (ret, 0))
+
+        # The hash cache files are used after a restart
+        roots._HASH_INDEX.clear()
+        self.assertEqual(self._file_hash(), (ret, 0))
+
+        with salt.utils.fopen(self.path, 'w') as fp_:
+            fp_.write('foo bar\n')
+        mtime = os.path.getmtime(self.path) + 10
+        os.utime(self.path, (mtime, mtime))
+        ret, hashed = self._file_hash()
+        self.assertEqual(ret['hsum'], salt.utils.get_hash(self.path, 'sha256'))
+        self.assertEqual(hashed, 1)
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class RootsFileListTestCase(TestCase):
+
+    def setUp(self):
+        self.root_dir = tempfile.mkdtemp()
+        self.file_root = os.path.join(self.root_dir, 'file_root')
+        for path in ('web/init.sls', 'web/files/nginx.conf', 'webapp.sls',
+                     'db/init.sls', 'top.sls'):
+            full = os.path.join(self.file_root, path)
+            if not os.path.isdir(os.path.dirname(full)):
+                os.makedirs(os.path.dirname(full))
+            with salt.utils.fopen(full, 'w') as fp_:
+                fp_.write('')
+        self.opts = {'cachedir': os.path.join(self.root_dir, 'cache'),
+                     'file_roots': {'base': [self.file_root]},
+                     'fileserver_followsymlinks': True,
+                     'fileserver_ignoresymlinks': False,
+                     'fileserver_list_cache_time': 20,
+                     'file_ignore_regex': None,
+                     'file_ignore_glob': None,
+                     'serial': 'msgpack'}
+
+    def tearDown(self):
+        salt.fileserver._FILE_LIST_CACHE.clear()
+        shutil.rmtree(self.root_dir)
+
+    def _file_list(self, prefix=''):
+        with patch.dict(roots.__opts__, self.opts):
+            return roots.file_list({'saltenv': 'base', 'prefix': prefix})
+
+    def test_file_list_prefix(self):
+        '''
+        Test that the file list is sorted, filtered by prefix, and served from
+        memory once it has been cached
+        '''
+        self.assertEqual(self._file_list(),
+                         ['db/init.sls', 'top.sls', 'web/files/nginx.conf',
+                          'web/init.sls', 'webapp.sls'])
+        with patch('salt.payload.Serial.load', MagicMock()) as load:
+            self.assertEqual(self._file_list('web/'),
+                             ['web/files/nginx.conf', 'web/init.sls', 'webapp.sls'])
+            self.assertEqual(self._file_list('/web/files'),
+                             ['web/files/nginx.conf'])
+            self.assertEqual(self._file_list('nope'), [])
+            # The callers can not change the cached lists
+            self._file_list().append('changed')
+            self.assertNotIn('changed', self._file_list())
+        self.assertFalse(load.called)
+
+    def test_file_list_cache_rewrite(self):
+        '''
+        Test that a file list cache which is rewritten with the same mtime is
+        loaded again
+        '''
+        self.assertIn('top.sls', self._file_list())
+        list_cache = os.path.join(self.root_dir, 'cache', 'file_lists',
+                                  'roots', 'base.p')
+        mtime = os.path.getmtime(list_cache)
+        serial = salt.payload.Serial(self.opts)
+        with salt.utils.atomicfile.atomic_open(list_cache, 'w+b') as fp_:
+            fp_.write(serial.dumps({'files': ['other.sls']}))
+        os.utime(list_cache, (mtime, mtime))
+        self.assertEqual(self._file_list(), ['other.sls'])
+
+    def test_maintain_list_cache(self):
+        '''
+        Test that the workers use the file list cache as it is when the
+        Maintenance process maintains it, and that it is rebuilt there
+        '''
+        self.opts['fileserver_maintain_list_cache'] = True
+        self.opts['fileserver_list_cache_time'] = 0
+        self.assertIn('top.sls', self._file_list())
+        os.remove(os.path.join(self.file_root, 'top.sls'))
+        with patch('salt.fileserver.wait_lock', MagicMock()) as wait_lock:
+            self.assertIn('top.sls', self._file_list())
+        self.assertFalse(wait_lock.called)
+
+        self.opts['__maintain_list_cache'] = True
+        self.assertNotIn('top.sls', self._file_list())
+        del self.opts['__maintain_list_cache']
+        self.assertNotIn('top.sls', self._file_list())
+
+        # The workers rebuild a cache the Maintenance process stopped
+        # maintaining
+        with salt.utils.fopen(os.path.join(self.file_root, 'top.sls'), 'w') as fp_:
+            fp_.write('')
+        self.assertNotIn('top.sls', self._file_list())
+        list_cache = os.path.join(self.root_dir, 'cache', 'file_lists',
+                                  'roots', 'base.p')
+        mtime = os.path.getmtime(list_cache) - 3 * 60 - 1
+        os.utime(list_cache, (mtime, mtime))
+        self.assertIn('top.sls', self._file_list())
+
+    def test_prefix_filter(self):
+        '''
+        Test that prefix_filter returns the same paths as a linear filter
+        '''
+        paths = sorted(['a', 'ab', 'ab/c', 'abc', 'b', 'b/a', 'ba'])
+        for prefix in ('', 'a', 'ab', 'ab/', 'b', 'c', 'ba'):
+            self.assertEqual(
+                salt.fileserver.prefix_filter(paths, prefix),
+                [path for path in paths if path.startswith(prefix.strip('/'))])
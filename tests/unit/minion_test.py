@@ -54,7 +54,7 @@ class MinionTestCase(TestCase):
                 result = False
         self.assertTrue(result)
 
-    # Tests for _handle_decoded_payload in the salt.minion.Minion() class: 3
+    # Tests for _handle_decoded_payload in the salt.minion.Minion() class: 4
 
     def test_handle_decoded_payload_jid_match_in_jid_queue(self):
         '''
@@ -73,7 +73,7 @@ class MinionTestCase(TestCase):
         mock_jid_queue = [123]
         try:
             minion = salt.minion.Minion(mock_opts, jid_queue=copy.copy(mock_jid_queue), io_loop=tornado.ioloop.IOLoop())
-            ret = minion._handle_decoded_payload(mock_data)
+            ret = minion._handle_decoded_payload(mock_data).result()
             self.assertEqual(minion.jid_queue, mock_jid_queue)
             self.assertIsNone(ret)
         finally:
@@ -139,6 +139,92 @@ class MinionTestCase(TestCase):
         finally:
             minion.destroy()
 
+    @patch('salt.minion.Minion.ctx', MagicMock(return_value={}))
+    @patch('salt.minion.Minion._fire_master', MagicMock(return_value=True))
+    @patch('salt.utils.process.SignalHandlingMultiprocessingProcess.start', MagicMock(return_value=True))
+    @patch('salt.utils.process.SignalHandlingMultiprocessingProcess.join', MagicMock(return_value=True))
+    def test_process_count_max(self):
+        '''
+        Tests that the _handle_decoded_payload function waits before starting
+        a new job once process_count_max jobs are running, unless the function
+        is exempt from the limit, and that waiting jobs start in the order
+        they arrived.
+        '''
+        mock_opts = {'cachedir': '',
+                     'extension_modules': '',
+                     'id': 'minion',
+                     'minion_jid_queue_hwm': 100,
+                     'process_count_max': 2,
+                     'process_count_max_exempt': ['saltutil.find_job']}
+        io_loop = tornado.ioloop.IOLoop()
+        io_loop.make_current()
+        running = MagicMock(return_value=[{'jid': 1}, {'jid': 2}])
+        try:
+            minion = salt.minion.Minion(mock_opts, jid_queue=[], io_loop=io_loop)
+            start = salt.utils.process.SignalHandlingMultiprocessingProcess.start
+            start.reset_mock()
+            with patch('salt.utils.minion.running', running):
+                # An exempt function is started right away
+                io_loop.run_sync(lambda: minion._handle_decoded_payload({'fun': 'saltutil.find_job',
+                                                                         'jid': 3}))
+                self.assertEqual(start.call_count, 1)
+
+                # Any other function has to wait for a free slot
+                future4 = minion._handle_decoded_payload({'fun': 'state.apply', 'jid': 4})
+                future5 = minion._handle_decoded_payload({'fun': 'state.apply', 'jid': 5})
+                self.assertFalse(future4.done())
+                self.assertFalse(future5.done())
+                self.assertEqual(start.call_count, 1)
+                self.assertEqual(minion.jid_queue, [3, 4, 5])
+                self.assertEqual(salt.minion.Minion._fire_master.call_count, 2)
+                salt.minion.Minion._fire_master.assert_any_call(
+                    {'jid': 4, 'fun': 'state.apply', 'running': 2, 'process_count_max': 2},
+                    'salt/minion/minion/job/queued',
+                    sync=False
+                )
+
+                # Once a job finishes, only the first waiting job is started,
+                # and it counts as running before its proc file is written
+                running.return_value = [{'jid': 1}]
+                minion.process_count_cond.notify_all()
+                io_loop.run_sync(lambda: future4)
+                self.assertEqual(start.call_count, 2)
+                self.assertFalse(future5.done())
+                self.assertEqual(minion._process_count(), 2)
+
+                running.return_value = []
+                minion.process_count_cond.notify_all()
+                io_loop.run_sync(lambda: future5)
+                self.assertEqual(start.call_count, 3)
+                self.assertEqual(len(minion.process_count_waiting), 0)
+        finally:
+            minion.destroy()
+            io_loop.clear_current()
+
+    @patch('salt.utils.is_windows', MagicMock(return_value=False))
+    @patch('salt.loader.grains', MagicMock(return_value={}))
+    @patch('salt.loader.utils', MagicMock(return_value={}))
+    @patch('salt.loader.returners', MagicMock(return_value={}))
+    @patch('salt.loader.executors', MagicMock(return_value={}))
+    def test_load_modules_preload(self):
+        '''
+        Tests that minion_preload_modules are preloaded by the minion process,
+        but not when the modules are loaded inside of a job process.
+        '''
+        mock_opts = {'cachedir': '',
+                     'extension_modules': '',
+                     'minion_preload_modules': ['test']}
+        functions = MagicMock()
+        try:
+            minion = salt.minion.Minion(mock_opts, io_loop=tornado.ioloop.IOLoop())
+            with patch('salt.loader.minion_mods', MagicMock(return_value=functions)):
+                minion._load_modules(grains={}, preload_modules=False)
+                self.assertFalse(functions.preload.called)
+                minion._load_modules(grains={})
+                functions.preload.assert_called_once_with(['test'])
+        finally:
+            minion.destroy()
+
 
 if __name__ == '__main__':
     from integration import run_tests
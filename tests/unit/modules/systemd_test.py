@@ -252,6 +252,61 @@ class SystemdTestCase(TestCase):
                  'Wants': ['foo.service', 'bar.service']}
             )
 
+    def test_snapshot(self):
+        '''
+        Test that the state of several units is read with one systemctl call
+        and that every property is only used once
+        '''
+        show_output = (
+            'LoadState=loaded\nActiveState=active\nUnitFileState=enabled\n'
+            'NeedDaemonReload=no\n\n'
+            'LoadState=not-found\nActiveState=inactive\nNeedDaemonReload=no'
+        )
+        run_all = MagicMock(return_value={'stdout': show_output,
+                                          'stderr': '',
+                                          'retcode': 0})
+        retcode = MagicMock(return_value=3)
+        with patch.dict(systemd.__context__, {}), \
+                patch.dict(systemd.__salt__, {'cmd.run_all': run_all,
+                                              'cmd.retcode': retcode}), \
+                patch.object(systemd, '_systemctl_status') as status_mock:
+            ret = systemd.snapshot(['nginx', 'foo', 'nginx.service'])
+            self.assertEqual(sorted(ret), ['foo.service', 'nginx.service'])
+            self.assertEqual(run_all.call_count, 1)
+            self.assertEqual(run_all.call_args[0][0][-2:],
+                             ['nginx.service', 'foo.service'])
+
+            self.assertTrue(systemd.available('nginx'))
+            self.assertTrue(systemd.status('nginx'))
+            self.assertTrue(systemd.enabled('nginx'))
+            self.assertFalse(systemd.available('foo'))
+            self.assertFalse(status_mock.called)
+            self.assertFalse(retcode.called)
+
+            # The snapshot was used, systemctl is run again
+            self.assertFalse(systemd.status('nginx'))
+            self.assertTrue(retcode.called)
+
+            # Changing a unit drops the snapshot
+            systemd.snapshot('nginx')
+            with patch.object(systemd, '_systemctl_cmd', return_value=[]):
+                systemd.start('foo')
+            self.assertNotIn('systemd.snapshot', systemd.__context__)
+
+            # So does a snapshot without units
+            systemd.snapshot('nginx,foo')
+            self.assertIn('systemd.snapshot', systemd.__context__)
+            self.assertEqual(systemd.snapshot([]), {})
+            self.assertNotIn('systemd.snapshot', systemd.__context__)
+
+        run_all = MagicMock(return_value={'stdout': 'LoadState=loaded',
+                                          'stderr': '',
+                                          'retcode': 0})
+        with patch.dict(systemd.__context__, {}), \
+                patch.dict(systemd.__salt__, {'cmd.run_all': run_all}):
+            self.assertEqual(systemd.snapshot('nginx,foo'), {})
+            self.assertNotIn('systemd.snapshot', systemd.__context__)
+
     def test_execs(self):
         '''
         Test to return a list of all files specified as ``ExecStart`` for all
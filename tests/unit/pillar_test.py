@@ -9,7 +9,11 @@
 
 # Import python libs
 from __future__ import absolute_import
+import os
+import shutil
 import tempfile
+import threading
+import time
 
 # Import Salt Testing libs
 from salttesting import skipIf, TestCase
@@ -18,7 +22,11 @@ from salttesting.mock import NO_MOCK, NO_MOCK_REASON, MagicMock, patch
 ensure_in_syspath('../')
 
 # Import salt libs
+import salt.cache
+import salt.config
+import salt.master
 import salt.pillar
+import salt.utils
 
 
 @skipIf(NO_MOCK, NO_MOCK_REASON)
@@ -258,6 +266,311 @@ p2:
         client.get_state.side_effect = get_state
 
 
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class PillarCacheTestCase(TestCase):
+
+    def setUp(self):
+        self.root_dir = tempfile.mkdtemp()
+        self.pillar_root = os.path.join(self.root_dir, 'pillar')
+        os.makedirs(self.pillar_root)
+        self.sls = os.path.join(self.pillar_root, 'users.sls')
+        with salt.utils.fopen(self.sls, 'w') as fp_:
+            fp_.write('users: []\n')
+        os.makedirs(os.path.join(self.root_dir, 'pillar_cache'))
+        self.opts = {'cachedir': self.root_dir,
+                     'pillar_roots': {'base': [self.pillar_root]},
+                     'pillar_cache_backend': 'disk',
+                     'pillar_cache_ttl': 3600}
+        self.grains = {'os': 'Ubuntu'}
+
+    def tearDown(self):
+        salt.pillar.PillarCache._source_revisions.clear()
+        salt.pillar.PillarCache.stats.clear()
+        shutil.rmtree(self.root_dir)
+
+    def _compile(self):
+        cache = salt.pillar.PillarCache(
+            self.opts, self.grains, 'minion', 'base')
+        fetch = MagicMock(return_value={'users': []})
+        with patch.object(cache, 'fetch_pillar', fetch):
+            self.assertEqual(cache.compile_pillar(), {'users': []})
+        return fetch.called
+
+    def test_pillar_cache_fingerprint(self):
+        '''
+        Test that the pillar is compiled again when the grains or the pillar
+        SLS files change, and that the hits and misses are counted
+        '''
+        self.assertTrue(self._compile())
+        self.assertFalse(self._compile())
+
+        self.grains['os'] = 'Debian'
+        self.assertTrue(self._compile())
+        self.assertFalse(self._compile())
+
+        mtime = os.path.getmtime(self.sls) + 10
+        os.utime(self.sls, (mtime, mtime))
+        self.assertFalse(self._compile())
+        # The pillar_roots are only checked again after SOURCE_REVISION_TTL
+        salt.pillar.PillarCache._source_revisions.clear()
+        self.assertTrue(self._compile())
+
+        self.assertEqual(dict(salt.pillar.PillarCache.stats),
+                         {'new': 1, 'changed': 2, 'hit': 3})
+
+    def test_pillar_cache_memory(self):
+        '''
+        Test that the memory backend is shared between requests
+        '''
+        self.opts['pillar_cache_backend'] = 'memory'
+        self.addCleanup(setattr, salt.pillar.PillarCache, '_memory_cache', None)
+        self.assertTrue(self._compile())
+        self.assertFalse(self._compile())
+
+
+def _jinja_render():
+    '''
+    Stands in for the jinja renderer in the render pipe
+    '''
+_jinja_render.__module__ = 'salt.loaded.int.render.jinja'
+
+
+def _yaml_render():
+    '''
+    Stands in for the yaml renderer in the render pipe
+    '''
+_yaml_render.__module__ = 'salt.loaded.int.render.yaml'
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class PillarRenderCacheTestCase(TestCase):
+
+    def setUp(self):
+        self.pillar_root = tempfile.mkdtemp()
+        self.files = {}
+        for name, contents in (('users.sls', 'users: [{{ sls }}]\n'),
+                               ('os.sls', 'os: {{ grains.os }}\n')):
+            self.files[name] = os.path.join(self.pillar_root, name)
+            with salt.utils.fopen(self.files[name], 'w') as fp_:
+                fp_.write(contents)
+        opts = {
+            'renderer': 'jinja|yaml',
+            'renderer_blacklist': [],
+            'renderer_whitelist': [],
+            'state_top': '',
+            'pillar_roots': {'base': [self.pillar_root]},
+            'file_roots': {'base': [self.pillar_root]},
+            'extension_modules': '',
+            'pillar_render_cache': True,
+        }
+        self.pillar = salt.pillar.Pillar(opts, {'os': 'Ubuntu'}, 'minion', 'base')
+
+    def tearDown(self):
+        salt.pillar._RENDER_CACHE.clear()
+        salt.pillar._RENDER_DEPS.clear()
+        shutil.rmtree(self.pillar_root)
+
+    @patch('salt.pillar.template_shebang',
+           MagicMock(return_value=[(_jinja_render, ''), (_yaml_render, '')]))
+    @patch('salt.pillar.compile_template')
+    def test_render_cache(self, compile_template):
+        '''
+        Test that only the SLS files which do not read minion specific
+        variables are rendered once, until they change
+        '''
+        compile_template.side_effect = lambda *args, **kwargs: {'users': ['a']}
+        for _ in range(2):
+            ret = self.pillar._render_template(self.files['users.sls'],
+                                               'base', 'users', {})
+            self.assertEqual(ret, {'users': ['a']})
+            # The cached data is not changed by the merge into the pillar
+            ret['users'].append('b')
+        self.assertEqual(compile_template.call_count, 1)
+
+        for _ in range(2):
+            self.pillar._render_template(self.files['os.sls'], 'base', 'os', {})
+        self.assertEqual(compile_template.call_count, 3)
+
+        mtime = os.path.getmtime(self.files['users.sls']) + 10
+        os.utime(self.files['users.sls'], (mtime, mtime))
+        self.pillar._render_template(self.files['users.sls'], 'base', 'users', {})
+        self.assertEqual(compile_template.call_count, 4)
+
+
+class _Loader(dict):
+    '''
+    A loader which must only be used from the thread compiling the pillar
+    '''
+    def __getitem__(self, key):
+        assert threading.current_thread().name == 'MainThread'
+        return dict.__getitem__(self, key)
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class ExtPillarTestCase(TestCase):
+
+    def setUp(self):
+        self.opts = {
+            'renderer': 'yaml',
+            'renderer_blacklist': [],
+            'renderer_whitelist': [],
+            'state_top': '',
+            'pillar_roots': {},
+            'file_roots': {},
+            'extension_modules': '',
+            'ext_pillar': [{'first': {}}, {'second': {}}, {'broken': {}},
+                           {'slow': {}}],
+        }
+
+    def tearDown(self):
+        salt.pillar._TIMED_OUT_EXT_PILLARS.clear()
+
+    def _pillar(self, **opts):
+        self.opts.update(opts)
+        pillar = salt.pillar.Pillar(self.opts, {}, 'minion', 'base')
+
+        def _first(minion_id, pillar):
+            time.sleep(0.2)
+            return {'order': 'first', 'first': True}
+
+        def _second(minion_id, pillar):
+            ret = {'order': 'second', 'saw_first': 'first' in pillar}
+            pillar['changed_by_second'] = True
+            return ret
+
+        def _broken(minion_id, pillar):
+            raise Exception('boom')
+
+        def _slow(minion_id, pillar):
+            time.sleep(5)
+            return {'slow': True}
+        pillar.ext_pillars = _Loader({'first': _first, 'second': _second,
+                                      'broken': _broken, 'slow': _slow})
+        return pillar
+
+    def test_ext_pillar_sequential(self):
+        '''
+        Test that the sources see the data of the previous ones, and that a
+        source which times out is skipped
+        '''
+        pillar = self._pillar(
+            ext_pillar_source_opts={'slow': {'timeout': 0.5, 'on_error': 'skip'}})
+        ret, errors = pillar.ext_pillar({}, {})
+        self.assertEqual(ret, {'order': 'second', 'first': True, 'saw_first': True,
+                               'changed_by_second': True})
+        self.assertEqual(errors, ['Failed to load ext_pillar broken: boom'])
+        self.assertEqual([stats['name'] for stats in pillar.ext_pillar_stats],
+                         ['first', 'second', 'broken', 'slow'])
+        self.assertEqual(pillar.ext_pillar_stats[3]['error'], 'timed out after 0.5s')
+
+    def test_ext_pillar_concurrently(self):
+        '''
+        Test that the sources run at the same time, and that their data is
+        merged in the configured order
+        '''
+        pillar = self._pillar(
+            ext_pillar_concurrency=4,
+            ext_pillar_source_opts={'slow': {'timeout': 0.5},
+                                    'broken': {'on_error': 'skip'}})
+        start = time.time()
+        ret, errors = pillar.ext_pillar({}, {})
+        self.assertLess(time.time() - start, 2)
+        self.assertEqual(ret, {'order': 'second', 'first': True, 'saw_first': False})
+        self.assertEqual(errors, ['Failed to load ext_pillar slow: timed out after 0.5s'])
+
+        # The source which hangs is not called again until its call returns
+        ret, errors = pillar.ext_pillar({}, {})
+        self.assertEqual(
+            errors,
+            ['Failed to load ext_pillar slow: a previous call timed out and is '
+             'still running'])
+        self.assertEqual(pillar.ext_pillar_stats[-1]['duration'], 0)
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class PillarDeltaTestCase(TestCase):
+
+    def setUp(self):
+        self.cachedir = tempfile.mkdtemp()
+        self.old = {'web': {'port': 80, 'hosts': ['a', 'b'], 'tls': {'on': False}},
+                    'db': {'name': 'app'},
+                    'gone': True}
+        self.new = {'web': {'port': 80, 'hosts': ['a', 'c'], 'tls': {'on': False}},
+                    'db': {'name': 'app', 'user': 'app'}}
+
+    def tearDown(self):
+        shutil.rmtree(self.cachedir)
+
+    def test_pillar_delta(self):
+        '''
+        Test that the changes turn the old pillar into the new one, and that
+        the data which did not change is shared with the old pillar
+        '''
+        changed, removed = salt.pillar.pillar_delta(self.old, self.new)
+        self.assertEqual(sorted(changed), [[['db', 'user'], 'app'],
+                                           [['web', 'hosts'], ['a', 'c']]])
+        self.assertEqual(removed, [['gone']])
+        ret = salt.pillar.apply_pillar_delta(self.old, changed, removed)
+        self.assertEqual(ret, self.new)
+        self.assertIn('gone', self.old)
+        self.assertEqual(self.old['web']['hosts'], ['a', 'b'])
+        self.assertIs(ret['web']['tls'], self.old['web']['tls'])
+        self.assertEqual(salt.pillar.pillar_hash(ret),
+                         salt.pillar.pillar_hash(self.new))
+        self.assertNotEqual(salt.pillar.pillar_hash(ret),
+                            salt.pillar.pillar_hash(self.old))
+
+    def test_master_pillar_delta(self):
+        '''
+        Test that the master sends the changes against a pillar it sent
+        before, and the whole pillar otherwise
+        '''
+        opts = salt.config.DEFAULT_MASTER_OPTS.copy()
+        opts['cachedir'] = self.cachedir
+        funcs = salt.master.AESFuncs.__new__(salt.master.AESFuncs)
+        funcs.masterapi = MagicMock(cache=salt.cache.Cache(opts))
+        old_hash = salt.pillar.pillar_hash(self.old)
+        load = {'id': 'minion', 'pillar_hash': None}
+        self.assertIs(funcs._pillar_delta(load, self.old), self.old)
+
+        load['pillar_hash'] = old_hash
+        ret = funcs._pillar_delta(load, self.new)
+        delta = ret[salt.pillar.PILLAR_DELTA_KEY]
+        self.assertEqual(delta['base'], old_hash)
+        self.assertEqual(delta['hash'], salt.pillar.pillar_hash(self.new))
+        self.assertEqual(
+            salt.pillar.apply_pillar_delta(self.old, delta['set'], delta['del']),
+            self.new)
+
+        load['pillar_hash'] = delta['hash']
+        delta = funcs._pillar_delta(load, self.new)[salt.pillar.PILLAR_DELTA_KEY]
+        self.assertEqual((delta['set'], delta['del']), ([], []))
+
+        load['pillar_hash'] = 'unknown'
+        self.assertIs(funcs._pillar_delta(load, self.new), self.new)
+
+    @patch('salt.transport.Channel.factory')
+    def test_remote_pillar_delta(self, factory):
+        '''
+        Test that the minion sends the hash of its pillar and applies the
+        changes it gets back
+        '''
+        changed, removed = salt.pillar.pillar_delta(self.old, self.new)
+        old_hash = salt.pillar.pillar_hash(self.old)
+        send = factory.return_value.crypted_transfer_decode_dictentry
+        send.return_value = {salt.pillar.PILLAR_DELTA_KEY: {
+            'base': old_hash, 'hash': '', 'set': changed, 'del': removed}}
+        opts = {'pillar': self.old, 'pillar_delta': True, 'pillarenv': None}
+        pillar = salt.pillar.RemotePillar(opts, {}, 'minion', 'base')
+        self.assertEqual(pillar.compile_pillar(), self.new)
+        self.assertEqual(send.call_args[0][0]['pillar_hash'], old_hash)
+
+        # A master which does not send deltas sends the whole pillar
+        send.return_value = self.new
+        self.assertEqual(pillar.compile_pillar(), self.new)
+
+
 if __name__ == '__main__':
     from integration import run_tests
-    run_tests(PillarTestCase, needs_daemon=False)
+    run_tests(PillarTestCase, PillarCacheTestCase, PillarRenderCacheTestCase,
+              ExtPillarTestCase, PillarDeltaTestCase, needs_daemon=False)
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+# Import Python libs
+from __future__ import absolute_import
+
+# Import Salt Testing libs
+from salttesting import skipIf, TestCase
+from salttesting.helpers import ensure_in_syspath
+from salttesting.mock import NO_MOCK, NO_MOCK_REASON, patch
+
+ensure_in_syspath('../..')
+
+# Import Salt libs
+import salt.utils.yamlloader
+from salt.exceptions import SaltRenderError
+from salt.renderers import yaml
+
+yaml.__salt__ = {}
+yaml.__opts__ = {}
+
+tab_template = '''foo:
+\tbar: baz
+'''
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class YAMLRendererTestCase(TestCase):
+    def _assert_tab_error(self, loader):
+        with patch.object(yaml, 'SaltYamlSafeLoader', loader):
+            with self.assertRaises(SaltRenderError) as exc:
+                yaml.render(tab_template)
+        self.assertEqual(exc.exception.error, 'Illegal tab character')
+        self.assertEqual(exc.exception.line_num, 2)
+
+    def test_tab_error(self):
+        '''
+        Test that a tab is reported as such by the python loader
+        '''
+        self._assert_tab_error(salt.utils.yamlloader.SaltYamlPySafeLoader)
+
+    @skipIf(not salt.utils.yamlloader.HAS_LIBYAML, 'libyaml is not available')
+    def test_tab_error_libyaml(self):
+        '''
+        Test that a tab is reported as such by the libyaml based loader
+        '''
+        self._assert_tab_error(salt.utils.yamlloader.SaltYamlCSafeLoader)
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests(YAMLRendererTestCase, needs_daemon=False)
@@ -6,6 +6,7 @@
 # Import Python libs
 from __future__ import absolute_import
 import copy
+import datetime
 import os
 import sys
 import tempfile
@@ -14,7 +15,7 @@ import tempfile
 import integration
 from salttesting import TestCase, skipIf
 from salttesting.helpers import ensure_in_syspath
-from salttesting.mock import NO_MOCK, NO_MOCK_REASON, patch
+from salttesting.mock import NO_MOCK, NO_MOCK_REASON, MagicMock, patch
 
 ensure_in_syspath('../')
 
@@ -22,6 +23,9 @@ ensure_in_syspath('../')
 import salt.state
 import salt.config
 import salt.exceptions
+import salt.fileclient
+import salt.utils
+import salt.ext.six as six
 from salt.utils.odict import OrderedDict, DefaultOrderedDict
 
 
@@ -59,6 +63,342 @@ class StateCompilerTestCase(TestCase):
         with self.assertRaises(salt.exceptions.SaltRenderError):
             state_obj.call_high(high_data)
 
+    @skipIf(salt.utils.is_windows(), 'Parallel states are not run on Windows')
+    @patch('salt.state.State._gather_pillar')
+    def test_call_high_parallel(self, state_patch):
+        '''
+        Test that parallel states run at the same time, and that requisites
+        and the order of the returns are honoured
+        '''
+        high_data = OrderedDict()
+        for idx in range(3):
+            high_data['sleep{0}'.format(idx)] = {
+                'module': ['run', {'name': 'test.sleep'}, {'length': 2},
+                           {'parallel': True}],
+                '__sls__': 'parallel', '__env__': 'base'}
+        high_data['changed'] = {
+            'test': ['succeed_with_changes', {'parallel': True}],
+            '__sls__': 'parallel', '__env__': 'base'}
+        high_data['after'] = {
+            'test': ['succeed_without_changes',
+                     {'require': [{'module': 'sleep0'}, {'module': 'sleep2'}]},
+                     {'watch': [{'test': 'changed'}]}],
+            '__sls__': 'parallel', '__env__': 'base'}
+        minion_opts = salt.config.minion_config(os.path.join(integration.TMP_CONF_DIR, 'minion'))
+        state_obj = salt.state.State(minion_opts)
+        ret = state_obj.call_high(high_data)
+        self.assertEqual(state_obj.parallel_procs, {})
+        # All of the sleeps have to be running at the same time
+        starts = []
+        ends = []
+        for tag, data in six.iteritems(ret):
+            if not tag.startswith('module_|-sleep'):
+                continue
+            start = datetime.datetime.strptime(data['start_time'],
+                                               '%H:%M:%S.%f')
+            starts.append(start)
+            ends.append(start + datetime.timedelta(
+                milliseconds=data['duration']))
+        self.assertEqual(len(starts), 3)
+        self.assertLess(max(starts), min(ends))
+        run_nums = dict((tag.split('_|-')[1], data['__run_num__'])
+                        for tag, data in six.iteritems(ret))
+        self.assertEqual(
+            run_nums,
+            {'sleep0': 0, 'sleep1': 1, 'sleep2': 2, 'changed': 3, 'after': 5})
+        for data in six.itervalues(ret):
+            self.assertTrue(data['result'])
+            self.assertIn('duration', data)
+        self.assertEqual(
+            ret['test_|-after_|-after_|-succeed_without_changes']['comment'],
+            'Watch statement fired.')
+
+    @skipIf(salt.utils.is_windows(), 'Parallel states are not run on Windows')
+    @patch('salt.state.State._gather_pillar')
+    def test_call_high_parallel_failhard(self, state_patch):
+        '''
+        Test that a failing parallel state with failhard stops the state run
+        '''
+        high_data = OrderedDict()
+        high_data['fail'] = {
+            'test': ['fail_without_changes', {'parallel': True},
+                     {'failhard': True}, {'order': 1}],
+            '__sls__': 'parallel', '__env__': 'base'}
+        high_data['slow'] = {
+            'module': ['run', {'name': 'test.sleep'}, {'length': 1},
+                       {'order': 2}],
+            '__sls__': 'parallel', '__env__': 'base'}
+        high_data['skipped'] = {
+            'test': ['succeed_without_changes', {'order': 3}],
+            '__sls__': 'parallel', '__env__': 'base'}
+        minion_opts = salt.config.minion_config(os.path.join(integration.TMP_CONF_DIR, 'minion'))
+        state_obj = salt.state.State(minion_opts)
+        ret = state_obj.call_high(high_data)
+        self.assertFalse(
+            ret['test_|-fail_|-fail_|-fail_without_changes']['result'])
+        self.assertNotIn(
+            'test_|-skipped_|-skipped_|-succeed_without_changes', ret)
+
+    def test_requisite_index(self):
+        '''
+        Test that the requisite index finds the same chunks, in the same
+        order, as matching every chunk against the requisite
+        '''
+        chunks = [
+            {'state': 'pkg', 'name': 'nginx', '__id__': 'nginx', '__sls__': 'web', 'fun': 'installed'},
+            {'state': 'file', 'name': '/etc/nginx/nginx.conf', '__id__': 'nginx_conf', '__sls__': 'web.conf', 'fun': 'managed'},
+            {'state': 'service', 'name': 'nginx', '__id__': 'nginx_service', '__sls__': 'web', 'fun': 'running'},
+            {'state': 'file', 'name': '/etc/motd', '__id__': 'motd', '__sls__': 'base', 'fun': 'managed'},
+        ]
+        index = salt.state.RequisiteIndex(chunks)
+        self.assertTrue(index.current(chunks))
+        self.assertFalse(index.current(chunks[:2]))
+        for req_key, req_val in (('id', 'nginx'),
+                                 ('pkg', 'nginx'),
+                                 ('service', 'nginx'),
+                                 ('file', 'nginx_conf'),
+                                 ('file', '/etc/*'),
+                                 ('id', 'nginx*'),
+                                 ('sls', 'web'),
+                                 ('sls', 'web*'),
+                                 ('file', 'missing'),
+                                 ('sls', None)):
+            expected = []
+            if req_val is not None:
+                expected = salt.state.find_requisite_chunks(chunks, req_key, req_val)
+            self.assertEqual(index.find(req_key, req_val), expected)
+        self.assertEqual(index.find('id', 'nginx'), [chunks[0], chunks[2]])
+        self.assertEqual(index.find('file', '/etc/*'), [chunks[1], chunks[3]])
+
+    def test_find_name_index(self):
+        '''
+        Test that find_name returns the same IDs with and without an index
+        '''
+        high = {
+            'nginx': {'pkg': ['installed'], '__sls__': 'web', '__env__': 'base'},
+            'nginx_conf': {'file': [{'name': '/etc/nginx/nginx.conf'}, 'managed'],
+                           '__sls__': 'web', '__env__': 'base'},
+            'motd': {'file': [{'name': '/etc/motd'}, {'mode': 644}, 'managed'],
+                     '__sls__': 'base', '__env__': 'base'},
+        }
+        index = salt.state.high_name_index(high)
+        for name, state in (('nginx', 'pkg'),
+                            ('/etc/nginx/nginx.conf', 'file'),
+                            ('/etc/motd', 'file'),
+                            ('web', 'sls'),
+                            ('missing', 'file')):
+            self.assertEqual(
+                sorted(salt.state.find_name(name, state, high, index)),
+                sorted(salt.state.find_name(name, state, high)))
+
+    @patch('salt.state.State._gather_pillar')
+    def test_mod_aggregate_list(self, state_patch):
+        '''
+        Test that state_aggregate can list the state modules to aggregate
+        '''
+        minion_opts = salt.config.minion_config(os.path.join(integration.TMP_CONF_DIR, 'minion'))
+        state_obj = salt.state.State(minion_opts)
+        low = {'state': 'service', 'fun': 'running', 'name': 'nginx', '__id__': 'nginx'}
+        agg_mock = MagicMock(side_effect=lambda low, chunks, running: low)
+        with patch.object(state_obj, 'states', {'service.mod_aggregate': agg_mock}):
+            with patch.object(state_obj, 'functions',
+                              {'config.option': MagicMock(return_value=['pkg'])}):
+                self.assertNotIn('__agg__', state_obj._mod_aggregate(dict(low), {}, [low]))
+                self.assertFalse(agg_mock.called)
+            with patch.object(state_obj, 'functions',
+                              {'config.option': MagicMock(return_value=['pkg', 'service'])}):
+                self.assertTrue(state_obj._mod_aggregate(dict(low), {}, [low])['__agg__'])
+                self.assertTrue(agg_mock.called)
+
+    @patch('salt.state.State._gather_pillar')
+    def test_call_high_drops_service_snapshot(self, state_patch):
+        '''
+        Test that the state of the services read by the aggregation is dropped
+        at the end of the state run
+        '''
+        high_data = {'a': {'test': ['succeed_without_changes'],
+                           '__sls__': 'snapshot', '__env__': 'base'}}
+        minion_opts = salt.config.minion_config(os.path.join(integration.TMP_CONF_DIR, 'minion'))
+        state_obj = salt.state.State(minion_opts)
+        snapshot = MagicMock(return_value={})
+        with patch.dict(state_obj.functions, {'service.snapshot': snapshot}):
+            state_obj.call_high(high_data)
+        snapshot.assert_called_once_with([])
+
+    @patch('salt.state.State._gather_pillar')
+    def test_event_stream_returns(self, state_patch):
+        '''
+        Test that streamed state results carry the state tag and are marked
+        once the master has received them
+        '''
+        minion_opts = salt.config.minion_config(os.path.join(integration.TMP_CONF_DIR, 'minion'))
+        minion_opts.update({'state_events': False,
+                            'state_stream_returns': True,
+                            'master_uri': 'tcp://127.0.0.1:4506'})
+        state_obj = salt.state.State(minion_opts, jid='20161019120000123456')
+        fire_master = MagicMock(return_value=True)
+        with patch.object(state_obj, 'functions', {'event.fire_master': fire_master}):
+            chunk_ret = {'result': True, '__run_num__': 0}
+            state_obj.event(chunk_ret, 1, state_tag='test_|-a_|-a_|-nop')
+            data, tag = fire_master.call_args[0]
+            self.assertEqual(data['state_tag'], 'test_|-a_|-a_|-nop')
+            self.assertTrue(tag.endswith('/prog/{0}/0'.format(minion_opts['id'])))
+            self.assertTrue(chunk_ret['__streamed__'])
+
+            # Results the master did not receive stay in the return
+            fire_master.return_value = False
+            chunk_ret = {'result': True, '__run_num__': 1}
+            state_obj.event(chunk_ret, 1, state_tag='test_|-b_|-b_|-nop')
+            self.assertNotIn('__streamed__', chunk_ret)
+
+            # Jobs without a jid are not streamed
+            fire_master.reset_mock()
+            state_obj.jid = 'req'
+            state_obj.event({'result': True, '__run_num__': 2}, 1,
+                            state_tag='test_|-c_|-c_|-nop')
+            self.assertFalse(fire_master.called)
+
+    @skipIf(salt.utils.is_windows(), 'The journal fingerprint uses inodes')
+    @patch('salt.state.State._gather_pillar')
+    def test_call_high_state_journal(self, state_patch):
+        '''
+        Test that unchanged states are skipped, and checked again once their
+        target or arguments change or a full verify is requested
+        '''
+        root_dir = tempfile.mkdtemp(dir=integration.TMP)
+        managed = os.path.join(root_dir, 'managed')
+        parallel = os.path.join(root_dir, 'parallel')
+        high_data = {
+            managed: {'file': [{'contents': 'journal'}, 'managed'],
+                      '__sls__': 'journal', '__env__': 'base'},
+        }
+        tag = 'file_|-{0}_|-{0}_|-managed'.format(managed)
+        parallel_tag = 'file_|-{0}_|-{0}_|-managed'.format(parallel)
+        minion_opts = salt.config.minion_config(os.path.join(integration.TMP_CONF_DIR, 'minion'))
+        minion_opts['cachedir'] = root_dir
+        minion_opts['state_journal'] = True
+        state_obj = salt.state.State(minion_opts)
+
+        def run(high_data=high_data):
+            ret = state_obj.call_high(copy.deepcopy(high_data))[tag]
+            self.assertTrue(ret['result'])
+            return ret
+
+        self.assertTrue(run()['changes'])
+        self.assertIn('not checked', run()['comment'])
+
+        if not salt.utils.is_windows():
+            # Parallel states are journaled once their process finished
+            parallel_data = copy.deepcopy(high_data)
+            parallel_data[parallel] = {
+                'file': [{'contents': 'journal'}, {'parallel': True}, 'managed'],
+                '__sls__': 'journal', '__env__': 'base'}
+            ret = state_obj.call_high(copy.deepcopy(parallel_data))[parallel_tag]
+            self.assertTrue(ret['changes'])
+            ret = state_obj.call_high(copy.deepcopy(parallel_data))[parallel_tag]
+            self.assertIn('not checked', ret['comment'])
+
+        # The target changed
+        with salt.utils.fopen(managed, 'w') as fp_:
+            fp_.write('changed')
+        ret = run()
+        self.assertTrue(ret['changes'])
+        self.assertNotIn('not checked', ret['comment'])
+        self.assertIn('not checked', run()['comment'])
+
+        # The arguments changed
+        high_data[managed]['file'][0]['contents'] = 'journal2'
+        self.assertTrue(run()['changes'])
+        with salt.utils.fopen(managed) as fp_:
+            self.assertEqual(fp_.read().strip(), 'journal2')
+
+        state_obj.opts['state_verify'] = 'full'
+        self.assertNotIn('not checked', run()['comment'])
+
+    def test_state_journal_dependencies(self):
+        '''
+        Test that the journal digest of a template covers the templates it
+        includes, that templates which call execution modules are not
+        journaled, and that only clean git checkouts are fingerprinted
+        '''
+        root_dir = tempfile.mkdtemp(dir=integration.TMP)
+        files = {'tpl': '{% include "inc.jinja" %}{{ pillar.foo }}',
+                 'inc.jinja': 'included',
+                 'salt': '{{ salt["test.ping"]() }}',
+                 'expr': '{% include pillar.foo %}'}
+        for name, contents in six.iteritems(files):
+            with salt.utils.fopen(os.path.join(root_dir, name), 'w') as fp_:
+                fp_.write(contents)
+        functions = {
+            'cp.hash_file': MagicMock(return_value={'hsum': 'abc'}),
+            'cp.cache_file': lambda path, saltenv: os.path.join(root_dir, path[7:]),
+            'git.status': MagicMock(return_value={}),
+        }
+        minion_opts = salt.config.minion_config(None)
+        minion_opts['cachedir'] = root_dir
+        journal = salt.state.StateJournal(minion_opts, functions)
+        low = {'state': 'file', 'fun': 'managed', '__id__': 'managed',
+               'name': os.path.join(root_dir, 'managed'),
+               'source': 'salt://tpl', 'template': 'jinja', '__env__': 'base'}
+        digest = journal._digest(low)
+        self.assertIsNotNone(digest)
+        with salt.utils.fopen(os.path.join(root_dir, 'inc.jinja'), 'w') as fp_:
+            fp_.write('changed')
+        self.assertNotEqual(journal._digest(low), digest)
+
+        for source in ('salt://salt', 'salt://expr'):
+            self.assertIsNone(journal._digest(dict(low, source=source)))
+        self.assertIsNone(journal._digest(dict(low, template='mako')))
+
+        checkout = os.path.join(root_dir, 'checkout')
+        os.makedirs(os.path.join(checkout, '.git'))
+        for name in ('HEAD', 'index'):
+            with salt.utils.fopen(os.path.join(checkout, '.git', name), 'w') as fp_:
+                fp_.write(name)
+        low = {'state': 'git', 'fun': 'latest', '__id__': 'checkout',
+               'name': 'https://example.com/repo.git', 'target': checkout}
+        self.assertIsNotNone(journal._fingerprint(low))
+        functions['git.status'].return_value = {'modified': ['a']}
+        self.assertIsNone(journal._fingerprint(low))
+
+    @patch('salt.state.State._gather_pillar')
+    def test_compile_high_lowstate_cache(self, state_patch):
+        '''
+        Test that compiled low chunks are reused for the same high data, and
+        compiled again when the high data changes
+        '''
+        high_data = {
+            'first': {'test': [{'require': [{'test': 'second'}]}, 'succeed_without_changes'],
+                      '__sls__': 'cache', '__env__': 'base'},
+            'second': {'test': ['succeed_without_changes'],
+                       '__sls__': 'cache', '__env__': 'base'},
+        }
+        minion_opts = salt.config.minion_config(os.path.join(integration.TMP_CONF_DIR, 'minion'))
+        minion_opts['cachedir'] = tempfile.mkdtemp(dir=integration.TMP)
+        minion_opts['state_lowstate_cache'] = True
+        state_obj = salt.state.State(minion_opts)
+
+        chunks, errors = state_obj.compile_high(copy.deepcopy(high_data))
+        self.assertEqual(errors, [])
+        self.assertEqual([chunk['__id__'] for chunk in chunks], ['first', 'second'])
+        self.assertEqual(
+            len(os.listdir(os.path.join(minion_opts['cachedir'], 'lowstate'))), 1)
+
+        with patch.object(state_obj, 'compile_high_data') as compile_patch:
+            cached, errors = state_obj.compile_high(copy.deepcopy(high_data))
+            self.assertFalse(compile_patch.called)
+        self.assertEqual(cached, chunks)
+
+        high_data['second']['test'] = ['fail_without_changes']
+        with patch.object(state_obj, 'compile_high_data',
+                          wraps=state_obj.compile_high_data) as compile_patch:
+            chunks, errors = state_obj.compile_high(copy.deepcopy(high_data))
+            self.assertTrue(compile_patch.called)
+        self.assertEqual(chunks[1]['fun'], 'fail_without_changes')
+        ret = state_obj.call_high(copy.deepcopy(high_data))
+        self.assertFalse(ret['test_|-second_|-second_|-fail_without_changes']['result'])
+        self.assertFalse(ret['test_|-first_|-first_|-succeed_without_changes']['result'])
+
 
 class HighStateTestCase(TestCase):
     def setUp(self):
@@ -87,6 +427,101 @@ class HighStateTestCase(TestCase):
     def tearDown(self):
         self.highstate.pop_active()
 
+    def test_render_highstate_prefetch(self):
+        '''
+        Test that included SLS files are fetched ahead of rendering, and that
+        the rendered data is the same
+        '''
+        sls_files = {'a': 'include:\n  - b\n  - c\na:\n  test.nop: []\n',
+                     'b': 'include:\n  - d\nb:\n  test.nop: []\n',
+                     'c': 'c:\n  test.nop: []\n',
+                     'd': 'd:\n  test.nop: []\n'}
+        for name, contents in six.iteritems(sls_files):
+            with salt.utils.fopen(os.path.join(self.state_tree_dir, name + '.sls'), 'w') as fp_:
+                fp_.write(contents)
+        self.highstate.avail = {'base': sorted(sls_files)}
+        self.highstate.opts['state_prefetch_max'] = 4
+        fsclient = self.highstate.client
+        client = MagicMock(spec=salt.fileclient.RemoteClient)
+        client.get_state.side_effect = fsclient.get_state
+        # A master which does not support file archives
+        client.cache_archive.return_value = None
+        worker = MagicMock(spec=salt.fileclient.RemoteClient)
+        worker.get_state.side_effect = fsclient.get_state
+        self.highstate.client = client
+        try:
+            with patch('salt.fileclient.get_file_client', MagicMock(return_value=worker)):
+                high, errors = self.highstate.render_highstate({'base': ['a']})
+        finally:
+            self.highstate.client = fsclient
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(high), ['a', 'b', 'c', 'd'])
+        self.assertEqual(sorted(call[0][0] for call in worker.get_state.call_args_list),
+                         ['b', 'c'])
+        self.assertEqual(sorted(call[0][0] for call in client.get_state.call_args_list),
+                         ['a', 'd'])
+        self.assertEqual(self.highstate.prefetched, {})
+        # The fileclients of the prefetch threads are closed
+        self.assertTrue(worker.destroy.called)
+        self.assertEqual(self.highstate._prefetch_clients, [])
+
+    def test_prefetch_clients(self):
+        '''
+        Test that the fileclients of the prefetch threads are reused by the
+        next prefetch, and closed when the highstate is popped
+        '''
+        self.highstate.opts['state_prefetch_max'] = 2
+        fsclient = self.highstate.client
+        client = MagicMock(spec=salt.fileclient.RemoteClient)
+        client.cache_archive.return_value = None
+        get_file_client = MagicMock(
+            side_effect=lambda opts: MagicMock(spec=salt.fileclient.RemoteClient))
+        self.highstate.client = client
+        try:
+            with patch('salt.fileclient.get_file_client', get_file_client):
+                self.highstate._prefetch([('get_state', 'a', 'base'),
+                                          ('get_state', 'b', 'base')])
+                self.highstate._prefetch([('get_state', 'c', 'base'),
+                                          ('get_state', 'd', 'base')])
+        finally:
+            self.highstate.client = fsclient
+        self.assertLessEqual(get_file_client.call_count, 2)
+        workers = list(self.highstate._prefetch_clients)
+        self.assertEqual(len(workers), get_file_client.call_count)
+        self.highstate.pop_active()
+        self.highstate.push_active()
+        self.assertEqual(self.highstate._prefetch_clients, [])
+        for worker in workers:
+            worker.destroy.assert_called_once_with()
+
+    def test_prefetch_archive(self):
+        '''
+        Test that the SLS files of a saltenv are fetched with one archive
+        '''
+        self.highstate.opts['state_prefetch_max'] = 1
+        fsclient = self.highstate.client
+        client = MagicMock(spec=salt.fileclient.RemoteClient)
+        client.cache_archive.return_value = {'a.sls': '/cache/a.sls',
+                                             'b/init.sls': '/cache/b/init.sls'}
+        self.highstate.client = client
+        try:
+            self.highstate._prefetch([('get_state', 'a', 'base'),
+                                      ('get_state', 'b', 'base'),
+                                      ('get_state', 'c', 'base')])
+        finally:
+            self.highstate.client = fsclient
+        client.cache_archive.assert_called_once_with(
+            ['a.sls', 'a/init.sls', 'b.sls', 'b/init.sls', 'c.sls', 'c/init.sls'],
+            'base')
+        self.assertEqual(
+            self.highstate.prefetched,
+            {('get_state', 'a', 'base'): {'source': 'salt://a.sls',
+                                          'dest': '/cache/a.sls'},
+             ('get_state', 'b', 'base'): {'source': 'salt://b/init.sls',
+                                          'dest': '/cache/b/init.sls'},
+             ('get_state', 'c', 'base'): {}})
+        self.assertFalse(client.get_state.called)
+
     def test_top_matches_with_list(self):
         top = {'env': {'match': ['state1', 'state2'], 'nomatch': ['state3']}}
         matches = self.highstate.top_matches(top)
@@ -136,6 +571,72 @@ class HighStateTestCase(TestCase):
         self.assertEqual(state_usage_dict['base']['used'], ['state.a', 'state.b'])
         self.assertEqual(state_usage_dict['base']['unused'], ['state.c'])
 
+    def _write_sls(self, name, contents):
+        with salt.utils.fopen(os.path.join(self.state_tree_dir, name), 'w') as fp_:
+            fp_.write(contents)
+
+    def test_render_state_cache(self):
+        '''
+        The render cache reuses the rendered data of an SLS until the SLS, an
+        imported template or the context it reads changes
+        '''
+        self.highstate.opts['state_render_cache'] = True
+        self.highstate.state.opts['grains']['id'] = 'match'
+        self._write_sls('map.jinja', "{% set path = '/tmp/' ~ grains['id'] %}\n")
+        self._write_sls(
+            'cached.sls',
+            "{% from 'map.jinja' import path with context %}\n"
+            "{{ path }}:\n"
+            "  file.managed: []\n"
+        )
+        compile_template = salt.state.compile_template
+        with patch('salt.state.compile_template', side_effect=compile_template) as compile_:
+            state, errors = self.highstate.render_state('cached', 'base', set(), [])
+            self.assertEqual(errors, [])
+            self.assertIn('/tmp/match', state)
+            self.assertEqual(compile_.call_count, 1)
+
+            state, errors = self.highstate.render_state('cached', 'base', set(), [])
+            self.assertEqual(errors, [])
+            self.assertIn('/tmp/match', state)
+            self.assertEqual(state['/tmp/match']['__sls__'], 'cached')
+            self.assertIsInstance(state['/tmp/match'], OrderedDict)
+            self.assertEqual(compile_.call_count, 1)
+
+            # A change to the grains the SLS reads invalidates the cache
+            self.highstate.state.opts['grains']['id'] = 'other'
+            state, errors = self.highstate.render_state('cached', 'base', set(), [])
+            self.assertIn('/tmp/other', state)
+            self.assertEqual(compile_.call_count, 2)
+
+            # So does a change to an imported template
+            self._write_sls('map.jinja', "{% set path = '/srv/' ~ grains['id'] %}\n")
+            state, errors = self.highstate.render_state('cached', 'base', set(), [])
+            self.assertIn('/srv/other', state)
+            self.assertEqual(compile_.call_count, 3)
+
+            # And a change to the options which affect the renderers
+            self.highstate.state.opts['jinja_trim_blocks'] = True
+            state, errors = self.highstate.render_state('cached', 'base', set(), [])
+            self.assertIn('/srv/other', state)
+            self.assertEqual(compile_.call_count, 4)
+
+    def test_render_state_cache_salt_calls(self):
+        '''
+        SLS files calling execution modules are never cached
+        '''
+        self.highstate.opts['state_render_cache'] = True
+        self._write_sls(
+            'uncached.sls',
+            "{{ salt['test.echo']('/tmp/foo') }}:\n"
+            "  file.managed: []\n"
+        )
+        self.assertIsNone(
+            self.highstate._render_cache_key(
+                os.path.join(self.state_tree_dir, 'uncached.sls'),
+                'uncached',
+                'base'))
+
 
 class TopFileMergeTestCase(TestCase):
     '''
@@ -243,6 +243,47 @@ class ServiceTestCase(TestCase):
         self.assertDictEqual(service.mod_watch("salt", "stack"), ret[1])
 
 
+    def test_mod_aggregate(self):
+        '''
+        Test that the following service states are checked with one snapshot
+        '''
+        chunks = [
+            {'state': 'service', 'fun': 'running', '__id__': 'a', 'name': 'a'},
+            {'state': 'service', 'fun': 'running', '__id__': 'b', 'name': 'b'},
+            {'state': 'service', 'fun': 'dead', '__id__': 'c', 'name': 'c'},
+            {'state': 'file', 'fun': 'managed', '__id__': 'd', 'name': 'd'},
+            {'state': 'service', 'fun': 'running', '__id__': 'e', 'name': 'e'},
+        ]
+        snapshot = MagicMock()
+        with patch.dict(service.__salt__, {'service.snapshot': snapshot}):
+            low = service.mod_aggregate(chunks[0], chunks, {})
+            self.assertIs(low, chunks[0])
+            snapshot.assert_called_once_with(['a', 'b', 'c'])
+            self.assertEqual([chunk.get('__agg__') for chunk in chunks],
+                             [None, True, True, None, None])
+
+            snapshot.reset_mock()
+            service.mod_aggregate(chunks[4], chunks, {})
+            self.assertFalse(snapshot.called)
+
+            # States which may not run end the group
+            cond_chunks = [
+                {'state': 'service', 'fun': 'running', '__id__': 'a', 'name': 'a'},
+                {'state': 'service', 'fun': 'running', '__id__': 'b', 'name': 'b'},
+                {'state': 'service', 'fun': 'running', '__id__': 'c', 'name': 'c',
+                 'require': [{'pkg': 'c'}]},
+                {'state': 'service', 'fun': 'running', '__id__': 'd', 'name': 'd'},
+            ]
+            service.mod_aggregate(cond_chunks[0], cond_chunks, {})
+            snapshot.assert_called_once_with(['a', 'b'])
+            snapshot.reset_mock()
+            service.mod_aggregate(cond_chunks[2], cond_chunks, {})
+            self.assertFalse(snapshot.called)
+
+        with patch.dict(service.__salt__, {}):
+            self.assertIs(service.mod_aggregate(chunks[4], chunks, {}),
+                          chunks[4])
+
 if __name__ == '__main__':
     from integration import run_tests
     run_tests(ServiceTestCase, needs_daemon=False)
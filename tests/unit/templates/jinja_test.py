@@ -9,11 +9,13 @@ import json
 import datetime
 import pprint
 import re
+import shutil
 
 # Import Salt Testing libs
 from salttesting.unit import skipIf, TestCase
 from salttesting.case import ModuleCase
 from salttesting.helpers import ensure_in_syspath
+from salttesting.mock import patch
 ensure_in_syspath('../../')
 
 # Import salt libs
@@ -29,7 +31,7 @@ from salt.utils.jinja import (
     SerializerExtension,
     ensure_sequence_filter
 )
-from salt.utils.templates import JINJA, render_jinja_tmpl
+from salt.utils.templates import JINJA, JINJA_CODE_CACHE, SaltBytecodeCache, render_jinja_tmpl
 from salt.utils.odict import OrderedDict
 from integration import TMP_CONF_DIR
 
@@ -459,6 +461,115 @@ class TestGetTemplate(TestCase):
             dict(opts=self.local_opts, saltenv='test')
         )
 
+    def test_render_reuses_compiled_code(self):
+        '''
+        Rendering the same template source twice only compiles it once
+        '''
+        template = 'hello {{ who }} {{ salt_test_compile_cache }}'
+        context = dict(opts=self.local_opts, saltenv='test',
+                       salt_test_compile_cache=True)
+        with patch.object(Environment, 'compile',
+                          side_effect=Environment.compile,
+                          autospec=True) as compile_:
+            self.assertEqual(
+                render_jinja_tmpl(template, dict(context, who='world')),
+                'hello world True')
+            self.assertEqual(
+                render_jinja_tmpl(template, dict(context, who='salt')),
+                'hello salt True')
+        self.assertEqual(compile_.call_count, 1)
+
+    def test_render_bytecode_cache(self):
+        '''
+        With jinja_bytecode_cache enabled the compiled template is written to
+        the cachedir and loaded from there by later renders
+        '''
+        cachedir = tempfile.mkdtemp()
+        try:
+            opts = dict(self.local_opts, cachedir=cachedir,
+                        jinja_bytecode_cache=True)
+            template = 'bytecode {{ who }}'
+            out = render_jinja_tmpl(template, dict(opts=opts, saltenv='test', who='world'))
+            self.assertEqual(out, 'bytecode world')
+            self.assertEqual(len(os.listdir(os.path.join(cachedir, 'jinja'))), 1)
+
+            # Forget about the compiled code in this process, it has to come
+            # from the bytecode cache now
+            with patch.dict(JINJA_CODE_CACHE, clear=True), \
+                    patch.object(Environment, 'compile') as compile_:
+                out = render_jinja_tmpl(template, dict(opts=opts, saltenv='test', who='salt'))
+            self.assertEqual(out, 'bytecode salt')
+            self.assertFalse(compile_.called)
+        finally:
+            shutil.rmtree(cachedir)
+
+    def test_render_bytecode_cache_settings(self):
+        '''
+        Code compiled with other jinja settings is not loaded from the
+        bytecode cache
+        '''
+        cachedir = tempfile.mkdtemp()
+        try:
+            opts = dict(self.local_opts, cachedir=cachedir,
+                        jinja_bytecode_cache=True)
+            template = '{% if True %}\nx\n{% endif %}\n'
+            out = render_jinja_tmpl(template, dict(opts=opts, saltenv='test'))
+            self.assertEqual(out, '\nx\n\n')
+            opts['jinja_trim_blocks'] = True
+            with patch.dict(JINJA_CODE_CACHE, clear=True):
+                out = render_jinja_tmpl(template, dict(opts=opts, saltenv='test'))
+            self.assertEqual(out, 'x\n\n')
+        finally:
+            shutil.rmtree(cachedir)
+
+    def test_bytecode_cache_settings_loader(self):
+        '''
+        Code compiled with other jinja settings is not loaded from the
+        bytecode cache for the templates pulled in through the loader either
+        '''
+        cachedir = tempfile.mkdtemp()
+        try:
+            loader = DictLoader({'inc': '{% if True %}\nx\n{% endif %}\n'})
+            template = '{% include "inc" %}'
+            env = Environment(loader=loader,
+                              bytecode_cache=SaltBytecodeCache(cachedir))
+            self.assertEqual(env.from_string(template).render(), '\nx\n')
+            env = Environment(loader=loader, trim_blocks=True,
+                              bytecode_cache=SaltBytecodeCache(cachedir))
+            self.assertEqual(env.from_string(template).render(), 'x\n')
+            self.assertEqual(len(os.listdir(cachedir)), 2)
+        finally:
+            shutil.rmtree(cachedir)
+
+    def test_render_bytecode_cache_broken_file(self):
+        '''
+        A cache file which cannot be read is a cache miss, and the number of
+        cache files is limited
+        '''
+        cachedir = tempfile.mkdtemp()
+        try:
+            opts = dict(self.local_opts, cachedir=cachedir,
+                        jinja_bytecode_cache=True)
+            template = 'broken {{ who }}'
+            render_jinja_tmpl(template, dict(opts=opts, saltenv='test', who='world'))
+            jinja_dir = os.path.join(cachedir, 'jinja')
+            cache_file = os.path.join(jinja_dir, os.listdir(jinja_dir)[0])
+            # Keep the header, but cut the marshalled code short
+            with salt.utils.fopen(cache_file, 'rb') as fp_:
+                data = fp_.read()
+            with salt.utils.fopen(cache_file, 'wb') as fp_:
+                fp_.write(data[:-10])
+            with patch.dict(JINJA_CODE_CACHE, clear=True):
+                out = render_jinja_tmpl(template, dict(opts=opts, saltenv='test', who='salt'))
+            self.assertEqual(out, 'broken salt')
+
+            with patch('salt.utils.templates.JINJA_BYTECODE_CACHE_SIZE', 2):
+                for idx in range(3):
+                    render_jinja_tmpl('prune {0}'.format(idx), dict(opts=opts, saltenv='test'))
+            self.assertEqual(len(os.listdir(jinja_dir)), 2)
+        finally:
+            shutil.rmtree(cachedir)
+
 
 class TestCustomExtensions(TestCase):
     def test_regex_escape(self):
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+'''
+    tests.unit.utils.job_test
+    ~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Test the streaming and compact returns of state results
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import os
+import shutil
+import tempfile
+
+# Import Salt Testing libs
+from salttesting import TestCase
+from salttesting.helpers import ensure_in_syspath
+ensure_in_syspath('../../')
+
+# Import salt libs
+import salt.payload
+import salt.utils.job
+
+JID = '20161019120000123456'
+
+
+class StateStreamTestCase(TestCase):
+
+    def setUp(self):
+        self.cachedir = tempfile.mkdtemp()
+        self.opts = {'cachedir': self.cachedir,
+                     'pki_dir': os.path.join(self.cachedir, 'pki'),
+                     'keep_jobs': 24,
+                     'serial': 'msgpack'}
+
+    def tearDown(self):
+        shutil.rmtree(self.cachedir)
+
+    def test_compact_state_return(self):
+        '''
+        Test that only the streamed results are left out of the return
+        '''
+        ret = {'file_|-a_|-a_|-managed': {'result': True, '__run_num__': 0,
+                                          '__streamed__': True},
+               'cmd_|-b_|-b_|-run': {'result': False, '__run_num__': 1}}
+        compact = salt.utils.job.compact_state_return(ret)
+        self.assertEqual(
+            compact,
+            {'cmd_|-b_|-b_|-run': {'result': False, '__run_num__': 1},
+             '__state_stream__': {'file_|-a_|-a_|-managed': 0}})
+        self.assertIn('file_|-a_|-a_|-managed', ret)
+
+        ret.pop('file_|-a_|-a_|-managed')
+        self.assertIs(salt.utils.job.compact_state_return(ret), ret)
+        self.assertEqual(salt.utils.job.compact_state_return(['a']), ['a'])
+
+    def test_compress_state_return(self):
+        '''
+        Test that a compact state return expands to the original return
+        '''
+        ret = {'file_|-a_|-a_|-managed': {'result': True, 'changes': {},
+                                          'comment': 'a', '__run_num__': 1,
+                                          'duration': 1.5},
+               'cmd_|-b_|-b_|-run': {'result': None, 'changes': {'pid': 1},
+                                     'comment': 'b', '__run_num__': 0},
+               '__state_stream__': {'file_|-c_|-c_|-managed': 2}}
+        serial = salt.payload.Serial(self.opts)
+        for compression in (None, 'gzip'):
+            compact = salt.utils.job.compress_state_return(
+                self.opts, ret, compression=compression)
+            self.assertEqual(sorted(compact),
+                             ['__compact_state__', '__state_stream__'])
+            # The compact return goes through the transport
+            compact = serial.loads(serial.dumps(compact))
+            self.assertEqual(
+                salt.utils.job.expand_state_return(self.opts, compact), ret)
+        self.assertEqual(salt.utils.job.compress_state_return(self.opts, ['a']), ['a'])
+        self.assertEqual(salt.utils.job.compress_state_return(self.opts, {'a': 1}),
+                         {'a': 1})
+
+    def test_gather_state_stream(self):
+        '''
+        Test that the streamed results are put back into the return
+        '''
+        for run_num, tag in enumerate(('file_|-a_|-a_|-managed',
+                                       'file_|-b_|-b_|-managed')):
+            self.assertTrue(salt.utils.job.store_state_stream(
+                self.opts,
+                {'id': 'minion', 'jid': JID, 'tag': 'salt/job/{0}/prog'.format(JID),
+                 'data': {'state_tag': tag,
+                          'ret': {'result': True, '__run_num__': run_num}}}))
+        # Results which are not part of a state run are not stored
+        self.assertFalse(salt.utils.job.store_state_stream(
+            self.opts, {'id': 'minion', 'jid': 'req',
+                        'data': {'state_tag': 'x', 'ret': {'__run_num__': 0}}}))
+        self.assertFalse(salt.utils.job.store_state_stream(
+            self.opts, {'id': 'minion', 'jid': JID, 'data': {'foo': 'bar'}}))
+
+        load = {'id': 'minion',
+                'jid': JID,
+                'return': {'cmd_|-c_|-c_|-run': {'result': False, '__run_num__': 2},
+                           '__state_stream__': {'file_|-a_|-a_|-managed': 0,
+                                                'file_|-b_|-b_|-managed': 1,
+                                                'file_|-d_|-d_|-managed': 3}}}
+        ret = salt.utils.job.gather_state_stream(self.opts, load)
+        self.assertEqual(ret['file_|-a_|-a_|-managed'],
+                         {'result': True, '__run_num__': 0})
+        self.assertEqual(ret['file_|-b_|-b_|-managed'],
+                         {'result': True, '__run_num__': 1})
+        self.assertFalse(ret['cmd_|-c_|-c_|-run']['result'])
+        # A result which never arrived is reported as failed
+        self.assertFalse(ret['file_|-d_|-d_|-managed']['result'])
+        self.assertEqual(ret['file_|-d_|-d_|-managed']['__run_num__'], 3)
+        self.assertNotIn('__state_stream__', ret)
+        self.assertFalse(os.path.exists(
+            os.path.join(self.cachedir, 'state_stream', JID)))
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests(StateStreamTestCase, needs_daemon=False)
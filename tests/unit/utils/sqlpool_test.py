@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+'''
+    tests.unit.utils.sqlpool_test
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Test the pools of SQL connections
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import gc
+import os
+import sqlite3
+
+# Import Salt Testing libs
+from salttesting import TestCase, skipIf
+from salttesting.helpers import ensure_in_syspath
+from salttesting.mock import NO_MOCK, NO_MOCK_REASON, MagicMock, patch
+ensure_in_syspath('../../')
+
+# Import salt libs
+import salt.utils.sqlpool
+
+
+def _connect():
+    return sqlite3.connect(':memory:', check_same_thread=False)
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class ConnectionPoolTestCase(TestCase):
+
+    def tearDown(self):
+        salt.utils.sqlpool._POOLS.clear()
+        del salt.utils.sqlpool._INHERITED[:]
+
+    def test_reuse(self):
+        '''
+        Test that a connection is reused, and is closed when the block using
+        it raised an exception
+        '''
+        connect = MagicMock(side_effect=_connect)
+        pool = salt.utils.sqlpool.ConnectionPool(connect, size=1)
+        with pool.connection() as conn:
+            first = conn
+            conn.execute('CREATE TABLE t (a)')
+        with pool.connection() as conn:
+            self.assertIs(conn, first)
+            with pool.connection() as other:
+                self.assertIsNot(other, first)
+        self.assertEqual(connect.call_count, 2)
+        # The pool keeps one idle connection
+        self.assertEqual(len(pool._idle), 1)
+
+        with self.assertRaises(ValueError):
+            with pool.connection() as conn:
+                raise ValueError()
+        self.assertEqual(pool._idle, [])
+        self.assertRaises(sqlite3.ProgrammingError, first.cursor)
+
+    def test_expire_and_check(self):
+        '''
+        Test that idle and old connections are replaced, and that a
+        connection which failed its health check is replaced
+        '''
+        check = MagicMock()
+        pool = salt.utils.sqlpool.ConnectionPool(
+            _connect, check=check, max_idle=300, max_lifetime=3600)
+        with patch('time.time', MagicMock(return_value=1000)):
+            with pool.connection() as conn:
+                first = conn
+        # Recently used connections are not checked
+        with patch('time.time', MagicMock(return_value=1001)):
+            with pool.connection() as conn:
+                self.assertIs(conn, first)
+        self.assertFalse(check.called)
+
+        with patch('time.time', MagicMock(return_value=1100)):
+            with pool.connection() as conn:
+                self.assertIs(conn, first)
+        check.assert_called_once_with(first)
+
+        check.side_effect = sqlite3.OperationalError()
+        with patch('time.time', MagicMock(return_value=1200)):
+            with pool.connection() as conn:
+                self.assertIsNot(conn, first)
+                second = conn
+        check.side_effect = None
+
+        with patch('time.time', MagicMock(return_value=1600)):
+            with pool.connection() as conn:
+                self.assertIsNot(conn, second)
+                third = conn
+        with patch('time.time', MagicMock(return_value=1200 + 3601)):
+            with pool.connection() as conn:
+                self.assertIsNot(conn, third)
+
+    def test_get_pool(self):
+        '''
+        Test that the pools are shared by the connections with the same
+        parameters, and are not inherited by forked processes
+        '''
+        opts = {'sql_pool_size': 2}
+        pool = salt.utils.sqlpool.get_pool(opts, 'sqlite3', {'database': 'a'}, _connect)
+        self.assertEqual(pool.size, 2)
+        self.assertIs(
+            salt.utils.sqlpool.get_pool(opts, 'sqlite3', {'database': 'a'}, _connect),
+            pool)
+        self.assertIsNot(
+            salt.utils.sqlpool.get_pool(opts, 'sqlite3', {'database': 'b'}, _connect),
+            pool)
+        with patch('os.getpid', MagicMock(return_value=pool.pid + 1)):
+            self.assertIsNot(
+                salt.utils.sqlpool.get_pool(opts, 'sqlite3', {'database': 'a'}, _connect),
+                pool)
+
+    def test_fork(self):
+        '''
+        Test that a forked process does not close the connections it
+        inherited, not even when they would be garbage collected
+        '''
+        read_fd, write_fd = os.pipe()
+        parent = os.getpid()
+
+        class _Conn(object):
+            def rollback(self):
+                pass
+
+            def close(self):
+                if os.getpid() != parent:
+                    os.write(write_fd, b'closed')
+
+            def __del__(self):
+                # The drivers end the session when a connection is collected
+                self.close()
+
+        opts = {}
+        pool = salt.utils.sqlpool.get_pool(opts, 'fake', {}, _Conn)
+        with pool.connection():
+            pass
+        pid = os.fork()
+        if pid == 0:
+            try:
+                del pool
+                salt.utils.sqlpool.get_pool(opts, 'fake', {}, _Conn)
+                gc.collect()
+            finally:
+                os._exit(0)
+        os.close(write_fd)
+        os.waitpid(pid, 0)
+        try:
+            self.assertEqual(os.read(read_fd, 64), b'')
+        finally:
+            os.close(read_fd)
+
+    def test_pooling_disabled(self):
+        '''
+        Test that no connections are kept when the pool size is 0
+        '''
+        pool = salt.utils.sqlpool.ConnectionPool(_connect, size=0)
+        with pool.connection() as conn:
+            first = conn
+        self.assertEqual(pool._idle, [])
+        self.assertRaises(sqlite3.ProgrammingError, first.cursor)
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests(ConnectionPoolTestCase, needs_daemon=False)
@@ -8,7 +8,8 @@ from __future__ import absolute_import
 
 # Import Salt Libs
 from yaml.constructor import ConstructorError
-from salt.utils.yamlloader import SaltYamlSafeLoader
+from salt.utils.yamlloader import SaltYamlSafeLoader, SaltYamlPySafeLoader, HAS_LIBYAML
+from salt.utils.odict import OrderedDict
 import salt.utils
 
 # Import Salt Testing Libs
@@ -25,16 +26,16 @@ class YamlLoaderTestCase(TestCase):
     '''
     TestCase for salt.utils.yamlloader module
     '''
+    loader = SaltYamlSafeLoader
 
-    @staticmethod
-    def _render_yaml(data):
+    def _render_yaml(self, data, **kwargs):
         '''
         Takes a YAML string, puts it into a mock file, passes that to the YAML
         SaltYamlSafeLoader and then returns the rendered/parsed YAML data
         '''
         with patch('salt.utils.fopen', mock_open(read_data=data)) as mocked_file:
             with salt.utils.fopen(mocked_file) as mocked_stream:
-                return SaltYamlSafeLoader(mocked_stream).get_data()
+                return self.loader(mocked_stream, **kwargs).get_data()
 
     def test_yaml_basics(self):
         '''
@@ -106,7 +107,42 @@ p2:
   v2: beta
   v2: betabeta''')
 
+    def test_yaml_octal(self):
+        '''
+        Test that integers with leading zeros are not parsed as octal
+        '''
+        self.assertEqual(
+            self._render_yaml(b'''
+p1: 0755
+p2: 000
+p3: 0x1f'''),
+            {'p1': 755, 'p2': 0, 'p3': 31}
+        )
+
+    def test_yaml_ordered(self):
+        '''
+        Test that the order of mappings is kept when using an OrderedDict
+        '''
+        data = self._render_yaml(b'''
+z: 1
+a:
+  y: 2
+  b: 3''', dictclass=OrderedDict)
+        self.assertIsInstance(data, OrderedDict)
+        self.assertEqual(list(data), ['z', 'a'])
+        self.assertIsInstance(data['a'], OrderedDict)
+        self.assertEqual(list(data['a']), ['y', 'b'])
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+@skipIf(not HAS_LIBYAML, 'libyaml is not available, SaltYamlSafeLoader is already pure Python')
+class PyYamlLoaderTestCase(YamlLoaderTestCase):
+    '''
+    Run the same tests against the pure Python loader
+    '''
+    loader = SaltYamlPySafeLoader
+
 
 if __name__ == '__main__':
     from integration import run_tests
-    run_tests(YamlLoaderTestCase, needs_daemon=False)
+    run_tests(YamlLoaderTestCase, PyYamlLoaderTestCase, needs_daemon=False)